@@ -3,37 +3,190 @@
 外部库：
 - 参数解析库：解析命令行参数。
 - 测试运行库：执行生成的测试用例。
-- 子进程库：调用报告工具命令行生成报告。
+- 子进程库：调用报告工具命令行生成报告（可选）。
+
+启动性能：
+- 测试框架、用例生成器（及其依赖的模型 SDK、切片库等）均在对应模式内按需导入
+- 启动耗时基准见 scripts/bench_startup.py
 """
 
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import os
 import subprocess
 import sys
+from pathlib import Path
+from typing import List, Optional
 
-import pytest
-
-from src.core.case_generator import CaseGenerator
 from src.utils.file_handler import read_yaml
 from src.utils.logger import get_logger
+from src.utils.tracer import export_trace, init_tracing
 
 
-def _run_pytest(settings: dict) -> int:
-    """运行 Pytest 并返回退出码。"""
+def _run_pytest(
+    settings: dict,
+    selection: Optional[List[str]] = None,
+    isolated: bool = False,
+) -> int:
+    """
+    运行 Pytest 并返回退出码；selection 为增量选择参数（如 --only-failed）。
 
-    paths = settings.get("paths", {})
-    results_dir = paths.get("allure_results_dir", "allure-results")
-    os.makedirs(results_dir, exist_ok=True)
-
-    return pytest.main(
-        [
-            "-q",
-            "test_runner/test_executor.py",
-            "--alluredir",
-            results_dir,
+    isolated 为真时在子进程中运行（监听模式多次执行，避免同一进程内重复导入用例模块）。
+    """
+
+    args = ["-q", "test_runner/test_executor.py"]
+    args.extend(selection or [])
+    if _allure_enabled(settings):
+        paths = settings.get("paths", {})
+        results_dir = paths.get("allure_results_dir", "allure-results")
+        os.makedirs(results_dir, exist_ok=True)
+        args.extend(["--alluredir", results_dir])
+
+    if isolated:
+        return subprocess.call([sys.executable, "-m", "pytest", *args])
+
+    import pytest
+
+    return pytest.main(args)
+
+
+def _run_parallel(
+    settings: dict,
+    selection: List[str],
+    workers: int,
+    environments: Optional[List[str]] = None,
+) -> int:
+    """
+    多进程执行：每个工作进程运行一个分片，主进程托管共享判定服务并合并结果。
+
+    - 分片按历史耗时均衡（见 src/core/sharding.py），各进程独立计算得到相同划分
+    - 工作进程的 LLM 判定统一发送到主进程中的判定服务（攒批、缓存、去重）
+    - 各进程写入独立的结果/状态分片，全部结束后由主进程合并
+    - 指定多个环境时每个环境各启动 workers 个进程并发执行，结果与状态按环境分区；
+      判定服务跨环境共享，响应摘要相同的判定只调用一次 LLM
+    """
+
+    from src.core.ai_judge import AIJudge
+    from src.core.environments import env_path
+    from src.core.judge_service import JudgeService
+    from src.core.run_state import RunState
+    from src.core.sharding import shard_path
+
+    logger = get_logger(__name__)
+    exec_cfg = settings.get("execution", {})
+    judge = AIJudge()
+    service = JudgeService(
+        judge.llm_verdict,
+        exec_cfg.get("judge_service", {}) or {},
+        prefilter=judge.prefilter.decide if judge.prefilter.enabled else None,
+    )
+    env = dict(os.environ)
+    env.update(service.start())
+
+    base_args = [sys.executable, "-m", "pytest", "-q", "test_runner/test_executor.py"]
+    base_args.extend(selection)
+    if _allure_enabled(settings):
+        results_dir = settings.get("paths", {}).get("allure_results_dir", "allure-results")
+        os.makedirs(results_dir, exist_ok=True)
+        base_args.extend(["--alluredir", results_dir])
+
+    targets: List[Optional[str]] = list(environments or []) or [None]
+    logger.info(
+        "Running tests in %s worker processes (%s environment(s))",
+        workers * len(targets),
+        len(environments or []) or "default",
+    )
+    try:
+        processes = [
+            subprocess.Popen(
+                [
+                    *base_args,
+                    f"--shard={index}/{workers}",
+                    *([f"--env={name}"] if name else []),
+                ],
+                env=env,
+            )
+            for name in targets
+            for index in range(workers)
         ]
+        codes = [process.wait() for process in processes]
+    finally:
+        service.stop()
+
+    results_file = settings.get("reporting", {}).get("results_file")
+    state_file = settings.get("paths", {}).get("run_state_file", ".autollm/run_state.json")
+    for name in targets:
+        if results_file:
+            partition = env_path(str(results_file), name)
+            _merge_result_shards(partition, [shard_path(partition, i) for i in range(workers)])
+        state_partition = env_path(str(state_file), name)
+        state = RunState(state_partition)
+        if state.merge_shards([shard_path(state_partition, i) for i in range(workers)]):
+            state.save()
+
+    # 5 表示该分片没有用例；全部分片都无用例时才返回 5
+    ran = [code for code in codes if code != 5]
+    return max(ran) if ran else 5
+
+
+def _merge_result_shards(results_file: str, shard_files: List[str]) -> None:
+    """将各分片的结果文件合并为一个结果文件并删除分片。"""
+
+    from src.report.result_sink import ResultSink, iter_results
+
+    # 合并为离线批处理，按批写入即可
+    sink = ResultSink(results_file, batch_size=500)
+    try:
+        for path in shard_files:
+            for record in iter_results(path):
+                sink.write(record)
+    finally:
+        sink.close()
+    for path in shard_files:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _allure_enabled(settings: dict) -> bool:
+    """Allure 导出需配置开启且已安装 allure-pytest 插件。"""
+
+    logger = get_logger(__name__)
+    if not settings.get("reporting", {}).get("allure", True):
+        return False
+    if importlib.util.find_spec("allure_pytest") is None:
+        logger.warning("allure-pytest is not installed, skipping Allure results.")
+        return False
+    return True
+
+
+def _generate_summary_report(settings: dict, environment: Optional[str] = None) -> None:
+    """根据流式结果文件生成内置静态 HTML 汇总（指定环境时使用该环境的结果与汇总分区）。"""
+
+    from src.core.environments import env_path
+    from src.report.html_summary import render_html_summary
+
+    logger = get_logger(__name__)
+    reporting = settings.get("reporting", {})
+    results_file = reporting.get("results_file")
+    html_path = reporting.get("html_summary")
+    if not results_file or not html_path:
+        return
+    results_file = env_path(str(results_file), environment)
+    html_path = env_path(str(html_path), environment)
+    if not os.path.exists(results_file):
+        logger.warning("Results file not found: %s", results_file)
+        return
+    summary = render_html_summary(results_file, html_path)
+    logger.info(
+        "Summary report generated at %s (total=%s, passed=%s, failed=%s, skipped=%s, error=%s)",
+        html_path,
+        summary["total"],
+        summary["passed"],
+        summary["failed"],
+        summary["skipped"],
+        summary["error"],
     )
 
 
@@ -63,35 +216,179 @@ def _generate_allure_report(settings: dict) -> None:
         logger.error("Allure report generation failed: %s", exc)
 
 
+def _watch(
+    settings: dict,
+    workers: int,
+    environments: Optional[List[str]] = None,
+    fresh: bool = False,
+) -> int:
+    """
+    监听模式：文档变更后只重新切片该文档、只重新生成变化的切片，并立即执行受影响的用例。
+
+    - 生成经持久化工作队列，内容未变的切片复用已有结果，生成的用例也保持不变；
+      未启用 RAG 时以整篇文档为一个任务，文档未变化同样不调用 LLM
+    - 接口索引与切片检索索引按文档增量更新，其他文档的索引保持不变
+    - 执行使用 --changed，只运行 JSON 发生变化的用例；指定环境时对这些环境执行并分别生成汇总
+    """
+
+    from src.core.case_generator import CaseGenerator
+    from src.core.doc_watcher import DocWatcher
+
+    logger = get_logger(__name__)
+    generator = CaseGenerator()
+    generator.use_work_queue = True
+    generator.fresh = fresh
+    watch_cfg = settings.get("watch", {}) or {}
+    watcher = DocWatcher(
+        generator.raw_docs_dir,
+        interval=float(watch_cfg.get("interval_seconds", 1.0)),
+        debounce=float(watch_cfg.get("debounce_seconds", 0.5)),
+    )
+
+    def on_change(paths: List[Path]) -> None:
+        generated = 0
+        for path in paths:
+            try:
+                generator.generate_cases(str(path))
+                generated += 1
+            except Exception as exc:
+                logger.error("Generation failed for %s: %s", path, exc)
+        if not generated:
+            return
+        if workers > 1 or len(environments or []) > 1:
+            code = _run_parallel(settings, ["--changed"], workers, environments)
+        else:
+            selection = ["--changed"] + [f"--env={name}" for name in environments or []]
+            code = _run_pytest(settings, selection, isolated=True)
+        logger.info("Affected cases executed (exit code %s)", code)
+        for name in environments or [None]:
+            _generate_summary_report(settings, name)
+
+    watcher.watch(on_change)
+    return 0
+
+
 def main() -> int:
     """
-    命令行主入口：支持三种模式。
+    命令行主入口：支持四种模式。
 
     --mode generate：仅生成结构化用例
     --mode run：仅执行用例
     --mode all：生成 + 执行 + 生成测试报告
+    --mode watch：监听原始文档目录，变更后只重新生成变化的切片并执行受影响的用例
+
+    增量执行（run/all 模式）：
+    --only-failed：仅重跑上次失败的用例
+    --failed-first：上次失败的用例优先执行
+    --changed：仅执行 JSON 自上次运行以来发生变化的用例
+
+    并行执行（run/all 模式）：
+    --workers N：按历史耗时分片到 N 个工作进程，LLM 判定经共享判定服务
+    --env dev,staging：对多个环境档位并发执行同一批用例，结果按环境分区
+
+    响应录制与回放（run/all 模式）：
+    --record：录制每条用例的响应到 paths.response_store_file
+    --replay：不访问被测服务，只用录制的响应重新执行断言（调整判定提示词/阈值时使用）
+
+    生成（generate/all 模式）开启 work_queue 时，切片任务经持久化队列处理，
+    中断后重新执行同一命令即可续跑；work_queue.workers 控制生成进程数。
+    切片输入与生成配置（提示词、模型/档位、Agentic 设置）均未变化时复用队列中的结果；
+    --fresh：丢弃本次文档在队列中的结果并重新生成（generate/all/watch 模式）。
     """
 
     parser = argparse.ArgumentParser(description="AutoLLM Test Framework CLI")
-    parser.add_argument("--mode", choices=["generate", "run", "all"], default="all")
+    parser.add_argument("--mode", choices=["generate", "run", "all", "watch"], default="all")
     parser.add_argument("--doc", help="Optional document path to generate cases", default=None)
+    parser.add_argument(
+        "--only-failed", action="store_true", help="Only rerun cases that failed last run"
+    )
+    parser.add_argument(
+        "--failed-first", action="store_true", help="Run previously failed cases first"
+    )
+    parser.add_argument(
+        "--changed", action="store_true", help="Only run cases whose JSON changed since last run"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for test execution (default: execution.workers)",
+    )
+    parser.add_argument(
+        "--env",
+        default=None,
+        help="Comma-separated environment profiles to run against (default: execution.environments)",
+    )
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument(
+        "--record", action="store_true", help="Record responses for later --replay runs"
+    )
+    replay_group.add_argument(
+        "--replay", action="store_true", help="Re-evaluate assertions from recorded responses only"
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard queued chunk results for the documents and regenerate them (generate/all/watch)",
+    )
+    # 内部参数：生成工作队列的工作进程（由生成器启动）
+    parser.add_argument("--queue-worker", action="store_true", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    if args.queue_worker:
+        from src.core.case_generator import CaseGenerator
+
+        CaseGenerator().run_queue_worker()
+        return 0
+
     logger = get_logger(__name__)
     settings = read_yaml("config/settings.yaml")
+    init_tracing(settings)
+
+    from src.core.environments import parse_env_names
+
+    exec_cfg = settings.get("execution", {})
+    workers = args.workers or int(exec_cfg.get("workers", 1))
+    environments = parse_env_names(args.env) or [str(name) for name in exec_cfg.get("environments") or []]
+    if args.mode == "watch":
+        return _watch(settings, workers, environments, fresh=args.fresh)
 
     if args.mode in {"generate", "all"}:
         logger.info("Generating test cases...")
+        from src.core.case_generator import CaseGenerator
+
         generator = CaseGenerator()
+        generator.fresh = args.fresh
         generator.generate_cases(args.doc)
 
     exit_code = 0
     if args.mode in {"run", "all"}:
         logger.info("Running tests...")
-        exit_code = _run_pytest(settings)
+        selection = [
+            flag
+            for flag, enabled in (
+                ("--only-failed", args.only_failed),
+                ("--failed-cases-first", args.failed_first),
+                ("--changed", args.changed),
+                ("--record-responses", args.record),
+                ("--replay", args.replay),
+            )
+            if enabled
+        ]
+        if len(environments) > 1 or workers > 1:
+            exit_code = _run_parallel(settings, selection, workers, environments)
+        else:
+            exit_code = _run_pytest(settings, selection + [f"--env={name}" for name in environments])
 
     if args.mode in {"run", "all"}:
-        _generate_allure_report(settings)
+        for name in environments or [None]:
+            _generate_summary_report(settings, name)
+        if _allure_enabled(settings):
+            _generate_allure_report(settings)
+
+    trace_path = export_trace()
+    if trace_path:
+        logger.info("Trace exported to %s", trace_path)
 
     return exit_code
 
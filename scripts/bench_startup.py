@@ -0,0 +1,99 @@
+"""CLI 启动耗时基准：基于 python -X importtime 统计 run.py 的导入开销。
+
+用法：
+    python scripts/bench_startup.py [--budget-ms 150] [--repeat 5] [--top 10]
+
+检查项：
+- run 模块导入累计耗时（取多次运行的中位数）不超过预算
+- 启动阶段不应导入任何重量级依赖（pytest / openai / json5 / langchain / requests）
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 启动阶段禁止导入的重量级依赖（应在具体模式内按需导入）
+HEAVY_MODULES = ("pytest", "openai", "json5", "langchain", "requests", "allure")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _measure_once() -> Tuple[int, Dict[str, int]]:
+    """
+    运行一次 `python -X importtime -c "import run"`。
+
+    返回：
+    - run 模块的累计导入耗时（微秒）
+    - 每个被导入模块的累计耗时（微秒）
+    """
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import run"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    modules: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # 格式：import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        cumulative = int(parts[1].strip())
+        name = parts[2].strip()
+        modules[name] = cumulative
+        if name == "run":
+            total_us = cumulative
+    return total_us, modules
+
+
+def main() -> int:
+    """执行基准并按预算返回退出码（0 通过，1 超预算或导入了重量级依赖）。"""
+
+    parser = argparse.ArgumentParser(description="Benchmark run.py import-time startup cost")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Import budget in ms")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measured runs")
+    parser.add_argument("--top", type=int, default=10, help="Show N slowest modules")
+    args = parser.parse_args()
+
+    samples: List[int] = []
+    modules: Dict[str, int] = {}
+    for _ in range(max(args.repeat, 1)):
+        total_us, modules = _measure_once()
+        samples.append(total_us)
+
+    median_ms = statistics.median(samples) / 1000
+    print(
+        f"run.py import time (median of {len(samples)}): {median_ms:.1f} ms "
+        f"(budget {args.budget_ms:.1f} ms)"
+    )
+    print(f"Slowest {args.top} modules (cumulative):")
+    for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[
+        : args.top
+    ]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+    ok = True
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        ok = False
+    if median_ms > args.budget_ms:
+        print("FAIL: startup import time exceeds budget")
+        ok = False
+    if ok:
+        print("OK")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
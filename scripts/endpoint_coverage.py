@@ -0,0 +1,66 @@
+"""按接口统计用例覆盖：基于接口索引匹配 data/test_cases 中的全部用例。
+
+用法：
+    python scripts/endpoint_coverage.py [--docs data/raw_docs] [--fail-under 80]
+
+说明：
+- 接口索引读取自 paths.endpoint_index_file，原始文档有变化时自动增量重建
+- 用例按方法与 URL 路径（路径参数匹配任意单段）归属到接口
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.rag_core.endpoint_index import EndpointIndex  # noqa: E402
+from src.utils.file_handler import iter_jsonl, read_json, read_yaml  # noqa: E402
+
+
+def main() -> int:
+    """输出接口覆盖表；覆盖率低于 --fail-under 时返回 1。"""
+
+    parser = argparse.ArgumentParser(description="Report test case coverage per documented endpoint")
+    parser.add_argument("--settings", default="config/settings.yaml", help="Settings file")
+    parser.add_argument("--docs", default=None, help="Raw docs directory (default: paths.raw_docs_dir)")
+    parser.add_argument("--fail-under", type=float, default=None, help="Minimum endpoint coverage in %%")
+    args = parser.parse_args()
+
+    settings = read_yaml(args.settings)
+    paths = settings.get("paths", {})
+    docs_dir = Path(args.docs or paths.get("raw_docs_dir", "data/raw_docs"))
+    index = EndpointIndex(str(paths.get("endpoint_index_file", ".autollm/endpoint_index.json")))
+    index.build(sorted(p for p in docs_dir.glob("*") if p.suffix in {".md", ".txt"}))
+    index.save()
+
+    cases = []
+    for case_file in sorted(Path(paths.get("test_cases_dir", "data/test_cases")).glob("*.json*")):
+        if case_file.suffix == ".jsonl":
+            cases.extend(iter_jsonl(str(case_file)))
+        elif case_file.suffix == ".json":
+            data = read_json(str(case_file))
+            cases.extend(data if isinstance(data, list) else [data])
+
+    report = index.coverage(cases)
+    width = max((len(row["id"]) for row in report["endpoints"]), default=10)
+    for row in report["endpoints"]:
+        marker = " " if row["cases"] else "!"
+        print(f"{marker} {row['id']:<{width}}  {row['cases']:>4}  {row['title']}")
+    percent = 100.0 * report["covered"] / report["total"] if report["total"] else 100.0
+    print(
+        f"Covered {report['covered']}/{report['total']} endpoints ({percent:.1f}%), "
+        f"{report['unmatched']} case(s) not matched to any endpoint"
+    )
+    if args.fail_under is not None and percent < args.fail_under:
+        print(f"FAIL: endpoint coverage below {args.fail_under:.1f}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""评审反馈压缩：只把可执行的逐用例修改项带入下一轮生成。
+
+规则：
+- 丢弃结论行（Pass/Fail）与客套、总结类文字
+- 优先保留 “[用例名] 说明” 形式的逐用例条目；没有此类条目时保留其余条目
+- 归一化后去重，按 token 预算与条目数上限截取
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional
+
+from src.utils.token_counter import estimate_tokens, truncate_to_tokens
+
+# 列表前缀：-、*、•、1.、1)、（1）等
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]+|\(?\d+[.)、]|（\d+）)\s*")
+# 逐用例条目：[用例名] 说明
+_CASE_ITEM_RE = re.compile(r"^\[[^\]]+\]\s*\S")
+# 仅包含结论的行
+_VERDICT_RE = re.compile(r"^(?:pass|fail|通过|不通过)[\s:：.。!！]*$", re.IGNORECASE)
+# 去重时忽略的字符
+_NOISE_RE = re.compile(r"[\s,，.。;；:：!！`'\"]+")
+
+
+class FeedbackCondenser:
+    """
+    评审反馈压缩器。
+
+    配置（agentic.feedback）：
+    - max_tokens: 带入下一轮的反馈 token 上限（0 表示不限制）
+    - max_items: 条目数上限（0 表示不限制）
+    """
+
+    def __init__(self, cfg: Dict[str, Any], model: Optional[str] = None) -> None:
+        self.max_tokens = max(int(cfg.get("max_tokens", 300)), 0)
+        self.max_items = max(int(cfg.get("max_items", 8)), 0)
+        self.model = model
+
+    def items(self, review: str) -> List[str]:
+        """拆分评审文本为去重后的可执行条目。"""
+
+        case_items: List[str] = []
+        other_items: List[str] = []
+        seen = set()
+        for line in review.splitlines():
+            item = _BULLET_RE.sub("", line).strip()
+            if not item or _VERDICT_RE.match(item):
+                continue
+            key = _NOISE_RE.sub("", item).lower()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            (case_items if _CASE_ITEM_RE.match(item) else other_items).append(item)
+        return case_items or other_items
+
+    def condense(self, review: str) -> str:
+        """压缩评审文本，返回带入下一轮的反馈（无可执行条目时为空串）。"""
+
+        items = self.items(review)
+        if self.max_items:
+            items = items[: self.max_items]
+        lines: List[str] = []
+        used = 0
+        for item in items:
+            line = f"- {item}"
+            cost = estimate_tokens(line, self.model) + 1
+            if self.max_tokens and used + cost > self.max_tokens:
+                if not lines:
+                    # 单条即超出预算时截断保留，保证反馈不为空
+                    lines.append(truncate_to_tokens(line, self.max_tokens, self.model))
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
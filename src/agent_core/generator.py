@@ -4,14 +4,21 @@ from __future__ import annotations
 
 import json
 import re
-from typing import Any, Dict, List, Optional
-
-import json5
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.llm_client.openai_client import LLMClient
+from src.utils.case_schema import (
+    CASES_RESPONSE_SCHEMA,
+    SELF_CHECK_ITEMS,
+    SELF_CHECK_RESPONSE_SCHEMA,
+    unwrap_cases,
+)
 from src.utils.file_handler import read_yaml
 from src.utils.json_parser import extract_json_payload
 from src.utils.logger import get_logger
+from src.utils.prompt_registry import get_prompt_registry
+from src.utils.tracer import traced
 
 
 # 捕获 ```json ... ``` 代码块中的 JSON 内容
@@ -25,30 +32,93 @@ class AgentGenerator:
         # 初始化日志、配置、提示词与 LLM 客户端
         self._logger = get_logger(__name__)
         self.settings = read_yaml(settings_path)
-        self.prompts = read_yaml("config/prompt_templates.yaml")
+        self.prompts = get_prompt_registry()
         self.llm_client = LLMClient(settings_path=settings_path, module_name="agent_generator")
+        self.settings_path = settings_path
+        # 多候选生成时按档位懒加载的客户端
+        self._profile_clients: Dict[str, LLMClient] = {}
+        self._profile_lock = threading.Lock()
 
     def generate(
         self,
         chunk_text: str,
         feedback: Optional[str] = None,
+        temperature: Optional[float] = None,
+        profile: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        """为单个切片生成测试用例，可选包含评审反馈。"""
-        # 选择提示词模板，优先 agent_generation_prompt
-        prompt = self.prompts.get("agent_generation_prompt") or self.prompts.get(
-            "generation_prompt", ""
+        """为单个切片生成测试用例，可选包含评审反馈、采样温度与指定模型档位。"""
+        # 提示词优先 agent_generation_prompt
+        llm_output = self._call(
+            ("agent_generation_prompt", "generation_prompt"),
+            CASES_RESPONSE_SCHEMA,
+            chunk_text,
+            feedback,
+            temperature,
+            profile,
         )
-        # 拼接切片内容与可选的评审反馈
-        content = chunk_text
-        if feedback:
-            content = f"{chunk_text}\n\n[Judge Feedback]\n{feedback}".strip()
-        # 调用 LLM 生成测试用例
-        llm_output = self.llm_client.chat_completion(prompt, content)
         # 提取输出中的 JSON 载荷
         payload = self._extract_json(llm_output)
         # 解析 JSON 为统一的用例列表
         return self._parse_json(payload)
 
+    def generate_with_self_check(
+        self,
+        chunk_text: str,
+        feedback: Optional[str] = None,
+        temperature: Optional[float] = None,
+        profile: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """一次调用同时生成用例与自检结论，返回（用例列表，自检发现的缺口）。"""
+        llm_output = self._call(
+            ("agent_self_check_prompt", "agent_generation_prompt"),
+            SELF_CHECK_RESPONSE_SCHEMA,
+            chunk_text,
+            feedback,
+            temperature,
+            profile,
+        )
+        data = self._load_json(self._extract_json(llm_output))
+        return self._as_cases(data), self_check_gaps(data)
+
+    def _call(
+        self,
+        prompt_names: Tuple[str, ...],
+        response_schema: Dict[str, Any],
+        chunk_text: str,
+        feedback: Optional[str],
+        temperature: Optional[float],
+        profile: Optional[str],
+    ) -> str:
+        """组装提示词（可选拼接评审反馈，超出上下文窗口时截断切片）并调用 LLM。"""
+        client = self._client_for(profile)
+        layout = "agent_generation_feedback_input" if feedback else "agent_generation_input"
+        prompt, content = self.prompts.assemble(
+            prompt_names,
+            layout,
+            {"chunk": chunk_text, "feedback": feedback or ""},
+            client=client,
+            truncate="chunk",
+        )
+        return client.chat_completion(
+            prompt, content, temperature=temperature, response_schema=response_schema
+        )
+
+    def _client_for(self, profile: Optional[str]) -> LLMClient:
+        """返回指定档位的客户端，未指定时使用模块默认客户端。"""
+        if not profile:
+            return self.llm_client
+        with self._profile_lock:
+            client = self._profile_clients.get(profile)
+            if client is None:
+                client = LLMClient(
+                    settings_path=self.settings_path,
+                    module_name="agent_generator",
+                    profile=profile,
+                )
+                self._profile_clients[profile] = client
+            return client
+
+    @traced("AgentGenerator._extract_json")
     def _extract_json(self, llm_output: str) -> str:
         # 优先从 ```json``` 代码块提取
         match = _JSON_BLOCK_RE.search(llm_output)
@@ -57,18 +127,32 @@ class AgentGenerator:
         # 回退到通用 JSON 抽取逻辑
         return extract_json_payload(llm_output.strip())
 
+    @traced("AgentGenerator._parse_json")
     def _parse_json(self, payload: str) -> List[Dict[str, Any]]:
+        return self._as_cases(self._load_json(payload))
+
+    def _load_json(self, payload: str) -> Any:
+        """解析 JSON 载荷，失败时返回 None。"""
         # 尝试标准 JSON 解析
         try:
-            data = json.loads(payload)
+            return json.loads(payload)
         except json.JSONDecodeError:
             # 兼容 JSON5（宽松语法）
             try:
-                data = json5.loads(payload)
+                import json5
+
+                return json5.loads(payload)
             except Exception as exc:
-                # 解析失败则返回空列表
+                # 解析失败则返回 None
                 self._logger.warning("Failed to parse JSON payload: %s", exc)
-                return []
+                return None
+
+    def _as_cases(self, data: Any) -> List[Dict[str, Any]]:
+        """将解析结果统一为用例列表。"""
+        if data is None:
+            return []
+        # 结构化输出时用例数组包裹在 {"cases": [...]} 中
+        data = unwrap_cases(data)
         # 统一输出为 List[Dict]
         if isinstance(data, dict):
             return [data]
@@ -78,3 +162,17 @@ class AgentGenerator:
         self._logger.warning("Agent generator returned unsupported JSON payload")
         return []
 
+
+def self_check_gaps(data: Any) -> List[str]:
+    """
+    从生成自检结论中提取缺口：未满足的清单项与模型自报的 gaps。
+
+    缺少自检结论时视为存在缺口，交由外部评审兜底。
+    """
+
+    check = data.get("self_check") if isinstance(data, dict) else None
+    if not isinstance(check, dict):
+        return ["self-check missing"]
+    gaps = [f"self-check: {item} not satisfied" for item in SELF_CHECK_ITEMS if check.get(item) is not True]
+    gaps.extend(str(gap).strip() for gap in check.get("gaps") or [] if str(gap).strip())
+    return gaps
@@ -2,11 +2,35 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+import json
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.llm_client.openai_client import LLMClient
 from src.utils.file_handler import read_yaml
+from src.utils.json_parser import extract_json_payload
 from src.utils.logger import get_logger
+from src.utils.prompt_registry import get_prompt_registry
+
+# 评审结论的结构：是否通过 + 逐用例修改项
+VERDICT_SCHEMA: Dict[str, Any] = {
+    "name": "judge_verdict",
+    "description": "用例评审结论",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "pass": {"type": "boolean"},
+            "issues": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"case": {"type": "string"}, "fix": {"type": "string"}},
+                    "required": ["case", "fix"],
+                },
+            },
+        },
+        "required": ["pass", "issues"],
+    },
+}
 
 
 class AgentJudge:
@@ -16,19 +40,28 @@ class AgentJudge:
         # 初始化日志、配置、提示词与 LLM 客户端
         self._logger = get_logger(__name__)
         self.settings = read_yaml(settings_path)
-        self.prompts = read_yaml("config/prompt_templates.yaml")
+        self.prompts = get_prompt_registry()
         self.llm_client = LLMClient(settings_path=settings_path, module_name="agent_judge")
 
     def review(self, chunk_text: str, cases: List[Dict[str, Any]]) -> Tuple[bool, str]:
         """评审生成用例并返回（是否通过，反馈文本）。"""
-        # 选择评审提示词模板，优先 agent_judge_prompt
-        prompt = self.prompts.get("agent_judge_prompt") or self.prompts.get(
-            "judge_prompt", ""
+        # 组装评审输入：优先 agent_judge_prompt，超出上下文窗口时截断切片；用例以紧凑 JSON 传入
+        cases_text = json.dumps(cases, ensure_ascii=False, separators=(",", ":"), default=str)
+        prompt, content = self.prompts.assemble(
+            ("agent_judge_prompt", "judge_prompt"),
+            "agent_judge_input",
+            {"chunk": chunk_text, "cases": cases_text},
+            client=self.llm_client,
+            truncate="chunk",
         )
-        # 拼接文档切片与生成用例作为评审输入
-        content = f"[Document Chunk]\n{chunk_text}\n\n[Generated Cases]\n{cases}"
         # 调用 LLM 获取评审结果
-        result = self.llm_client.chat_completion(prompt, content).strip()
+        result = self.llm_client.chat_completion(
+            prompt, content, response_schema=VERDICT_SCHEMA
+        ).strip()
+        # 优先解析结构化结论，统一为 “Pass” 或 “Fail + [用例名] 修改项” 的紧凑文本
+        verdict = parse_verdict(result)
+        if verdict is not None:
+            return verdict
         normalized = result.lower() # 将结果转换为小写以便判定
         # 兼容大小写，判定通过或失败
         if "pass" in normalized and "fail" not in normalized:
@@ -38,3 +71,25 @@ class AgentJudge:
         # 未命中关键字则告警并视为失败
         self._logger.warning("Agent judge returned unexpected value: %s", result)
         return False, result
+
+
+def parse_verdict(text: str) -> Optional[Tuple[bool, str]]:
+    """解析结构化评审结论，返回（是否通过，紧凑反馈）；不是结构化结论时返回 None。"""
+
+    try:
+        data = json.loads(extract_json_payload(text))
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("pass"), bool):
+        return None
+    if data["pass"]:
+        return True, "Pass"
+    lines = ["Fail"]
+    for issue in data.get("issues") or []:
+        if isinstance(issue, dict):
+            fix = str(issue.get("fix") or "").strip()
+            if fix:
+                lines.append(f"[{str(issue.get('case') or 'all').strip()}] {fix}")
+        elif str(issue).strip():
+            lines.append(str(issue).strip())
+    return False, "\n".join(lines)
@@ -2,12 +2,20 @@
 
 from __future__ import annotations
 
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple
 
+from src.agent_core.feedback import FeedbackCondenser
 from src.agent_core.generator import AgentGenerator
 from src.agent_core.judge import AgentJudge
+from src.agent_core.prejudge import PreJudge
+from src.utils.case_normalizer import normalize_cases
+from src.utils.case_schema import validate_cases
 from src.utils.file_handler import read_yaml
 from src.utils.logger import get_logger
+from src.utils.tracer import span
 
 
 class AgentOrchestrator:
@@ -26,6 +34,35 @@ class AgentOrchestrator:
         self.judge = AgentJudge(settings_path=settings_path)
         # 当前模块名用于配置覆盖
         self.module_name = module_name
+        # 本地预评审（可选）：高置信度时跳过或延后 LLM 评审
+        prejudge_cfg = self.agent_cfg.get("prejudge", {}) or {}
+        self.prejudge: Optional[PreJudge] = None
+        if prejudge_cfg.get("enabled", False):
+            self.prejudge = PreJudge(prejudge_cfg)
+        self.accept_threshold = float(prejudge_cfg.get("accept_threshold", 1.0))
+        self.reject_threshold = float(prejudge_cfg.get("reject_threshold", 0.0))
+        self.judge_sample_rate = float(prejudge_cfg.get("judge_sample_rate", 0.0))
+        self.defer_judge = bool(prejudge_cfg.get("defer_judge", False))
+        self._audit_executor: Optional[ThreadPoolExecutor] = None
+        self._audits: List[Tuple[str, List[Dict[str, Any]], "Future[Tuple[bool, str]]"]] = []
+        # 多候选并行时多个线程可能同时提交抽检
+        self._audit_lock = threading.Lock()
+        # 多候选并行生成（可选）：以 token 换延迟
+        self.candidate_cfg = self.agent_cfg.get("candidates", {}) or {}
+        self.candidates_enabled = bool(self.candidate_cfg.get("enabled", False))
+        # 候选排序使用本地预评审置信度，未开启预评审时也单独实例化用于打分
+        self._scorer = self.prejudge or PreJudge(prejudge_cfg)
+        # 未通过结构校验的用例是否在评审前剔除
+        schema_cfg = self.settings.get("case_schema", {}) or {}
+        self.drop_invalid = bool(schema_cfg.get("drop_invalid", True))
+        # 生成 + 自检模式：一次调用返回用例与自检结论，仅在自检有缺口或抽中时调用外部评审
+        self_check_cfg = self.agent_cfg.get("self_check", {}) or {}
+        self.self_check = bool(self_check_cfg.get("enabled", False))
+        self.self_check_sample_rate = float(self_check_cfg.get("judge_sample_rate", 0.1))
+        # 评审反馈压缩：只把去重后的逐用例修改项按 token 预算带入下一轮
+        self.feedback_condenser = FeedbackCondenser(
+            self.agent_cfg.get("feedback", {}) or {}, model=self.generator.llm_client.model
+        )
 
     def run(self, chunk_text: str) -> Tuple[List[Dict[str, Any]], str]:
         """执行单个切片的 Agentic 循环并返回（用例列表，评审反馈）。"""
@@ -40,20 +77,180 @@ class AgentOrchestrator:
         for round_idx in range(1, max_rounds + 1):
             # 每轮：生成 -> 评审 -> 根据结果决定是否继续
             self._logger.info("Agentic round %s/%s", round_idx, max_rounds)
-            cases = self.generator.generate(chunk_text, feedback=feedback)
-            passed, review = self.judge.review(chunk_text, cases)
+            with span("agentic.round", {"round": round_idx, "max_rounds": max_rounds}) as round_span:
+                if self.candidates_enabled:
+                    cases, passed, review = self._run_candidates(chunk_text, feedback)
+                else:
+                    cases, passed, review = self._run_single(chunk_text, feedback)
+                round_span.set_attribute("cases", len(cases))
+                round_span.set_attribute("passed", passed)
             last_feedback = review
             if passed:
                 # 评审通过直接返回
                 return cases, review
-            # 评审未通过则将反馈带入下一轮
-            feedback = review
+            # 评审未通过则将压缩后的反馈带入下一轮（只替换不累加，每轮输入规模与首轮接近）
+            feedback = self.feedback_condenser.condense(review) or None
             if fail_fast:
                 # fail_fast 模式下首轮失败即退出
                 break
         # 轮次用尽或快速失败时返回最后一轮结果
         return cases, last_feedback
 
+    def _run_single(
+        self,
+        chunk_text: str,
+        feedback: Optional[str],
+        temperature: Optional[float] = None,
+        profile: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], bool, str]:
+        """生成一份候选并评审，返回（用例，是否通过，评审反馈）。"""
+        attrs = {"temperature": str(temperature), "profile": profile or "", "self_check": self.self_check}
+        gaps: List[str] = []
+        with span("agentic.generate", attrs):
+            if self.self_check:
+                cases, gaps = self.generator.generate_with_self_check(
+                    chunk_text, feedback=feedback, temperature=temperature, profile=profile
+                )
+            else:
+                cases = self.generator.generate(
+                    chunk_text, feedback=feedback, temperature=temperature, profile=profile
+                )
+        # 结构校验基于归一化后的结构，归一化可重复执行
+        cases = normalize_cases(cases)
+        valid, issues = validate_cases(cases)
+        if not valid:
+            # 没有任何可用用例（解析失败或结构全部不合法）时不必调用 LLM 评审
+            self._logger.info("Generated cases failed schema validation, skipping judge")
+            detail = issues or ["No parsable test cases were generated"]
+            return cases, False, "Fail\n" + "\n".join(detail)
+        if self.drop_invalid and issues:
+            self._logger.info("Dropped %s case(s) failing schema validation", len(cases) - len(valid))
+            cases = valid
+        if self.self_check:
+            if not gaps and random.random() >= self.self_check_sample_rate:
+                # 自检无缺口且未抽中抽检：省去外部评审
+                return cases, True, "Pass (self-check reported no gaps)"
+            if gaps:
+                self._logger.info("Self-check reported %s gap(s), calling judge: %s", len(gaps), gaps)
+        passed, review = self._review(chunk_text, cases)
+        return cases, passed, review
+
+    def _run_candidates(
+        self,
+        chunk_text: str,
+        feedback: Optional[str],
+    ) -> Tuple[List[Dict[str, Any]], bool, str]:
+        """
+        并行生成 N 份候选并同时评审，保留得分最高的一份。
+
+        排序依据：评审是否通过 > 本地预评审置信度 > 用例数量。
+        """
+        variants = self._candidate_variants()
+        results: List[Tuple[List[Dict[str, Any]], bool, str]] = []
+        with ThreadPoolExecutor(
+            max_workers=len(variants), thread_name_prefix="agent-candidate"
+        ) as executor:
+            futures = [
+                executor.submit(self._run_single, chunk_text, feedback, temperature, profile)
+                for temperature, profile in variants
+            ]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    # 单个候选失败不影响其他候选
+                    self._logger.warning("Agent candidate failed: %s", exc)
+        if not results:
+            raise RuntimeError("All agent candidates failed.")
+
+        def score(item: Tuple[List[Dict[str, Any]], bool, str]) -> Tuple[bool, float, int]:
+            cases, passed, _ = item
+            confidence, _ = self._scorer.assess(chunk_text, cases)
+            return passed, confidence, len(cases)
+
+        best = max(results, key=score)
+        self._logger.info(
+            "Selected best of %s candidates (passed=%s, cases=%s)",
+            len(results),
+            best[1],
+            len(best[0]),
+        )
+        return best
+
+    def _candidate_variants(self) -> List[Tuple[Optional[float], Optional[str]]]:
+        """按配置展开候选的（温度，模型档位），温度与档位列表循环复用。"""
+        count = max(int(self.candidate_cfg.get("count", 3)), 1)
+        temperatures = list(self.candidate_cfg.get("temperatures") or [])
+        profiles = list(self.candidate_cfg.get("profiles") or [])
+        variants: List[Tuple[Optional[float], Optional[str]]] = []
+        for idx in range(count):
+            temperature = float(temperatures[idx % len(temperatures)]) if temperatures else None
+            profile = str(profiles[idx % len(profiles)]) if profiles else None
+            variants.append((temperature, profile))
+        return variants
+
+    def drain_deferred(self) -> Dict[str, str]:
+        """
+        等待所有延后的评审抽检完成。
+
+        返回未通过的抽检 {切片输入: 评审反馈}；抽检出错同样视为未通过，
+        调用方据此将对应切片的用例标记为未验证。
+        """
+        with self._audit_lock:
+            audits, self._audits = self._audits, []
+            executor, self._audit_executor = self._audit_executor, None
+        failed: Dict[str, str] = {}
+        for chunk_text, cases, future in audits:
+            try:
+                passed, review = future.result()
+            except Exception as exc:
+                passed, review = False, f"Judge audit error: {exc}"
+            if not passed:
+                names = [str(case.get("name") or case.get("title") or "") for case in cases]
+                self._logger.warning("Deferred judge audit failed for %s: %s", names, review)
+                failed[chunk_text] = review
+        if executor is not None:
+            executor.shutdown(wait=True)
+        return failed
+
+    def _review(self, chunk_text: str, cases: List[Dict[str, Any]]) -> Tuple[bool, str]:
+        """评审用例：先本地预评审，按置信度决定跳过、抽检、延后或调用 LLM 评审。"""
+        if self.prejudge is None:
+            with span("agentic.judge"):
+                return self.judge.review(chunk_text, cases)
+
+        with span("agentic.prejudge") as pre_span:
+            confidence, issues = self.prejudge.assess(chunk_text, cases)
+            pre_span.set_attribute("confidence", round(confidence, 3))
+
+        if confidence >= self.accept_threshold:
+            summary = f"Pass (PreJudge accepted, confidence={confidence:.2f})"
+            # 未抽中抽检时直接接受，节省一次 LLM 评审
+            if random.random() >= self.judge_sample_rate:
+                return True, summary
+            if self.defer_judge:
+                # 抽检在后台执行，下一个切片的生成可以立即开始
+                self._submit_audit(chunk_text, cases)
+                return True, f"{summary}; judge audit deferred"
+        elif confidence < self.reject_threshold and issues:
+            # 结构问题明显时直接以本地问题作为反馈，省去一次 LLM 评审
+            self._logger.info("PreJudge rejected cases (confidence=%.2f)", confidence)
+            return False, "Fail\n" + "\n".join(issues)
+
+        with span("agentic.judge"):
+            return self.judge.review(chunk_text, cases)
+
+    def _submit_audit(self, chunk_text: str, cases: List[Dict[str, Any]]) -> None:
+        """提交后台评审抽检任务。"""
+        snapshot = list(cases)
+        with self._audit_lock:
+            if self._audit_executor is None:
+                self._audit_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="judge-audit"
+                )
+            future = self._audit_executor.submit(self.judge.review, chunk_text, snapshot)
+            self._audits.append((chunk_text, snapshot, future))
+
     def _resolve_max_rounds(self) -> int:
         """解析最大循环次数，支持按模块覆盖。"""
         # 默认轮次来自 agentic.max_rounds
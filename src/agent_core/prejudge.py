@@ -0,0 +1,92 @@
+"""本地预评审：在调用 LLM 评审前对用例做结构化快速检查。"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from src.utils.case_schema import HTTP_METHODS, check_case
+from src.utils.logger import get_logger
+
+# 文档中出现的接口路径，例如 /login、/password/{id}
+_DOC_PATH_RE = re.compile(r"(?<![\w:/.])/[A-Za-z0-9_\-./{}:]*[A-Za-z0-9_}]")
+# 路径参数占位符：{id} 或 :id
+_PATH_PARAM_RE = re.compile(r"\{[^/}]+\}|:[A-Za-z_]\w*")
+
+
+class PreJudge:
+    """
+    预评审 Agent：无需 LLM 的确定性检查。
+
+    检查项：
+    - 用例结构校验（见 src/utils/case_schema.py：必填字段、字段类型、方法与断言类型枚举）
+    - 方法在切片中出现
+    - URL 路径能与切片中声明的接口路径对应
+    """
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self._logger = get_logger(__name__)
+        self.min_cases = int(cfg.get("min_cases", 1))
+
+    def assess(self, chunk_text: str, cases: List[Dict[str, Any]]) -> Tuple[float, List[str]]:
+        """
+        评估归一化后的用例并返回（置信度 0~1，问题列表）。
+
+        置信度为所有检查项的通过比例；用例数不足时直接为 0。
+        """
+
+        if len(cases) < self.min_cases:
+            return 0.0, [f"Expected at least {self.min_cases} case(s), got {len(cases)}"]
+
+        doc_paths = self._compile_doc_paths(chunk_text)
+        doc_methods = {m for m in HTTP_METHODS if re.search(rf"\b{m}\b", chunk_text)}
+        issues: List[str] = []
+        checks = 0
+        passed = 0
+        for idx, case in enumerate(cases):
+            label = str(case.get("name") or case.get("title") or f"case_{idx}")
+            for ok, message in self._check_case(case, doc_paths, doc_methods):
+                checks += 1
+                if ok:
+                    passed += 1
+                else:
+                    issues.append(f"[{label}] {message}")
+        confidence = passed / checks if checks else 0.0
+        return confidence, issues
+
+    def _check_case(
+        self,
+        case: Dict[str, Any],
+        doc_paths: List["re.Pattern[str]"],
+        doc_methods: set,
+    ) -> List[Tuple[bool, str]]:
+        """对单条用例执行全部检查，返回（是否通过，说明）列表。"""
+
+        results = check_case(case)
+
+        method = str(case.get("method") or "").upper()
+        if doc_methods:
+            results.append((method in doc_methods, f"method '{method}' not found in document"))
+
+        url = str(case.get("url") or "")
+        if doc_paths:
+            path = urlsplit(url).path or url
+            matched = any(pattern.search(path) for pattern in doc_paths)
+            results.append((matched, f"url path '{path}' not declared in document"))
+        return results
+
+    def _compile_doc_paths(self, chunk_text: str) -> List["re.Pattern[str]"]:
+        """将切片中的接口路径编译为后缀匹配正则，路径参数匹配任意单段。"""
+
+        patterns: List["re.Pattern[str]"] = []
+        seen = set()
+        for raw in _DOC_PATH_RE.findall(chunk_text):
+            path = raw.rstrip("/.")
+            if not path or path in seen:
+                continue
+            seen.add(path)
+            parts = _PATH_PARAM_RE.split(path)
+            regex = "[^/]+".join(re.escape(part) for part in parts)
+            patterns.append(re.compile(f"{regex}/?$"))
+        return patterns
@@ -9,9 +9,13 @@ from __future__ import annotations
 import json
 from typing import Any
 
+from src.core.judge_service import get_judge_client
+from src.core.response_digest import summarize_for_judge
+from src.core.similarity_prefilter import SimilarityPrefilter
 from src.llm_client.openai_client import LLMClient
 from src.utils.file_handler import read_yaml
 from src.utils.logger import get_logger
+from src.utils.prompt_registry import get_prompt_registry
 
 
 class AIJudge:
@@ -26,8 +30,14 @@ class AIJudge:
     def __init__(self, settings_path: str = "config/settings.yaml") -> None:
         self._logger = get_logger(__name__)
         self.settings = read_yaml(settings_path)
-        self.prompts = read_yaml("config/prompt_templates.yaml")
+        self.prompts = get_prompt_registry()
         self.llm_client = LLMClient(settings_path=settings_path, module_name="ai_judge")
+        # 送入 LLM 的实际响应上限：超出时只保留相关字段与数组摘要
+        exec_cfg = self.settings.get("execution", {})
+        self.judge_max_chars = int(exec_cfg.get("judge_max_chars", 4000))
+        self.judge_array_sample = int(exec_cfg.get("judge_array_sample", 3))
+        # 本地向量相似度前置过滤：明确通过/失败的用例不调用 LLM
+        self.prefilter = SimilarityPrefilter(exec_cfg.get("similarity_prefilter"))
 
     def verify(
         self,
@@ -58,9 +68,35 @@ class AIJudge:
         if not use_ai_assertion:
             return self._heuristic_match(expected_result, actual_response)
 
-        # 3) 语义匹配：调用大模型
-        prompt = self.prompts.get("judge_prompt", "")
-        content = f"A(预期): {expected_result}\nB(实际): {actual_response}"
+        # 3) 语义匹配：调用大模型（多进程执行时交给共享判定服务，由服务按批做相似度前置过滤）
+        actual_digest = summarize_for_judge(
+            expected_result,
+            str(actual_response),
+            max_chars=self.judge_max_chars,
+            array_sample=self.judge_array_sample,
+        )
+        remote = get_judge_client()
+        if remote is not None:
+            try:
+                return remote.verdict(expected_result, actual_digest)
+            except (OSError, EOFError) as exc:
+                self._logger.warning("Judge service unavailable, judging locally: %s", exc)
+        decided = self.prefilter.decide([(expected_result, actual_digest)])[0]
+        if decided is not None:
+            return decided
+        return self.llm_verdict(expected_result, actual_digest)
+
+    def llm_verdict(self, expected_result: Any, actual_digest: str) -> bool:
+        """调用大模型判定预期与（已摘要的）实际响应是否一致。"""
+
+        # 超出上下文窗口时截断实际响应摘要
+        prompt, content = self.prompts.assemble(
+            "judge_prompt",
+            "ai_judge_input",
+            {"expected": expected_result, "actual": actual_digest},
+            client=self.llm_client,
+            truncate="actual",
+        )
         result = self.llm_client.chat_completion(prompt, content)
 
         # 4) 解析结果：只接受真/假
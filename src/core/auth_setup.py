@@ -7,7 +7,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import requests
 
@@ -34,14 +34,31 @@ class AuthSetup:
 
     def run(self) -> str:
         """执行登录获取 token 并落盘。"""
+        token = self.fetch_token()
+        # 写回配置
+        self.settings.setdefault("auth", {})["token"] = token
+        write_yaml(self.settings_path, self.settings)
+        self._logger.info("Token saved to settings.yaml")
+        # 将令牌写入原始文档中的占位符
+        token_prefix = self.settings.get("auth", {}).get("token_prefix", "Bearer ")
+        raw_docs_dir = Path(self.settings.get("paths", {}).get("raw_docs_dir", "data/raw_docs"))
+        self._replace_token_in_docs(raw_docs_dir, f"{token_prefix}{token}")
+        return token
+
+    def fetch_token(self, auth_cfg: Optional[Dict[str, Any]] = None) -> str:
+        """
+        发起登录请求并返回 token（不落盘）。
+
+        auth_cfg 未指定时使用 settings.auth；多环境执行时传入合并后的环境鉴权配置。
+        """
         # 读取认证配置
-        auth_cfg = self.settings.get("auth", {})
+        if auth_cfg is None:
+            auth_cfg = self.settings.get("auth", {})
         login_url = auth_cfg.get("login_url")
         username = auth_cfg.get("username")
         password = auth_cfg.get("password")
         headers = auth_cfg.get("headers", {})
         token_path = auth_cfg.get("token_json_path", "data.token")
-        token_prefix = auth_cfg.get("token_prefix", "Bearer ")
         # 基本配置校验
         if not login_url or not username or not password:
             raise ValueError("Auth config missing login_url/username/password.")
@@ -54,13 +71,6 @@ class AuthSetup:
         token = self._extract_token(response.json(), token_path)
         if not token:
             raise ValueError("Token not found in login response.")
-        # 写回配置
-        self.settings.setdefault("auth", {})["token"] = token
-        write_yaml(self.settings_path, self.settings)
-        self._logger.info("Token saved to settings.yaml")
-        # 将令牌写入原始文档中的占位符
-        raw_docs_dir = Path(self.settings.get("paths", {}).get("raw_docs_dir", "data/raw_docs"))
-        self._replace_token_in_docs(raw_docs_dir, f"{token_prefix}{token}")
         return token
 
     def _extract_token(self, data: Dict[str, Any], path: str) -> str:
@@ -1,27 +1,39 @@
 """基于大模型的用例生成器。
 
 外部库：
-- 容错解析库：用于解析模型输出的结构化数据。
+- 容错解析库：用于解析模型输出的结构化数据（仅在严格解析失败时导入）。
 """
 
 from __future__ import annotations
 
 import json
+import os
 import re
+import socket
+import subprocess
+import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any, List, Optional
 
-import json5
-
 from src.agent_core.orchestration import AgentOrchestrator
 from src.core.doc_parser import load_documents
+from src.core.work_queue import DONE, ENV_QUEUE_RUN, WorkQueue, job_id, run_key
 from src.rag_core.doc_slicer import DocSlicer
+from src.rag_core.endpoint_index import EndpointIndex, describe_endpoints, skeleton_cases
+from src.rag_core.relevance import RelevanceScorer
+from src.rag_core.retrieval import ChunkIndex
 from src.llm_client.openai_client import LLMClient
-from src.utils.file_handler import read_yaml, write_json
-from src.utils.global_vars import format_global_context, load_global_vars
+from src.utils.case_normalizer import normalize_cases
+from src.utils.case_schema import CASES_RESPONSE_SCHEMA, unwrap_cases, validate_cases
+from src.utils.file_handler import batched_fsync, read_text, read_yaml, write_json, write_jsonl
+from src.utils.global_vars import flatten_vars, format_global_context, load_global_vars
 from src.utils.json_parser import extract_json_payload
 from src.utils.logger import get_logger
+from src.utils.prompt_registry import get_prompt_registry
+from src.utils.token_counter import estimate_tokens, truncate_to_tokens
+from src.utils.tracer import span, traced
 
 
 # 匹配代码块中的结构化输出
@@ -44,7 +56,7 @@ class CaseGenerator:
         # 初始化日志、配置、提示词与路径
         self._logger = get_logger(__name__)
         self.settings = read_yaml(settings_path)
-        self.prompts = read_yaml("config/prompt_templates.yaml")
+        self.prompts = get_prompt_registry()
         self.settings_path = settings_path
         self.raw_docs_dir = self.settings.get("paths", {}).get("raw_docs_dir", "data/raw_docs")
         self.test_cases_dir = Path(
@@ -56,6 +68,15 @@ class CaseGenerator:
         self.llm_client = LLMClient(settings_path=settings_path, module_name="case_generator")
         self.rag_cfg = self.settings.get("rag", {})
         self.agent_cfg = self.settings.get("agentic", {})
+        self.endpoint_cfg = self.settings.get("endpoint_index", {}) or {}
+        # 是否经持久化工作队列生成（监听模式下强制开启，未变化的切片直接复用结果）
+        self.use_work_queue = bool((self.settings.get("work_queue", {}) or {}).get("enabled", False))
+        # 是否丢弃队列中已完成的结果并重新生成（run.py --fresh）
+        self.fresh = False
+        # 文档解析得到的接口索引（endpoint_index.enabled 时在生成前构建）
+        self.endpoint_index: Optional[EndpointIndex] = None
+        # 切片检索索引（rag.retrieval.enabled 时在切片后构建）
+        self.chunk_index: Optional[ChunkIndex] = None
 
     def generate_cases(self, doc_path: Optional[str] = None) -> List[dict[str, Any]]:
         """
@@ -73,27 +94,44 @@ class CaseGenerator:
             raise ValueError("No document content found to generate cases.")
         # 读取并格式化全局变量上下文
         global_vars = load_global_vars(self.settings)
-        global_context = format_global_context(global_vars)
-        # 按配置决定是否启用 RAG 与 Agentic 循环
-        rag_enabled = bool(self.rag_cfg.get("enabled", False))
-        agentic_enabled = bool(self.agent_cfg.get("enabled", False))
-        # 选择不同生成路径
-        if rag_enabled:
-            cases = self._generate_with_rag(content, global_context, agentic_enabled)
-        else:
-            # 获取生成提示词并发起调用
-            generation_prompt = self.prompts.get("generation_prompt", "")
-            payload = self._merge_context(global_context, content)
-            llm_output = self.llm_client.chat_completion(generation_prompt, payload)
-            json_payload = self._extract_json(llm_output)
-            cases = self._normalize_cases(self._parse_json(json_payload))
-        # 非按切片输出时，统一写入一个用例文件
-        if not rag_enabled or not self.rag_cfg.get("output_per_chunk", False):
-            # 输出文件命名：按文档名或合并策略
-            filename = self._build_output_filename(paths, doc_path)
-            output_path = self.test_cases_dir / filename
-            write_json(str(output_path), cases)
-            self._logger.info("Generated cases saved to %s", output_path)
+        template_mode = bool(self.settings.get("global_vars", {}).get("template_mode", False))
+        global_context = format_global_context(global_vars, template_mode=template_mode)
+        # 本次生成的全部用例文件在结束时统一刷盘
+        with batched_fsync():
+            # 确定性解析接口索引，按需写出骨架用例
+            if self.endpoint_cfg.get("enabled", False):
+                self._build_endpoint_index(paths, global_vars, template_mode)
+            # 按配置决定是否启用 RAG 与 Agentic 循环
+            rag_enabled = bool(self.rag_cfg.get("enabled", False))
+            agentic_enabled = bool(self.agent_cfg.get("enabled", False))
+            # 选择不同生成路径
+            if rag_enabled:
+                cases = self._generate_with_rag(content, global_context, agentic_enabled, paths)
+            elif self.use_work_queue:
+                # 未启用 RAG 时每个文档一个队列任务：内容与生成配置未变化的文档直接复用结果
+                documents = [
+                    {"index": idx, "title": path.name, "content": read_text(str(path)).strip()}
+                    for idx, path in enumerate(paths)
+                ]
+                queue_cfg = self.settings.get("work_queue", {}) or {}
+                cases = self._generate_with_queue(
+                    [doc for doc in documents if doc["content"]], global_context, False, queue_cfg
+                )
+            else:
+                # 组装生成提示词并发起调用
+                payload = self._merge_context(global_context, self._with_endpoint_hint(content))
+                generation_prompt, payload = self._assemble_generation(payload)
+                llm_output = self.llm_client.chat_completion(
+                    generation_prompt, payload, response_schema=CASES_RESPONSE_SCHEMA
+                )
+                json_payload = self._extract_json(llm_output)
+                cases = self._validate_cases(self._normalize_cases(self._parse_json(json_payload)))
+            # 非按切片输出时，统一写入一个用例文件
+            if not self._output_per_chunk():
+                # 输出文件命名：按文档名或合并策略
+                filename = self._build_output_filename(paths, doc_path)
+                output_path = self._write_cases(filename, cases)
+                self._logger.info("Generated cases saved to %s", output_path)
         return cases
 
     def _generate_with_rag(
@@ -101,15 +139,21 @@ class CaseGenerator:
         content: str,
         global_context: str,
         agentic_enabled: bool,
+        paths: Optional[List[Path]] = None,
     ) -> List[dict[str, Any]]:
-        """检索增强切片 + 代理循环生成。"""
-        # 切片文档并准备编排器
+        """检索增强切片 + 代理循环生成；paths 为本次生成的来源文档（检索索引按来源分区）。"""
+        # 切片文档并筛选参与生成的切片
         header_levels = self.rag_cfg.get("header_levels", [1, 2])
         slicer = DocSlicer(header_levels=header_levels)
         chunks = slicer.slice_text(content)
-        all_cases: List[dict[str, Any]] = []
-        orchestrator = AgentOrchestrator(self.settings_path)
-        # 遍历切片逐段生成用例
+        # 检索索引覆盖全部切片：被过滤的鉴权说明、错误码表等仍可作为相关上下文
+        retrieval_cfg = self.rag_cfg.get("retrieval", {}) or {}
+        if retrieval_cfg.get("enabled", False):
+            self._build_chunk_index(chunks, retrieval_cfg, paths or [])
+        # 本地相关性打分：过滤概述/更新日志/错误码表等非接口切片，节省 LLM 调用
+        relevance_cfg = self.rag_cfg.get("relevance", {}) or {}
+        scorer = RelevanceScorer(relevance_cfg)
+        selected: List[dict[str, Any]] = []
         for chunk in chunks:
             chunk_text = chunk.get("content", "")
             if not chunk_text.strip():
@@ -117,28 +161,377 @@ class CaseGenerator:
             if not self._is_relevant_chunk(chunk):
                 self._logger.info("Skipping non-interface chunk: %s", chunk.get("title"))
                 continue
-            payload = self._merge_context(global_context, chunk_text)
-            # 选择 Agentic 循环或直接生成
-            if agentic_enabled:
-                cases, feedback = orchestrator.run(payload) # 直接跳到 Agent 循环，获取最终用例与评审反馈
-                if feedback:
-                    self._logger.info("Agent judge feedback: %s", feedback)
-            else:
-                generation_prompt = self.prompts.get("generation_prompt", "")
-                llm_output = self.llm_client.chat_completion(generation_prompt, payload)
-                json_payload = self._extract_json(llm_output)
-                cases = self._parse_json(json_payload)
-            # 归一化字段结构并按需写出切片文件
-            cases = self._normalize_cases(cases)
-            if self.rag_cfg.get("output_per_chunk", False):
-                title = str(chunk.get("title") or "chunk")
-                filename = self._safe_chunk_filename(title, chunk.get("index", 0))
-                output_path = self.test_cases_dir / filename
-                write_json(str(output_path), cases)
-                self._logger.info("Generated cases saved to %s", output_path)
+            if scorer.enabled and not scorer.is_relevant(chunk):
+                continue
+            selected.append(chunk)
+        if scorer.enabled:
+            summary = scorer.report()
+            report_file = relevance_cfg.get("report_file")
+            if report_file:
+                write_json(str(report_file), summary)
+        # 持久化工作队列：切片任务入队，可中断续跑、失败重试与多进程消费
+        queue_cfg = self.settings.get("work_queue", {}) or {}
+        if self.use_work_queue:
+            return self._generate_with_queue(selected, global_context, agentic_enabled, queue_cfg)
+
+        all_cases: List[dict[str, Any]] = []
+        generated: List[tuple[dict[str, Any], str, List[dict[str, Any]]]] = []
+        orchestrator = AgentOrchestrator(self.settings_path)
+        # 遍历切片逐段生成用例
+        for chunk in selected:
+            # 切片级 span：子阶段（轮次/LLM 调用/解析/写盘）自动继承切片属性
+            with span("chunk", self._chunk_attrs(chunk)) as chunk_span:
+                payload = self._chunk_payload(chunk, global_context)
+                cases = self._generate_chunk(chunk, payload, agentic_enabled, orchestrator)
+                chunk_span.set_attribute("cases", len(cases))
+            generated.append((chunk, payload, cases))
             all_cases.extend(cases)
+        # 等待延后的评审抽检完成（仅开启 prejudge.defer_judge 时存在），未通过的切片用例标记为未验证
+        if agentic_enabled:
+            failed = orchestrator.drain_deferred()
+            for chunk, payload, cases in generated:
+                if payload in failed:
+                    self._mark_unverified(chunk, cases, failed[payload])
         return all_cases
 
+    def _generate_with_queue(
+        self,
+        chunks: List[dict[str, Any]],
+        global_context: str,
+        agentic_enabled: bool,
+        queue_cfg: dict[str, Any],
+    ) -> List[dict[str, Any]]:
+        """
+        经持久化工作队列生成：任务 ID 为切片（未启用 RAG 时为整篇文档）输入的哈希，已完成的任务直接复用结果。
+
+        work_queue.workers > 1 时额外启动工作进程，与当前进程一起从同一队列领取任务。
+        """
+        # 生成配置指纹并入任务 ID：提示词、模型或 Agentic 设置变化后不复用旧结果
+        fingerprint = self._generation_fingerprint(agentic_enabled)
+        jobs = [
+            {
+                "index": chunk.get("index", 0),
+                "title": str(chunk.get("title") or ""),
+                "payload": self._chunk_payload(chunk, global_context),
+                "agentic": agentic_enabled,
+                "fingerprint": fingerprint,
+            }
+            for chunk in chunks
+        ]
+        items = [(job_id(job), job) for job in jobs]
+        run = run_key([item_id for item_id, _ in items])
+        queue = WorkQueue(self._work_queue_path(), queue_cfg)
+        try:
+            if self.fresh:
+                removed = queue.discard([item_id for item_id, _ in items])
+                self._logger.info("Fresh run: discarded %s queued chunk job(s)", removed)
+            counts = queue.enqueue(run, items)
+            self._logger.info(
+                "Work queue: %s chunk job(s), %s already done", len(items), counts[DONE]
+            )
+            extra = max(int(queue_cfg.get("workers", 1)), 1) - 1
+            processes = self._spawn_queue_workers(run, extra) if counts[DONE] < len(items) else []
+            try:
+                self.drain_queue(queue, run)
+            finally:
+                for process in processes:
+                    process.wait()
+            for job, error in queue.failures(run):
+                self._logger.error(
+                    "Chunk job failed after retries: %s (%s); rerun to retry", job.get("title"), error
+                )
+            results = queue.results(run)
+        finally:
+            queue.close()
+        return [case for cases in results for case in cases]
+
+    def drain_queue(self, queue: WorkQueue, run: str) -> None:
+        """循环领取并处理本次运行的任务，直到没有待处理或处理中的任务。"""
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        orchestrator: Optional[AgentOrchestrator] = None
+        # 已完成的 Agentic 任务：延后抽检未通过时需要更新已保存的结果
+        completed: List[tuple[Any, List[dict[str, Any]]]] = []
+        while True:
+            job = queue.claim(run, worker)
+            if job is None:
+                wait = queue.next_ready_in(run)
+                if wait is None:
+                    break
+                # 其他进程处理中或退避未到期：短暂等待后再领取
+                time.sleep(min(max(wait, 0.05), 1.0))
+                continue
+            chunk = job.payload
+            agentic_enabled = bool(chunk.get("agentic"))
+            if agentic_enabled and orchestrator is None:
+                orchestrator = AgentOrchestrator(self.settings_path)
+            with span("chunk", self._chunk_attrs(chunk)) as chunk_span:
+                try:
+                    cases = self._generate_chunk(
+                        chunk, chunk["payload"], agentic_enabled, orchestrator
+                    )
+                except Exception as exc:
+                    retry = queue.fail(job, str(exc))
+                    self._logger.warning(
+                        "Chunk job %s failed (attempt %s, %s): %s",
+                        chunk.get("title"),
+                        job.attempts,
+                        "will retry" if retry else "giving up",
+                        exc,
+                    )
+                    continue
+                chunk_span.set_attribute("cases", len(cases))
+            queue.complete(job, cases)
+            if agentic_enabled:
+                completed.append((job, cases))
+        if orchestrator is not None:
+            failed = orchestrator.drain_deferred()
+            for job, cases in completed:
+                chunk = job.payload
+                if chunk["payload"] in failed:
+                    self._mark_unverified(chunk, cases, failed[chunk["payload"]])
+                    queue.complete(job, cases)
+
+    def run_queue_worker(self) -> None:
+        """工作进程入口：按环境变量中的运行标识消费队列。"""
+        run = os.environ.get(ENV_QUEUE_RUN)
+        if not run:
+            raise ValueError(f"{ENV_QUEUE_RUN} is not set; queue workers are started by the generator.")
+        queue = WorkQueue(self._work_queue_path(), self.settings.get("work_queue", {}) or {})
+        try:
+            with batched_fsync():
+                self.drain_queue(queue, run)
+        finally:
+            queue.close()
+
+    def _spawn_queue_workers(self, run: str, count: int) -> List[subprocess.Popen]:
+        """启动额外的队列工作进程（经 run.py --queue-worker）。"""
+        if count <= 0:
+            return []
+        env = dict(os.environ)
+        env[ENV_QUEUE_RUN] = run
+        entry = Path(__file__).resolve().parents[2] / "run.py"
+        self._logger.info("Starting %s additional queue worker process(es)", count)
+        return [
+            subprocess.Popen([sys.executable, str(entry), "--queue-worker"], env=env)
+            for _ in range(count)
+        ]
+
+    def _generation_fingerprint(self, agentic_enabled: bool) -> str:
+        """
+        生成配置指纹：生成（及评审）提示词原文、模型与档位、Agentic 设置（含自检与多候选）。
+
+        指纹写入队列任务，任一项变化时任务 ID 随之变化，重跑不会复用旧配置生成的结果。
+        """
+        if agentic_enabled:
+            prompt_names: List[Any] = [
+                ("agent_generation_prompt", "generation_prompt"),
+                ("agent_self_check_prompt", "agent_generation_prompt"),
+                "agent_generation_input",
+                "agent_generation_feedback_input",
+                ("agent_judge_prompt", "judge_prompt"),
+                "agent_judge_input",
+            ]
+            clients = [
+                LLMClient(settings_path=self.settings_path, module_name=name)
+                for name in ("agent_generator", "agent_judge")
+            ]
+        else:
+            prompt_names = ["generation_prompt", "generation_input"]
+            clients = [self.llm_client]
+        # 多候选按档位生成：档位对应的模型同样计入
+        profiles = self.settings.get("llm_profiles", {}) or {}
+        candidate_profiles = (self.agent_cfg.get("candidates", {}) or {}).get("profiles") or []
+        return job_id(
+            {
+                "prompts": [self.prompts.text(name) for name in prompt_names],
+                "models": [
+                    [client.profile_name, client.model, client.structured_output] for client in clients
+                ],
+                "candidate_models": [
+                    (profiles.get(str(name)) or {}).get("model", str(name)) for name in candidate_profiles
+                ],
+                "agentic": self.agent_cfg if agentic_enabled else None,
+                "case_schema": self.settings.get("case_schema", {}) or {},
+            }
+        )
+
+    def _work_queue_path(self) -> str:
+        return str(
+            self.settings.get("paths", {}).get("work_queue_file", ".autollm/work_queue.sqlite3")
+        )
+
+    def _chunk_attrs(self, chunk: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "chunk.index": chunk.get("index", 0),
+            "chunk.title": str(chunk.get("title") or ""),
+        }
+
+    def _chunk_payload(self, chunk: dict[str, Any], global_context: str) -> str:
+        """切片的生成输入：全局变量上下文 + 切片内容 + 目标接口提示 + 相关文档片段。"""
+        return self._merge_context(
+            global_context,
+            self._with_related_context(chunk, self._with_endpoint_hint(chunk.get("content", ""))),
+        )
+
+    def _build_chunk_index(
+        self,
+        chunks: List[dict[str, Any]],
+        cfg: dict[str, Any],
+        paths: List[Path],
+    ) -> None:
+        """构建（或复用已持久化的）本次来源文档的切片检索索引，其他文档的索引分区保持不变。"""
+        index_path = self.settings.get("paths", {}).get(
+            "retrieval_index_file", ".autollm/retrieval_index.json"
+        )
+        # 监听模式下跨调用复用同一索引对象，只替换本次来源文档的分区
+        if self.chunk_index is None:
+            self.chunk_index = ChunkIndex(
+                str(index_path), k1=float(cfg.get("k1", 1.5)), b=float(cfg.get("b", 0.75))
+            )
+        source = "\n".join(sorted(str(path) for path in paths))
+        indexed = [chunk for chunk in chunks if str(chunk.get("content") or "").strip()]
+        self.chunk_index.build(indexed, source)
+
+    def _with_related_context(self, chunk: dict[str, Any], content: str) -> str:
+        """在切片内容后追加检索到的相关文档片段，总长度不超过 rag.retrieval.max_tokens。"""
+        if self.chunk_index is None:
+            return content
+        cfg = self.rag_cfg.get("retrieval", {}) or {}
+        related = self.chunk_index.related(
+            chunk,
+            top_k=int(cfg.get("top_k", 3)),
+            min_ratio=float(cfg.get("min_ratio", 0.2)),
+        )
+        budget = int(cfg.get("max_tokens", 800))
+        model = self.llm_client.model
+        snippets: List[str] = []
+        for item in related:
+            if budget < 32:
+                break
+            snippet = truncate_to_tokens(
+                f"### {item.get('title') or ''}\n{str(item.get('content') or '').strip()}", budget, model
+            )
+            budget -= estimate_tokens(snippet, model)
+            snippets.append(snippet)
+        if not snippets:
+            return content
+        self._logger.debug("Attached %s related snippet(s) to chunk %s", len(snippets), chunk.get("title"))
+        header = "相关文档片段（仅作为鉴权、错误码、数据模型等上下文参考，不要为其中的接口生成用例）："
+        return f"{content}\n\n{header}\n" + "\n\n".join(snippets)
+
+    def _generate_chunk(
+        self,
+        chunk: dict[str, Any],
+        payload: str,
+        agentic_enabled: bool,
+        orchestrator: Optional[AgentOrchestrator],
+    ) -> List[dict[str, Any]]:
+        """为单个切片生成、归一化并按需写出用例。"""
+        # 选择 Agentic 循环或直接生成
+        if agentic_enabled and orchestrator is not None:
+            cases, feedback = orchestrator.run(payload) # 直接跳到 Agent 循环，获取最终用例与评审反馈
+            if feedback:
+                self._logger.info("Agent judge feedback: %s", feedback)
+        else:
+            generation_prompt, payload = self._assemble_generation(payload)
+            llm_output = self.llm_client.chat_completion(
+                generation_prompt, payload, response_schema=CASES_RESPONSE_SCHEMA
+            )
+            json_payload = self._extract_json(llm_output)
+            cases = self._parse_json(json_payload)
+        # 归一化字段结构、结构校验并按需写出切片文件
+        cases = self._validate_cases(self._normalize_cases(cases))
+        if self._output_per_chunk():
+            title = str(chunk.get("title") or "chunk")
+            filename = self._safe_chunk_filename(title, chunk.get("index", 0))
+            output_path = self._write_cases(filename, cases)
+            self._logger.info("Generated cases saved to %s", output_path)
+        return cases
+
+    def _output_per_chunk(self) -> bool:
+        """是否按切片写出用例文件（仅 RAG 切片生成时生效，队列中的整篇文档任务不单独输出）。"""
+        return bool(self.rag_cfg.get("enabled", False)) and bool(
+            self.rag_cfg.get("output_per_chunk", False)
+        )
+
+    def _mark_unverified(
+        self,
+        chunk: dict[str, Any],
+        cases: List[dict[str, Any]],
+        review: str,
+    ) -> None:
+        """延后评审抽检未通过：切片用例标记 review_status=unverified，并重写已输出的切片文件。"""
+        for case in cases:
+            case["review_status"] = "unverified"
+        self._logger.warning(
+            "Marked %s case(s) of chunk %s as unverified: %s", len(cases), chunk.get("title"), review
+        )
+        if cases and self._output_per_chunk():
+            title = str(chunk.get("title") or "chunk")
+            self._write_cases(self._safe_chunk_filename(title, chunk.get("index", 0)), cases)
+
+    def _assemble_generation(self, content: str) -> tuple[str, str]:
+        """组装直接生成的（系统提示词，用户输入），超出上下文窗口时截断文档内容。"""
+        return self.prompts.assemble(
+            "generation_prompt",
+            "generation_input",
+            {"content": content},
+            client=self.llm_client,
+            truncate="content",
+        )
+
+    def _build_endpoint_index(
+        self,
+        paths: List[Path],
+        global_vars: dict[str, Any],
+        template_mode: bool,
+    ) -> None:
+        """构建并持久化接口索引；开启 skeleton_cases 时为每个文档写出骨架用例。"""
+        index_path = self.settings.get("paths", {}).get(
+            "endpoint_index_file", ".autollm/endpoint_index.json"
+        )
+        # 索引按文档增量更新：只重新解析本次文档，其他文档的接口保持不变（监听模式下跨调用复用）
+        if self.endpoint_index is None:
+            self.endpoint_index = EndpointIndex(str(index_path))
+        self.endpoint_index.build(paths)
+        self.endpoint_index.save()
+        if not self.endpoint_cfg.get("skeleton_cases", False):
+            return
+        # 模板模式下骨架用例同样使用占位符
+        flat = flatten_vars(global_vars)
+        if template_mode:
+            known = {
+                name: f"{{{{{name}}}}}"
+                for name, value in flat.items()
+                if not isinstance(value, (dict, list))
+            }
+            base_url = "{{base_url}}" if "base_url" in flat else ""
+        else:
+            known = flat
+            base_url = str(flat.get("base_url") or "")
+        for path in paths:
+            endpoints = self.endpoint_index.for_source(str(path))
+            if not endpoints:
+                continue
+            output_path = self._write_cases(
+                f"{path.stem}_skeleton_cases.json", skeleton_cases(endpoints, base_url, known)
+            )
+            self._logger.info(
+                "Skeleton cases for %s endpoint(s) saved to %s", len(endpoints), output_path
+            )
+
+    def _with_endpoint_hint(self, content: str) -> str:
+        """在文档内容后追加解析得到的目标接口；已有骨架用例时提示模型只补充异常与边界用例。"""
+        if self.endpoint_index is None or not self.endpoint_cfg.get("target_hint", True):
+            return content
+        endpoints = self.endpoint_index.for_text(content)
+        if not endpoints:
+            return content
+        hint = describe_endpoints(endpoints)
+        if self.endpoint_cfg.get("skeleton_cases", False):
+            hint += "\n以上接口的基础正向用例已自动生成，请只补充异常、边界与权限相关用例。"
+        return f"{content}\n\n{hint}"
+
     def _is_relevant_chunk(self, chunk: dict[str, Any]) -> bool:
         """判断切片是否应参与用例生成。"""
         # 基于长度与关键字进行过滤
@@ -159,6 +552,24 @@ class CaseGenerator:
             return any(str(keyword).lower() in haystack for keyword in include_keywords)
         return True
 
+    def _write_cases(self, filename: str, cases: List[dict[str, Any]]) -> Path:
+        """
+        原子写出用例文件并返回实际路径。
+
+        paths.case_format 为 jsonl 时写为 JSON Lines（扩展名改为 .jsonl），体积更小、加载更快；
+        切换格式时删除同名的另一种格式文件，避免同一批用例被重复加载。
+        """
+        output_path = self.test_cases_dir / filename
+        stale_path = output_path.with_suffix(".jsonl")
+        if str(self.settings.get("paths", {}).get("case_format", "json")).lower() == "jsonl":
+            output_path, stale_path = stale_path, output_path
+            write_jsonl(str(output_path), cases)
+        else:
+            write_json(str(output_path), cases)
+        if stale_path.exists():
+            stale_path.unlink()
+        return output_path
+
     def _merge_context(self, global_context: str, content: str) -> str:
         # 将全局变量上下文拼接到文档内容前
         if not global_context:
@@ -174,45 +585,20 @@ class CaseGenerator:
 
     def _normalize_cases(self, cases: List[dict[str, Any]]) -> List[dict[str, Any]]:
         """将模型输出归一化为执行器期望的结构。"""
-        # 过滤非 dict 元素并逐条归一化
-        normalized: List[dict[str, Any]] = []
-        for case in cases:
-            if not isinstance(case, dict):
-                continue
-            normalized.append(self._normalize_case(case))
-        return normalized
-
-    def _normalize_case(self, case: dict[str, Any]) -> dict[str, Any]:
-        """展开请求包裹结构，并映射常见字段别名。"""
-        # 兼容 request 包裹结构
-        request = case.get("request")
-        if isinstance(request, dict):
-            if "url" not in case and "url" in request:
-                case["url"] = request.get("url")
-            if "method" not in case and "method" in request:
-                case["method"] = request.get("method")
-            if "headers" not in case and "headers" in request:
-                case["headers"] = request.get("headers")
-            params = request.get("params")
-            if params is None:
-                params = request.get("query")
-            if params is None:
-                params = request.get("query_params")
-            if "params" not in case and params is not None:
-                case["params"] = params
-            body = request.get("data")
-            if body is None:
-                body = request.get("body")
-            if body is None:
-                body = request.get("json")
-            if "data" not in case and body is not None:
-                case["data"] = body
-            case.pop("request", None)
-        # 兼容 body 字段别名
-        if "data" not in case and "body" in case:
-            case["data"] = case.pop("body")
-        return case
+        return normalize_cases(cases)
 
+    def _validate_cases(self, cases: List[dict[str, Any]]) -> List[dict[str, Any]]:
+        """按用例结构校验，记录问题；开启 case_schema.drop_invalid 时剔除不合法用例。"""
+        valid, issues = validate_cases(cases)
+        if not issues:
+            return cases
+        for issue in issues:
+            self._logger.warning("Case schema violation: %s", issue)
+        if (self.settings.get("case_schema", {}) or {}).get("drop_invalid", True):
+            return valid
+        return cases
+
+    @traced("CaseGenerator._extract_json")
     def _extract_json(self, llm_output: str) -> str:
         """
         从模型输出中提取纯结构化字符串。
@@ -225,6 +611,7 @@ class CaseGenerator:
         # 回退到通用 JSON 抽取逻辑
         return extract_json_payload(llm_output.strip())
 
+    @traced("CaseGenerator._parse_json")
     def _parse_json(self, payload: str) -> List[dict[str, Any]]:
         """
         将结构化字符串解析为 Python 对象。
@@ -235,10 +622,14 @@ class CaseGenerator:
             data = json.loads(payload)
         except json.JSONDecodeError:
             try:
+                import json5
+
                 data = json5.loads(payload)
             except Exception as exc:
                 self._logger.warning("Failed to parse JSON payload: %s", exc)
                 return []
+        # 结构化输出时用例数组包裹在 {"cases": [...]} 中
+        data = unwrap_cases(data)
         if isinstance(data, dict):
             return [data]
         if isinstance(data, list):
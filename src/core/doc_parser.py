@@ -7,8 +7,10 @@ from typing import List, Optional, Tuple
 
 from src.utils.file_handler import read_text
 from src.utils.logger import get_logger
+from src.utils.tracer import traced
 
 
+@traced("load_documents")
 def load_documents(raw_docs_dir: str, doc_path: Optional[str] = None) -> Tuple[str, List[Path]]:
     """
     读取接口文档内容。
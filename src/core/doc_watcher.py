@@ -0,0 +1,104 @@
+"""文档目录监听：轮询文件修改时间与大小，发现变更后回调。
+
+说明：
+- 每轮只对目录做一次 scandir 与 stat，不读取文件内容，开销与文件数成正比
+- 变更后等待文件状态稳定（两次快照一致）再回调，避免编辑器分多次写入时重复触发
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+# 与 load_documents 读取的格式一致
+DOC_SUFFIXES = (".md", ".txt")
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+class DocWatcher:
+    """
+    轮询式文档监听器。
+
+    参数：
+    - directory: 监听目录
+    - interval: 轮询间隔（秒）
+    - debounce: 发现变更后等待文件稳定的间隔（秒）
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        interval: float = 1.0,
+        debounce: float = 0.5,
+        suffixes: Iterable[str] = DOC_SUFFIXES,
+    ) -> None:
+        self._logger = get_logger(__name__)
+        self.directory = Path(directory)
+        self.interval = max(float(interval), 0.05)
+        self.debounce = max(float(debounce), 0.0)
+        self.suffixes = tuple(suffixes)
+        self._snapshot = self.snapshot()
+
+    def snapshot(self) -> Snapshot:
+        """目录下文档的（修改时间纳秒，大小）快照。"""
+
+        result: Snapshot = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return result
+        for entry in entries:
+            if not entry.name.endswith(self.suffixes):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.is_file():
+                result[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def poll(self) -> List[Path]:
+        """对比上次快照，返回新增或修改的文档（删除的文档只记录日志）。"""
+
+        current = self.snapshot()
+        if current == self._snapshot:
+            return []
+        # 等待写入完成：状态稳定后再比较
+        while self.debounce:
+            time.sleep(self.debounce)
+            settled = self.snapshot()
+            if settled == current:
+                break
+            current = settled
+        changed = sorted(
+            Path(path) for path, state in current.items() if self._snapshot.get(path) != state
+        )
+        for path in sorted(set(self._snapshot) - set(current)):
+            self._logger.info("Document removed: %s", path)
+        self._snapshot = current
+        return changed
+
+    def watch(
+        self,
+        on_change: Callable[[List[Path]], None],
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """持续轮询直到 stop 被设置或收到中断信号。"""
+
+        self._logger.info("Watching %s for document changes", self.directory)
+        try:
+            while stop is None or not stop.is_set():
+                changed = self.poll()
+                if changed:
+                    self._logger.info("Documents changed: %s", ", ".join(str(p) for p in changed))
+                    on_change(changed)
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            self._logger.info("Watch stopped")
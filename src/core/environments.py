@@ -0,0 +1,101 @@
+"""多环境执行：同一批用例按环境档位（base_url / 鉴权 / 全局变量）分别执行。
+
+约定：
+- 环境档位在 settings.environments 下按名称配置
+- 每个环境的结果文件、执行状态与汇总页写入独立分区，例如 results.env-dev.jsonl
+- 模板模式的用例通过 {{base_url}} 等占位符切换环境；
+  写死地址的用例若以默认 base_url 开头，则替换为环境的 base_url
+"""
+
+from __future__ import annotations
+
+import copy
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.global_vars import load_global_vars
+
+
+class Environment:
+    """
+    单个环境档位。
+
+    配置项：
+    - base_url: 该环境的接口根地址
+    - auth: 覆盖 settings.auth 的字段（登录地址、账号、token 等）
+    - vars: 覆盖全局变量（支持嵌套字典，按键合并）
+    """
+
+    __slots__ = ("name", "base_url", "auth", "vars")
+
+    def __init__(self, name: str, cfg: Dict[str, Any]) -> None:
+        self.name = name
+        self.base_url = str(cfg.get("base_url") or "")
+        self.auth: Dict[str, Any] = dict(cfg.get("auth") or {})
+        self.vars: Dict[str, Any] = dict(cfg.get("vars") or {})
+
+    def auth_config(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """合并后的鉴权配置。"""
+
+        merged = dict(settings.get("auth", {}) or {})
+        merged.update(self.auth)
+        return merged
+
+    def global_vars(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """合并后的全局变量：配置文件变量 + 环境变量覆盖 + base_url。"""
+
+        merged = _deep_merge(load_global_vars(settings), self.vars)
+        if self.base_url:
+            merged["base_url"] = self.base_url
+        return merged
+
+
+def parse_env_names(value: Optional[str]) -> List[str]:
+    """解析逗号分隔的环境名列表，保持顺序并去重。"""
+
+    names: List[str] = []
+    for name in str(value or "").split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def load_environment(settings: Dict[str, Any], name: Optional[str]) -> Optional[Environment]:
+    """按名称读取环境档位；未指定时返回 None，名称不存在时抛出 ValueError。"""
+
+    if not name:
+        return None
+    profiles = settings.get("environments", {}) or {}
+    if name not in profiles:
+        raise ValueError(f"Unknown environment '{name}'; configured: {', '.join(profiles) or 'none'}")
+    return Environment(name, profiles[name] or {})
+
+
+def env_path(path: str, name: Optional[str]) -> str:
+    """为环境生成独立的分区路径，例如 reports/results.jsonl -> reports/results.env-dev.jsonl。"""
+
+    if not name:
+        return path
+    target = Path(path)
+    return str(target.with_name(f"{target.stem}.env-{name}{target.suffix}"))
+
+
+def rebase_url(url: str, default_base: str, env_base: str) -> str:
+    """写死地址的用例：以默认 base_url 开头时替换为环境的 base_url。"""
+
+    if not url or not default_base or not env_base or default_base == env_base:
+        return url
+    if url == default_base or url.startswith(default_base.rstrip("/") + "/"):
+        return env_base.rstrip("/") + url[len(default_base.rstrip("/")):]
+    return url
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
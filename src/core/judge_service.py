@@ -0,0 +1,305 @@
+"""共享判定服务：多进程执行时由主进程托管，所有工作进程的 LLM 判定统一经此处理。
+
+思路：
+- 工作进程通过本地连接（multiprocessing.connection）发送（预期，实际摘要）
+- 服务端在短窗口内攒批，批内去重、命中缓存的请求直接返回
+- 未命中的请求按唯一键调用一次 LLM，并发数受 max_concurrency 限制
+- 相同请求正在判定时只等待已有结果，不重复调用
+- 可选前置过滤（如本地向量相似度）按批决策，明确通过/失败的请求不调用 LLM
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+# 工作进程通过环境变量获取服务地址与认证密钥
+ENV_ADDRESS = "AUTOLLM_JUDGE_ADDRESS"
+ENV_AUTHKEY = "AUTOLLM_JUDGE_AUTHKEY"
+
+
+class _Request:
+    """一次判定请求及其回复通道。"""
+
+    __slots__ = ("req_id", "key", "expected", "digest", "conn", "send_lock")
+
+    def __init__(
+        self,
+        req_id: int,
+        expected: Any,
+        digest: str,
+        conn: Connection,
+        send_lock: threading.Lock,
+    ) -> None:
+        self.req_id = req_id
+        self.key = _cache_key(expected, digest)
+        self.expected = expected
+        self.digest = digest
+        self.conn = conn
+        self.send_lock = send_lock
+
+    def reply(self, verdict: Optional[bool], error: Optional[str] = None) -> None:
+        with self.send_lock:
+            try:
+                self.conn.send((self.req_id, verdict, error))
+            except (OSError, EOFError):
+                # 工作进程已退出，丢弃回复
+                pass
+
+
+class JudgeService:
+    """
+    攒批 + 缓存 + 去重的判定服务。
+
+    参数：
+    - verdict_fn: 实际判定函数 (expected, actual_digest) -> bool，通常为 AIJudge.llm_verdict
+    - cfg: execution.judge_service 配置
+    - prefilter: 可选的批量前置决策函数 [(expected, actual_digest)] -> [True/False/None]，
+      None 表示交给 verdict_fn
+    """
+
+    def __init__(
+        self,
+        verdict_fn: Callable[[Any, str], bool],
+        cfg: Dict[str, Any],
+        prefilter: Optional[Callable[[List[Tuple[Any, str]]], List[Optional[bool]]]] = None,
+    ) -> None:
+        self._logger = get_logger(__name__)
+        self._verdict_fn = verdict_fn
+        self._prefilter = prefilter
+        self.batch_window = float(cfg.get("batch_window_ms", 20)) / 1000.0
+        self.max_batch = max(int(cfg.get("max_batch", 16)), 1)
+        self.cache_size = max(int(cfg.get("cache_size", 2048)), 0)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(int(cfg.get("max_concurrency", 4)), 1),
+            thread_name_prefix="judge-service",
+        )
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._cache: "OrderedDict[str, bool]" = OrderedDict()
+        self._inflight: Dict[str, List[_Request]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._listener: Optional[Listener] = None
+        self._threads: List[threading.Thread] = []
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "deduplicated": 0,
+            "prefiltered": 0,
+            "llm_calls": 0,
+            "batches": 0,
+        }
+
+    def start(self) -> Dict[str, str]:
+        """启动监听与攒批线程，返回供工作进程使用的环境变量。"""
+
+        authkey = os.urandom(16)
+        self._listener = Listener(("127.0.0.1", 0), authkey=authkey)
+        host, port = self._listener.address
+        for target, name in ((self._accept_loop, "judge-accept"), (self._batch_loop, "judge-batch")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._logger.info("Judge service listening on %s:%s", host, port)
+        return {ENV_ADDRESS: f"{host}:{port}", ENV_AUTHKEY: authkey.hex()}
+
+    def stop(self) -> None:
+        """停止服务并等待进行中的判定完成。"""
+
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        self._executor.shutdown(wait=True)
+        self._logger.info(
+            "Judge service stats: requests=%s cache_hits=%s deduplicated=%s prefiltered=%s "
+            "llm_calls=%s batches=%s",
+            self.stats["requests"],
+            self.stats["cache_hits"],
+            self.stats["deduplicated"],
+            self.stats["prefiltered"],
+            self.stats["llm_calls"],
+            self.stats["batches"],
+        )
+
+    def _accept_loop(self) -> None:
+        """接受工作进程连接，每个连接一个读取线程。"""
+
+        while not self._stopped.is_set() and self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                break
+            except Exception as exc:  # 认证失败等，继续接受其他连接
+                self._logger.warning("Judge service rejected connection: %s", exc)
+                continue
+            threading.Thread(
+                target=self._read_loop, args=(conn,), name="judge-conn", daemon=True
+            ).start()
+
+    def _read_loop(self, conn: Connection) -> None:
+        """读取单个工作进程的请求并放入攒批队列。"""
+
+        send_lock = threading.Lock()
+        with conn:
+            while not self._stopped.is_set():
+                try:
+                    req_id, expected, digest = conn.recv()
+                except (OSError, EOFError):
+                    break
+                self._queue.put(_Request(req_id, expected, digest, conn, send_lock))
+
+    def _batch_loop(self) -> None:
+        """在时间窗口内攒批，批内去重并分发到线程池。"""
+
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_Request]) -> None:
+        """处理一批请求：缓存命中直接回复，进行中的请求合并等待，其余经前置过滤后提交判定。"""
+
+        pending: List[_Request] = []
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            for request in batch:
+                cached = self._cache.get(request.key)
+                if cached is not None:
+                    self._cache.move_to_end(request.key)
+                    self.stats["cache_hits"] += 1
+                    request.reply(cached)
+                elif request.key in self._inflight:
+                    self.stats["deduplicated"] += 1
+                    self._inflight[request.key].append(request)
+                else:
+                    self._inflight[request.key] = [request]
+                    pending.append(request)
+
+        pending = self._apply_prefilter(pending)
+        with self._lock:
+            self.stats["llm_calls"] += len(pending)
+        for request in pending:
+            future = self._executor.submit(self._verdict_fn, request.expected, request.digest)
+            future.add_done_callback(lambda fut, key=request.key: self._complete(key, fut))
+
+    def _apply_prefilter(self, pending: List[_Request]) -> List[_Request]:
+        """对整批待判定请求做前置决策，已决策的直接完成，返回仍需调用 LLM 的请求。"""
+
+        if self._prefilter is None or not pending:
+            return pending
+        try:
+            decisions = self._prefilter([(request.expected, request.digest) for request in pending])
+        except Exception as exc:
+            self._logger.warning("Judge prefilter failed, falling back to LLM: %s", exc)
+            return pending
+        undecided: List[_Request] = []
+        for request, decision in zip(pending, decisions):
+            if decision is None:
+                undecided.append(request)
+            else:
+                self._resolve(request.key, bool(decision))
+        with self._lock:
+            self.stats["prefiltered"] += len(pending) - len(undecided)
+        return undecided
+
+    def _complete(self, key: str, future: "Future[bool]") -> None:
+        """LLM 判定完成：回复所有等待该结果的请求。"""
+
+        error = future.exception()
+        self._resolve(key, None if error is not None else bool(future.result()), error)
+
+    def _resolve(self, key: str, verdict: Optional[bool], error: Optional[BaseException] = None) -> None:
+        """写入缓存并回复所有等待该结果的请求。"""
+
+        with self._lock:
+            waiters = self._inflight.pop(key, [])
+            if verdict is not None and self.cache_size:
+                self._cache[key] = verdict
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if error is not None:
+            self._logger.error("Judge service verdict failed: %s", error)
+        for request in waiters:
+            request.reply(verdict, None if error is None else str(error))
+
+
+class JudgeClient:
+    """工作进程侧的判定客户端（线程安全，单连接串行请求）。"""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes) -> None:
+        self._conn = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def verdict(self, expected: Any, actual_digest: str) -> bool:
+        """发送判定请求并等待结果。"""
+
+        with self._lock:
+            self._seq += 1
+            self._conn.send((self._seq, expected, actual_digest))
+            _, verdict, error = self._conn.recv()
+        if error is not None:
+            raise RuntimeError(f"Judge service error: {error}")
+        return bool(verdict)
+
+
+# 进程内单例：None 表示未初始化，False 表示未配置或连接失败
+_CLIENT: Any = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_judge_client() -> Optional[JudgeClient]:
+    """返回共享判定服务客户端；未处于多进程执行或连接失败时返回 None。"""
+
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = _connect_from_env() or False
+    return _CLIENT or None
+
+
+def _connect_from_env() -> Optional[JudgeClient]:
+    """按环境变量连接判定服务。"""
+
+    address = os.environ.get(ENV_ADDRESS)
+    authkey = os.environ.get(ENV_AUTHKEY)
+    if not address or not authkey:
+        return None
+    host, _, port = address.rpartition(":")
+    try:
+        return JudgeClient((host, int(port)), bytes.fromhex(authkey))
+    except (OSError, ValueError) as exc:
+        get_logger(__name__).warning("Cannot connect to judge service %s: %s", address, exc)
+        return None
+
+
+def _cache_key(expected: Any, digest: str) -> str:
+    """判定缓存键：预期与实际摘要的哈希。"""
+
+    payload = json.dumps([expected, digest], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
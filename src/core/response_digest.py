@@ -0,0 +1,133 @@
+"""响应体大小控制与摘要：限制读取大小，并为 LLM 判定生成紧凑摘要。
+
+思路：
+- 执行阶段按块流式读取响应体，超过 max_body_bytes 即停止
+- 判定阶段保留预期文本涉及的字段（msg/code 等），大数组只保留长度与少量样例
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, Tuple
+
+# 始终保留的常见状态字段
+_STATUS_KEYS = ("code", "msg", "message", "status", "success", "error", "errmsg", "errcode")
+# 截断 JSON 中的标量字段，例如 "msg": "成功" / "code": 0
+_SCALAR_FIELD_RE = re.compile(
+    r'"(?P<key>[A-Za-z_][\w]*)"\s*:\s*(?P<value>"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?|true|false|null)'
+)
+# 预期文本中可能引用的字段名
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def read_limited_body(response: Any, max_bytes: int, chunk_size: int = 65536) -> Tuple[bytes, bool]:
+    """
+    流式读取响应体，最多读取 max_bytes 字节。
+
+    返回：
+    - 读取到的字节
+    - 是否因超过上限被截断
+    """
+
+    buffer = bytearray()
+    truncated = False
+    try:
+        for block in response.iter_content(chunk_size=chunk_size):
+            if not block:
+                continue
+            remaining = max_bytes - len(buffer)
+            if len(block) > remaining:
+                buffer.extend(block[:remaining])
+                truncated = True
+                break
+            buffer.extend(block)
+    finally:
+        # 提前停止读取时释放连接
+        response.close()
+    return bytes(buffer), truncated
+
+
+def decode_body(body: bytes, encoding: Any = None) -> str:
+    """按响应编码解码，失败字符以替换符代替。"""
+
+    return body.decode(encoding or "utf-8", errors="replace")
+
+
+def summarize_for_judge(
+    expected: Any,
+    actual_text: str,
+    max_chars: int = 4000,
+    array_sample: int = 3,
+) -> str:
+    """
+    为 LLM 判定生成紧凑的实际响应文本。
+
+    - 响应较小时原样返回
+    - JSON 响应：保留状态字段与预期文本提及的字段，数组只保留长度与少量样例
+    - 非 JSON 或截断的 JSON：提取可识别的标量字段并截断正文
+    """
+
+    if len(actual_text) <= max_chars:
+        return actual_text
+
+    mentioned = set(_IDENTIFIER_RE.findall(str(expected)))
+    try:
+        parsed = json.loads(actual_text)
+    except ValueError:
+        parsed = None
+
+    if parsed is not None:
+        digest = _summarize_value(parsed, mentioned, array_sample, depth=0)
+        text = json.dumps(digest, ensure_ascii=False, separators=(",", ":"))
+        if len(text) <= max_chars:
+            return text
+        return f"{text[:max_chars]}...(truncated)"
+
+    fields = _scan_scalar_fields(actual_text, mentioned)
+    head = actual_text[: max_chars // 2]
+    summary = {"fields": fields, "body_prefix": head, "body_length": len(actual_text)}
+    return json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
+
+
+def _summarize_value(value: Any, mentioned: set, array_sample: int, depth: int) -> Any:
+    """递归摘要：字典按字段保留，数组替换为长度 + 样例。"""
+
+    if isinstance(value, dict):
+        result: Dict[str, Any] = {}
+        for key, item in value.items():
+            # 深层未被提及的标量只保留类型，既体现数据形状又节省 token
+            if depth >= 2 and key not in mentioned and key not in _STATUS_KEYS:
+                if not isinstance(item, (dict, list)):
+                    result[key] = type(item).__name__
+                    continue
+            result[key] = _summarize_value(item, mentioned, array_sample, depth + 1)
+        return result
+    if isinstance(value, list):
+        if len(value) <= array_sample:
+            return [_summarize_value(item, mentioned, array_sample, depth + 1) for item in value]
+        return {
+            "_array_length": len(value),
+            "_sample": [
+                _summarize_value(item, mentioned, array_sample, depth + 1)
+                for item in value[:array_sample]
+            ],
+        }
+    if isinstance(value, str) and len(value) > 200:
+        return f"{value[:200]}...(len={len(value)})"
+    return value
+
+
+def _scan_scalar_fields(text: str, mentioned: Iterable[str]) -> Dict[str, Any]:
+    """从无法完整解析的文本中提取状态字段与被提及字段的首个取值。"""
+
+    wanted = set(_STATUS_KEYS) | set(mentioned)
+    fields: Dict[str, Any] = {}
+    for match in _SCALAR_FIELD_RE.finditer(text):
+        key = match.group("key")
+        if key in wanted and key not in fields:
+            try:
+                fields[key] = json.loads(match.group("value"))
+            except ValueError:
+                fields[key] = match.group("value")
+    return fields
@@ -0,0 +1,118 @@
+"""响应录制与回放：录制每条用例的响应（状态码、响应头、响应体），回放时不再请求接口。
+
+用途：
+- 调整 judge_prompt 或 AIJudge 启发式阈值后，用回放只重新执行断言，无需访问被测服务
+- 存储为单个 SQLite 文件（默认 .autollm/responses.sqlite3），响应体 zlib 压缩
+- 以用例 ID（“文件名::用例名”）为键，重新录制时覆盖；多进程执行时各进程写同一文件（WAL）
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RECORD = "record"
+REPLAY = "replay"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    case_id TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    truncated INTEGER NOT NULL DEFAULT 0,
+    recorded REAL NOT NULL
+)
+"""
+
+
+class StoredResponse:
+    """录制的响应。"""
+
+    __slots__ = ("status", "headers", "encoding", "body", "truncated")
+
+    def __init__(
+        self,
+        status: int,
+        headers: Dict[str, str],
+        encoding: Optional[str],
+        body: bytes,
+        truncated: bool = False,
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.encoding = encoding
+        self.body = body
+        self.truncated = truncated
+
+
+class ResponseStore:
+    """
+    响应存储。
+
+    - mode: record（请求接口并录制）或 replay（只读取录制的响应）
+    - 录制按批缓冲写入，close() 时统一落盘
+    - 回放按用例 ID 读取，未录制的用例返回 None
+    """
+
+    def __init__(self, path: str, mode: str = RECORD, batch_size: int = 50) -> None:
+        self.path = Path(path)
+        self.mode = mode
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(int(batch_size), 1)
+        self._pending: List[Tuple[Any, ...]] = []
+        # busy 超时覆盖多进程同时录制时的写锁争用
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    def put(self, case_id: str, response: StoredResponse) -> None:
+        """录制一条响应（同一用例覆盖旧记录）。"""
+
+        self._pending.append(
+            (
+                case_id,
+                int(response.status),
+                json.dumps(response.headers, ensure_ascii=False, separators=(",", ":")),
+                response.encoding,
+                zlib.compress(response.body),
+                int(bool(response.truncated)),
+                time.time(),
+            )
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def get(self, case_id: str) -> Optional[StoredResponse]:
+        """读取录制的响应；未录制时返回 None。"""
+
+        row = self._conn.execute(
+            "SELECT status, headers, encoding, body, truncated FROM responses WHERE case_id = ?",
+            (case_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, encoding, body, truncated = row
+        return StoredResponse(status, json.loads(headers), encoding, zlib.decompress(body), bool(truncated))
+
+    def flush(self) -> None:
+        """将缓冲的录制写入磁盘。"""
+
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending
+            )
+        self._pending.clear()
+
+    def close(self) -> None:
+        """刷新缓冲并关闭连接。"""
+
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,169 @@
+"""执行状态持久化：记录每条用例的结果、响应哈希与用例文件哈希。
+
+用途：
+- --only-failed / --failed-first：仅重跑或优先运行上次失败的用例
+- --changed：仅运行自上次执行以来 JSON 发生变化的用例
+- 多进程执行：各工作进程写入独立的分片状态，由主进程合并回写
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.utils.file_handler import read_json, write_json
+from src.utils.logger import get_logger
+
+# 视为失败的结果状态
+FAILED_OUTCOMES = {"failed", "error"}
+
+
+class RunState:
+    """
+    跨运行的用例状态。
+
+    结构：
+    - files: 用例文件路径 -> 文件哈希（该文件全部用例执行后更新）
+    - cases: 用例 ID -> {outcome, duration, response_hash, case_hash, file}
+    """
+
+    def __init__(self, path: str) -> None:
+        self._logger = get_logger(__name__)
+        self.path = Path(path)
+        self.files: Dict[str, str] = {}
+        self.cases: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                data = read_json(str(self.path)) or {}
+                self.files = dict(data.get("files", {}))
+                self.cases = dict(data.get("cases", {}))
+            except (OSError, ValueError) as exc:
+                self._logger.warning("Ignoring unreadable run state %s: %s", self.path, exc)
+
+    @property
+    def has_history(self) -> bool:
+        """是否存在历史执行记录。"""
+        return bool(self.cases)
+
+    def failed_ids(self) -> set:
+        """返回上次执行失败的用例 ID 集合。"""
+        return {
+            case_id
+            for case_id, record in self.cases.items()
+            if record.get("outcome") in FAILED_OUTCOMES
+        }
+
+    def is_file_unchanged(self, path: str, current_hash: str) -> bool:
+        """判断用例文件自上次完整执行以来是否未变化。"""
+        return self.files.get(path) == current_hash
+
+    def is_case_changed(self, case_id: str, current_hash: str) -> bool:
+        """判断单条用例是否为新增或内容已变化。"""
+        record = self.cases.get(case_id)
+        return record is None or record.get("case_hash") != current_hash
+
+    def duration_of(self, case_id: str) -> Optional[float]:
+        """返回用例的历史耗时（秒），无记录时返回 None。"""
+        record = self.cases.get(case_id)
+        if not record or record.get("duration") is None:
+            return None
+        return float(record["duration"])
+
+    def record_case(
+        self,
+        case_id: str,
+        outcome: str,
+        duration: float,
+        case_digest: str,
+        file: str,
+        response_hash: Optional[str] = None,
+    ) -> None:
+        """记录单条用例的执行结果。"""
+        self.cases[case_id] = {
+            "outcome": outcome,
+            "duration": round(float(duration), 4),
+            "response_hash": response_hash,
+            "case_hash": case_digest,
+            "file": file,
+        }
+
+    def record_files(self, file_hashes: Dict[str, str]) -> None:
+        """记录已完整执行的用例文件哈希。"""
+        self.files.update(file_hashes)
+
+    def prune(self, live_ids: Iterable[str]) -> None:
+        """移除已不存在的用例记录，避免状态文件无限增长。"""
+        live = set(live_ids)
+        self.cases = {key: value for key, value in self.cases.items() if key in live}
+
+    def complete_session(
+        self,
+        files: Dict[str, Tuple[str, List[str]]],
+        executed: Iterable[str],
+        full_scan: bool,
+    ) -> None:
+        """
+        会话结束时更新文件哈希并清理过期记录。
+
+        参数：
+        - files: 来源文件 -> (文件哈希, 文件内全部用例 ID)
+        - executed: 本次实际执行过的用例 ID
+        - full_scan: 是否完整扫描了全部用例文件（仅此时清理过期记录）
+        """
+        done = set(executed)
+        self.record_files(
+            {
+                source: digest
+                for source, (digest, ids) in files.items()
+                if digest and all(case_id in done for case_id in ids)
+            }
+        )
+        if full_scan:
+            self.prune(case_id for _, ids in files.values() for case_id in ids)
+
+    def save(self) -> None:
+        """写回状态文件。"""
+        write_json(str(self.path), {"files": self.files, "cases": self.cases})
+
+    def save_shard(
+        self,
+        path: str,
+        files: Dict[str, Tuple[str, List[str]]],
+        executed: Iterable[str],
+        full_scan: bool,
+    ) -> None:
+        """工作进程写出分片状态：只含本进程执行的用例，不改动共享状态文件。"""
+        done = sorted(set(executed))
+        write_json(
+            path,
+            {
+                "cases": {case_id: self.cases[case_id] for case_id in done if case_id in self.cases},
+                "files": {source: [digest, ids] for source, (digest, ids) in files.items()},
+                "executed": done,
+                "full_scan": full_scan,
+            },
+        )
+
+    def merge_shards(self, paths: Sequence[str]) -> int:
+        """合并各工作进程的分片状态并删除分片文件，返回合并的用例数。"""
+        files: Dict[str, Tuple[str, List[str]]] = {}
+        executed: set = set()
+        full_scan = True
+        merged = 0
+        for path in paths:
+            target = Path(path)
+            if not target.exists():
+                # 分片进程未写出状态（如异常退出）时不清理过期记录
+                full_scan = False
+                continue
+            data = read_json(str(target)) or {}
+            self.cases.update(data.get("cases", {}))
+            merged += len(data.get("cases", {}))
+            for source, (digest, ids) in data.get("files", {}).items():
+                files[source] = (digest, list(ids))
+            executed.update(data.get("executed", []))
+            full_scan = full_scan and bool(data.get("full_scan"))
+            target.unlink()
+        if executed:
+            self.complete_session(files, executed, full_scan)
+        return merged
@@ -0,0 +1,90 @@
+"""多进程执行的用例分片：按历史耗时均衡分配到各工作进程。
+
+规则：
+- 分配单元默认为单条用例；文件内存在 extract 规则时整个文件作为一个单元，
+  保证变量提取与引用的用例在同一进程内按原顺序执行
+- 单元权重为历史耗时之和，无历史记录的用例按已知耗时的中位数估算
+- 采用最长处理时间优先（LPT）贪心分配，结果只依赖输入，各进程独立计算得到相同划分
+"""
+
+from __future__ import annotations
+
+import heapq
+import statistics
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 无任何历史耗时时的默认估算（秒）
+DEFAULT_DURATION = 1.0
+
+
+def parse_shard(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """解析 "序号/总数" 形式的分片参数（序号从 0 开始），为空时返回 None。"""
+
+    if not value:
+        return None
+    index_text, _, count_text = str(value).partition("/")
+    index, count = int(index_text), int(count_text)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard specification: {value}")
+    return index, count
+
+
+def shard_path(path: str, index: int) -> str:
+    """为分片生成独立的文件路径，例如 reports/results.jsonl -> reports/results.shard-0.jsonl。"""
+
+    target = Path(path)
+    return str(target.with_name(f"{target.stem}.shard-{index}{target.suffix}"))
+
+
+def assign_shards(
+    units: Sequence[Tuple[str, Sequence[Optional[float]]]],
+    count: int,
+) -> Dict[str, int]:
+    """
+    将分配单元划分到 count 个分片。
+
+    参数：
+    - units: （单元键，单元内各用例的历史耗时，未知为 None）列表
+    - count: 分片数量
+
+    返回：
+    - 单元键 -> 分片序号
+    """
+
+    known = [value for _, durations in units for value in durations if value is not None]
+    fallback = statistics.median(known) if known else DEFAULT_DURATION
+    weighted = [
+        (sum(fallback if value is None else value for value in durations), order, key)
+        for order, (key, durations) in enumerate(units)
+    ]
+    # 权重降序，同权重按原顺序，保证划分稳定
+    weighted.sort(key=lambda item: (-item[0], item[1]))
+
+    loads: List[Tuple[float, int]] = [(0.0, shard) for shard in range(count)]
+    assignment: Dict[str, int] = {}
+    for weight, _, key in weighted:
+        load, shard = heapq.heappop(loads)
+        assignment[key] = shard
+        heapq.heappush(loads, (load + weight, shard))
+    return assignment
+
+
+def group_units(
+    entries: Iterable[Tuple[str, str, bool]],
+) -> List[Tuple[str, List[str]]]:
+    """
+    将用例按分配单元分组。
+
+    参数：
+    - entries: （用例 ID，来源文件，该文件是否含 extract 规则）
+
+    返回：
+    - （单元键，单元内用例 ID 列表），保持用例原顺序
+    """
+
+    units: Dict[str, List[str]] = {}
+    for case_id, source, chained in entries:
+        key = f"file:{source}" if chained else case_id
+        units.setdefault(key, []).append(case_id)
+    return list(units.items())
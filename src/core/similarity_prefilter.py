@@ -0,0 +1,207 @@
+"""语义判定前置过滤：本地向量相似度明确通过/明确失败的用例不再调用 LLM。
+
+思路：
+- 预期文本与实际响应消息（msg/message 字段，缺失时为响应摘要）编码为句向量
+- 余弦相似度 >= pass_threshold 判定通过，<= fail_threshold 判定失败，中间区间交给 LLM
+- 默认使用特征哈希向量（中日韩字符单字/双字 + 英文单词），无需下载模型；
+  哈希向量只反映字面重合，跨语言或换说法的同义文本相似度接近 0，因此只用于明确通过
+- 明确失败需要真正的句向量：配置 model（sentence-transformers）且加载成功时 fail_threshold 才生效，
+  模型首次判定时加载，未安装或加载失败时回退到哈希向量
+
+外部库：
+- numpy（可选）：按批矩阵计算；未安装时使用稀疏字典逐条计算，结果一致
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.logger import get_logger
+
+try:  # 可选依赖
+    import numpy as np  # type: ignore
+
+    _HAS_NUMPY = True
+except Exception:
+    np = None
+    _HAS_NUMPY = False
+
+# 英文单词 / 数字，或单个中日韩字符
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+|[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]")
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]")
+
+
+def response_message(actual: Any) -> str:
+    """实际响应的消息文本：JSON 响应取 msg/message 字段，否则返回原文。"""
+
+    text = str(actual).strip()
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        return text
+    if isinstance(parsed, dict):
+        msg = parsed.get("msg") or parsed.get("message")
+        if msg:
+            return str(msg).strip()
+    return text
+
+
+def _features(text: str) -> List[str]:
+    """文本特征：英文单词、中日韩单字，以及相邻中日韩字符组成的双字。"""
+
+    tokens = _TOKEN_RE.findall(text.lower())
+    features = list(tokens)
+    for left, right in zip(tokens, tokens[1:]):
+        if _CJK_RE.fullmatch(left) and _CJK_RE.fullmatch(right):
+            features.append(left + right)
+    return features
+
+
+class HashingEmbedder:
+    """
+    特征哈希句向量。
+
+    - 每个特征按 CRC32 映射到 dim 维中的一维，并按哈希位决定正负号（降低碰撞偏差）
+    - 相同文本的向量带 LRU 缓存，重复的预期文本只编码一次
+    """
+
+    def __init__(self, dim: int = 1024, cache_size: int = 4096) -> None:
+        self.dim = max(int(dim), 16)
+        self.cache_size = max(int(cache_size), 0)
+        self._cache: "OrderedDict[str, Dict[int, float]]" = OrderedDict()
+
+    def sparse(self, text: str) -> Dict[int, float]:
+        """单条文本的归一化稀疏向量（维度 -> 权重）。"""
+
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+        vector: Dict[int, float] = {}
+        for feature in _features(text):
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            index = hashed % self.dim
+            vector[index] = vector.get(index, 0.0) + (1.0 if (hashed >> 31) & 1 else -1.0)
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm:
+            vector = {index: value / norm for index, value in vector.items() if value}
+        if self.cache_size:
+            self._cache[text] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def embed(self, texts: Sequence[str]) -> Any:
+        """批量编码为 (n, dim) 的归一化矩阵（需要 numpy）。"""
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vector = self.sparse(text)
+            if vector:
+                matrix[row, list(vector)] = list(vector.values())
+        return matrix
+
+
+class SimilarityPrefilter:
+    """
+    按余弦相似度对（预期，实际）判定对做前置决策。
+
+    配置（execution.similarity_prefilter）：
+    - enabled: 是否启用
+    - pass_threshold: 明确通过的相似度阈值
+    - fail_threshold: 明确失败的相似度阈值（默认不启用；仅在句向量模型可用时生效）
+    - dim: 哈希向量维度
+    - model: 可选 sentence-transformers 模型名，为空时使用哈希向量
+    """
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None) -> None:
+        cfg = cfg or {}
+        self._logger = get_logger(__name__)
+        self.enabled = bool(cfg.get("enabled", False))
+        self.pass_threshold = float(cfg.get("pass_threshold", 0.9))
+        fail_threshold = cfg.get("fail_threshold")
+        self.fail_threshold: Optional[float] = None if fail_threshold is None else float(fail_threshold)
+        self.embedder = HashingEmbedder(int(cfg.get("dim", 1024)))
+        self.model_name = str(cfg.get("model") or "")
+        self._model: Any = None
+        self._model_loaded = False
+        self._lock = threading.Lock()
+        if self.enabled and self.fail_threshold is not None and not self.model_name:
+            self._logger.warning(
+                "similarity_prefilter.fail_threshold ignored without model: "
+                "hashing vectors only short-cut clear passes"
+            )
+
+    @property
+    def model(self) -> Any:
+        """句向量模型（首次使用时加载，未配置或加载失败时为 None）。"""
+
+        if not self._model_loaded:
+            with self._lock:
+                if not self._model_loaded:
+                    if self.model_name:
+                        self._model = self._load_model(self.model_name)
+                    self._model_loaded = True
+        return self._model
+
+    def _load_model(self, model_name: str) -> Any:
+        """加载句向量模型，失败时回退到哈希向量（只做明确通过判定）。"""
+
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+
+            return SentenceTransformer(model_name, device="cpu")
+        except Exception as exc:
+            self._logger.warning(
+                "Embedding model %s unavailable, using hashing vectors (pass-only): %s", model_name, exc
+            )
+            return None
+
+    def similarities(self, pairs: Sequence[Tuple[Any, Any]]) -> List[float]:
+        """批量计算（预期，实际）的余弦相似度。"""
+
+        expected = [str(item[0]).strip() for item in pairs]
+        actual = [response_message(item[1]) for item in pairs]
+        model = self.model
+        if model is not None:
+            vectors = model.encode(expected + actual, normalize_embeddings=True, batch_size=64)
+            return [float(value) for value in (vectors[: len(pairs)] * vectors[len(pairs):]).sum(axis=1)]
+        if _HAS_NUMPY:
+            left = self.embedder.embed(expected)
+            right = self.embedder.embed(actual)
+            return [float(value) for value in (left * right).sum(axis=1)]
+        scores: List[float] = []
+        for exp_text, act_text in zip(expected, actual):
+            left_vec = self.embedder.sparse(exp_text)
+            right_vec = self.embedder.sparse(act_text)
+            scores.append(sum(value * right_vec.get(index, 0.0) for index, value in left_vec.items()))
+        return scores
+
+    def decide(self, pairs: Sequence[Tuple[Any, Any]]) -> List[Optional[bool]]:
+        """批量决策：True 明确通过，False 明确失败，None 交给 LLM 判定。"""
+
+        if not self.enabled or not pairs:
+            return [None] * len(pairs)
+        scores = self.similarities(pairs)
+        # 哈希向量只比较字面重合：低相似度可能是跨语言或换说法的同义文本，不做明确失败
+        fail_threshold = self.fail_threshold if self.model is not None else None
+        decisions: List[Optional[bool]] = []
+        for (expected, actual), score in zip(pairs, scores):
+            # 无可比较特征（空文本、纯符号）时不做决策
+            if not self.embedder.sparse(str(expected).strip()) or not self.embedder.sparse(
+                response_message(actual)
+            ):
+                decisions.append(None)
+            elif score >= self.pass_threshold:
+                decisions.append(True)
+            elif fail_threshold is not None and score <= fail_threshold:
+                decisions.append(False)
+            else:
+                decisions.append(None)
+        return decisions
@@ -0,0 +1,237 @@
+"""持久化工作队列：生成任务按切片入队，支持中断续跑、失败重试与多进程并行消费。
+
+设计：
+- 使用标准库 sqlite3（WAL 模式），队列文件默认 .autollm/work_queue.sqlite3
+- 任务 ID 为切片输入内容与生成配置指纹（提示词、模型、Agentic 设置）的哈希：
+  重跑时输入与配置均未变化的切片直接复用结果，不再调用 LLM；discard() 可强制重新生成
+- 状态：pending（待处理）/ in_flight（处理中）/ done（完成）/ failed（重试耗尽）
+- 领取任务在 BEGIN IMMEDIATE 事务中完成，多个进程从同一队列领取互不重复
+- 处理中的任务带租约：工作进程崩溃后租约过期，任务可被其他进程重新领取
+- 失败按指数退避重新排队，超过最大尝试次数标记为 failed
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.utils.logger import get_logger
+
+# 工作进程通过环境变量获取本次运行标识
+ENV_QUEUE_RUN = "AUTOLLM_QUEUE_RUN"
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    run TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_run_state ON jobs (run, state, seq);
+"""
+
+
+def job_id(payload: Any) -> str:
+    """任务 ID：输入内容（键排序后的紧凑 JSON）的 SHA1。"""
+
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def run_key(job_ids: Sequence[str]) -> str:
+    """运行标识：本次全部任务 ID 的哈希，相同输入的重跑得到相同标识。"""
+
+    return hashlib.sha1("\n".join(job_ids).encode("utf-8")).hexdigest()
+
+
+class Job:
+    """领取到的任务。"""
+
+    __slots__ = ("id", "seq", "payload", "attempts")
+
+    def __init__(self, job_id_: str, seq: int, payload: Any, attempts: int) -> None:
+        self.id = job_id_
+        self.seq = seq
+        self.payload = payload
+        self.attempts = attempts
+
+
+class WorkQueue:
+    """
+    基于 SQLite 的任务队列。
+
+    参数：
+    - path: 队列文件路径
+    - cfg: work_queue 配置（max_attempts / retry_backoff_seconds / lease_seconds）
+    """
+
+    def __init__(self, path: str, cfg: Optional[Dict[str, Any]] = None) -> None:
+        cfg = cfg or {}
+        self._logger = get_logger(__name__)
+        self.path = Path(path)
+        self.max_attempts = max(int(cfg.get("max_attempts", 3)), 1)
+        self.backoff_seconds = float(cfg.get("retry_backoff_seconds", 5))
+        self.lease_seconds = float(cfg.get("lease_seconds", 600))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 自动提交模式，写事务显式 BEGIN IMMEDIATE；busy 超时覆盖多进程争用
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """写事务：立即获取写锁，避免多进程同时领取同一任务。"""
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def enqueue(self, run: str, items: Sequence[Tuple[str, Any]]) -> Dict[str, int]:
+        """
+        入队本次运行的任务（任务 ID，输入内容），返回各状态计数。
+
+        - 新任务为 pending；已完成的任务保留结果
+        - 上次中断遗留的 in_flight 与重试耗尽的 failed 任务重置为 pending（续跑即重试）
+        """
+
+        now = time.time()
+        with self._write() as conn:
+            for seq, (item_id, payload) in enumerate(items):
+                conn.execute(
+                    "INSERT INTO jobs (id, run, seq, payload, state, updated) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET run = excluded.run, seq = excluded.seq",
+                    (item_id, run, seq, json.dumps(payload, ensure_ascii=False), PENDING, now),
+                )
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, next_at = 0, lease_until = 0, updated = ? "
+                "WHERE run = ? AND state IN (?, ?)",
+                (PENDING, now, run, IN_FLIGHT, FAILED),
+            )
+        return self.counts(run)
+
+    def discard(self, job_ids: Sequence[str]) -> int:
+        """删除指定任务（含已完成的结果），用于强制重新生成；返回删除的任务数。"""
+
+        removed = 0
+        with self._write() as conn:
+            for item_id in job_ids:
+                removed += conn.execute("DELETE FROM jobs WHERE id = ?", (item_id,)).rowcount
+        return removed
+
+    def claim(self, run: str, worker: str) -> Optional[Job]:
+        """领取一个可执行的任务：到期的 pending 或租约已过期的 in_flight；没有时返回 None。"""
+
+        now = time.time()
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT id, seq, payload, attempts FROM jobs WHERE run = ? AND "
+                "((state = ? AND next_at <= ?) OR (state = ? AND lease_until < ?)) "
+                "ORDER BY seq LIMIT 1",
+                (run, PENDING, now, IN_FLIGHT, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_until = ?, worker = ?, "
+                "updated = ? WHERE id = ?",
+                (IN_FLIGHT, now + self.lease_seconds, worker, now, row[0]),
+            )
+        return Job(row[0], row[1], json.loads(row[2]), row[3] + 1)
+
+    def complete(self, job: Job, result: Any) -> None:
+        """标记任务完成并保存结果。"""
+
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, lease_until = 0, updated = ? "
+                "WHERE id = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), job.id),
+            )
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        记录任务失败：未达最大尝试次数时按指数退避（带抖动）重新排队。
+
+        返回是否会重试。
+        """
+
+        retry = job.attempts < self.max_attempts
+        now = time.time()
+        delay = self.backoff_seconds * (2 ** (job.attempts - 1)) * random.uniform(0.8, 1.2)
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, next_at = ?, lease_until = 0, updated = ? "
+                "WHERE id = ?",
+                (PENDING if retry else FAILED, error, now + delay if retry else 0, now, job.id),
+            )
+        return retry
+
+    def counts(self, run: str) -> Dict[str, int]:
+        """返回本次运行各状态的任务数。"""
+
+        counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+        for state, count in self._conn.execute(
+            "SELECT state, COUNT(*) FROM jobs WHERE run = ? GROUP BY state", (run,)
+        ):
+            counts[state] = count
+        return counts
+
+    def next_ready_in(self, run: str) -> Optional[float]:
+        """距离下一个任务可领取还需等待的秒数；没有未完成任务时返回 None。"""
+
+        row = self._conn.execute(
+            "SELECT MIN(CASE WHEN state = ? THEN next_at ELSE lease_until END) FROM jobs "
+            "WHERE run = ? AND state IN (?, ?)",
+            (PENDING, run, PENDING, IN_FLIGHT),
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return max(row[0] - time.time(), 0.0)
+
+    def results(self, run: str) -> List[Any]:
+        """按入队顺序返回已完成任务的结果。"""
+
+        return [
+            json.loads(result)
+            for (result,) in self._conn.execute(
+                "SELECT result FROM jobs WHERE run = ? AND state = ? ORDER BY seq", (run, DONE)
+            )
+        ]
+
+    def failures(self, run: str) -> List[Tuple[Any, str]]:
+        """返回重试耗尽的任务（输入内容，最后一次错误）。"""
+
+        return [
+            (json.loads(payload), error or "")
+            for payload, error in self._conn.execute(
+                "SELECT payload, error FROM jobs WHERE run = ? AND state = ? ORDER BY seq",
+                (run, FAILED),
+            )
+        ]
@@ -1,18 +1,38 @@
 """兼容接口的对话调用封装。
 
 外部库：
-- 模型调用库：官方客户端，用于模型调用。
+- 模型调用库：官方客户端，用于模型调用（首次调用时才导入）。
 """
 
 from __future__ import annotations
 
+import json
+import random
+import threading
 import time
-from typing import Optional
-
-from openai import OpenAI
+from typing import Any, Dict, Optional, Set
 
+from src.llm_client.rate_limiter import get_profile_guard
 from src.utils.file_handler import read_yaml
 from src.utils.logger import get_logger
+from src.utils.token_counter import estimate_tokens
+from src.utils.tracer import span
+
+# 档位自有的稳定性配置：不从基础 llm 配置继承，避免降级档位沿用主档位的降级链与配额
+_PROFILE_ONLY_KEYS = ("rate_limit", "circuit_breaker", "fallback")
+# 400 错误信息中表明结构化输出参数不受支持的关键词（参数名 + 不支持类描述同时出现）
+_STRUCTURED_PARAMS = ("response_format", "json_schema", "json_object", "tool_choice", "tools")
+_UNSUPPORTED_HINTS = (
+    "not supported",
+    "unsupported",
+    "does not support",
+    "not support",
+    "unrecognized",
+    "unknown parameter",
+    "not allowed",
+    "invalid parameter",
+    "extra inputs",
+)
 
 
 class LLMClient:
@@ -21,7 +41,7 @@ class LLMClient:
 
     设计目的：
     - 只关心“发问”和“收答”，不关心测试业务逻辑
-    - 负责重试、超时等稳定性保障
+    - 负责重试、超时、限流与熔断等稳定性保障
     - 所有调用参数集中从配置文件读取，避免硬编码
     """
 
@@ -29,6 +49,7 @@ class LLMClient:
         self,
         settings_path: str = "config/settings.yaml",
         module_name: Optional[str] = None,
+        profile: Optional[str] = None,
     ) -> None:
         # 日志实例
         self._logger = get_logger(__name__)
@@ -39,9 +60,22 @@ class LLMClient:
         profiles = settings.get("llm_profiles", {})
         module_map = settings.get("llm_modules", {})
 
-        resolved = self._resolve_module_settings(
-            llm_settings, profiles, module_map, module_name
-        )
+        if profile:
+            # 显式指定档位（熔断降级等场景）时跳过模块映射
+            if profile == "default" and "default" not in profiles:
+                resolved = dict(llm_settings)
+            else:
+                resolved = self._profile_config(llm_settings, profiles.get(profile) or {"model": profile})
+            self.profile_name = profile
+        else:
+            resolved = self._resolve_module_settings(
+                llm_settings, profiles, module_map, module_name
+            )
+            self.profile_name = self._resolve_profile_name(module_map, module_name)
+
+        # 模块名用于日志与追踪属性
+        self.module_name = module_name or "default"
+        self.settings_path = settings_path
 
         # 大模型连接与调用参数
         self.api_key = resolved.get("api_key")
@@ -50,42 +84,151 @@ class LLMClient:
         self.timeout_seconds = resolved.get("timeout_seconds", 60)
         self.max_retries = resolved.get("max_retries", 3)
         self.retry_backoff_seconds = resolved.get("retry_backoff_seconds", 2)
+        # 结构化输出方式：json_schema / json_object / tools / none（取决于服务端支持情况）
+        self.structured_output = str(resolved.get("structured_output", "none") or "none")
+        # 上下文窗口（0 表示不检查）、为输出预留的 token 数，以及超出窗口时的处理：truncate / reject
+        self.context_window = int(resolved.get("context_window", 0) or 0)
+        self.max_output_tokens = int(resolved.get("max_output_tokens", 1024) or 0)
+        self.context_overflow = str(resolved.get("context_overflow", "truncate") or "truncate")
+
+        # 档位级限流/熔断（同档位的客户端共享），以及熔断后的降级档位
+        self.guard = get_profile_guard(self.profile_name, resolved)
+        self.fallback_profile = resolved.get("fallback")
+        self._fallback_client: Optional[LLMClient] = None
+
+        # 兼容接口客户端：首次调用时创建，未调用模型的流程不导入 openai
+        self._client: Any = None
+        self._client_lock = threading.Lock()
 
-        # 兼容接口客户端
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+    @property
+    def client(self) -> Any:
+        """懒加载兼容接口客户端。"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
 
-    def chat_completion(self, prompt: str, content: str) -> str:
+                    self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def chat_completion(
+        self,
+        prompt: str,
+        content: str,
+        temperature: Optional[float] = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """
         向大模型发送对话请求并返回文本结果。
 
         参数说明：
         - prompt：系统提示词（指导模型角色与输出格式）
         - content：用户输入内容（原始接口文档或比较内容）
+        - temperature：采样温度（可选，未指定时使用服务端默认值）
+        - response_schema：期望的输出结构 {name, description, schema}（可选），
+          按档位的 structured_output 配置以 JSON Schema / JSON 模式 / 函数调用方式传给模型
 
         返回：
-        - 模型返回的文本内容，若为空则返回空字符串
+        - 模型返回的文本内容（函数调用时为调用参数 JSON），若为空则返回空字符串
         """
 
+        options: Dict[str, Any] = {}
+        if temperature is not None:
+            options["temperature"] = temperature
+        return self._chat_completion(prompt, content, set(), options, response_schema)
+
+    def _chat_completion(
+        self,
+        prompt: str,
+        content: str,
+        visited: Set[str],
+        options: Dict[str, Any],
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """带限流、熔断与降级的调用实现；visited 防止降级链成环。"""
+
+        visited.add(self.profile_name)
+        limiter = self.guard.limiter
+        breaker = self.guard.breaker
+
+        # 结构化输出参数按本档位能力生成（降级档位可能不同）
+        structured = self._structured_options(response_schema)
+        system_prompt = prompt
+        if response_schema and self.structured_output == "json_object":
+            # JSON 模式不携带 Schema，改为在系统提示中声明结构
+            schema_text = json.dumps(response_schema["schema"], ensure_ascii=False)
+            system_prompt = f"{prompt}\n输出必须是符合以下 JSON Schema 的 JSON 对象：{schema_text}"
+
         # 按对话格式组织消息
         messages = [
-            {"role": "system", "content": prompt},
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": content},
         ]
+        prompt_tokens = 0
+        if limiter is not None:
+            prompt_tokens = estimate_tokens(system_prompt, self.model) + estimate_tokens(
+                content, self.model
+            )
 
         last_error: Optional[Exception] = None
-        for attempt in range(1, self.max_retries + 1):
+        attempt = 0
+        while attempt < self.max_retries:
+            attempt += 1
+            # 熔断打开时直接降级，不再冲击当前档位
+            if breaker is not None and not breaker.allow_request():
+                return self._call_fallback(
+                    prompt, content, visited, options, last_error, response_schema
+                )
+            if limiter is not None:
+                waited = limiter.acquire(prompt_tokens)
+                if waited > 0:
+                    self._logger.debug(
+                        "Rate limiter delayed %s request by %.2fs", self.profile_name, waited
+                    )
+            started = time.monotonic()
             try:
                 # 发起请求
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    timeout=self.timeout_seconds,
-                )
+                attrs = {
+                    "module": self.module_name,
+                    "profile": self.profile_name,
+                    "model": self.model,
+                    "attempt": attempt,
+                }
+                with span("chat_completion", attrs):
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        timeout=self.timeout_seconds,
+                        **options,
+                        **structured,
+                    )
+                if limiter is not None:
+                    limiter.on_success(time.monotonic() - started)
+                    limiter.record_usage(self._completion_tokens(response))
+                if breaker is not None:
+                    breaker.record_success()
                 # 只返回首条输出内容
-                return response.choices[0].message.content or ""
+                return self._message_text(response.choices[0].message)
             except Exception as exc:
                 # 失败记录并重试
                 last_error = exc
+                if structured and self._is_structured_unsupported(exc):
+                    # 服务端不支持结构化输出参数：本客户端后续调用不再携带，本次重发不计入重试次数
+                    attempt -= 1
+                    self._logger.warning(
+                        "Profile %s rejected structured output (%s), disabling it: %s",
+                        self.profile_name,
+                        self.structured_output,
+                        exc,
+                    )
+                    self.structured_output = "none"
+                    structured = {}
+                    continue
+                throttled = self._is_throttled(exc)
+                if throttled and limiter is not None:
+                    limiter.on_throttled()
+                if breaker is not None:
+                    breaker.record_failure()
                 self._logger.warning(
                     "LLM request failed (attempt %s/%s): %s",
                     attempt,
@@ -93,11 +236,173 @@ class LLMClient:
                     exc,
                 )
                 if attempt < self.max_retries:
-                    time.sleep(self.retry_backoff_seconds)
+                    time.sleep(self._backoff_seconds(attempt, exc, throttled))
 
-        # 重试结束仍失败
+        # 重试结束仍失败：熔断已打开且配置了降级档位时尝试降级
+        if breaker is not None and breaker.state != breaker.CLOSED and self.fallback_profile:
+            return self._call_fallback(
+                prompt, content, visited, options, last_error, response_schema
+            )
         raise RuntimeError(f"LLM request failed after retries: {last_error}")
 
+    def _call_fallback(
+        self,
+        prompt: str,
+        content: str,
+        visited: Set[str],
+        options: Dict[str, Any],
+        last_error: Optional[Exception],
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """熔断打开时切换到降级档位。"""
+
+        fallback = self.fallback_profile
+        if not fallback or fallback in visited:
+            raise RuntimeError(
+                f"LLM circuit open for profile '{self.profile_name}' and no fallback available: "
+                f"{last_error}"
+            )
+        if self._fallback_client is None:
+            self._fallback_client = LLMClient(
+                settings_path=self.settings_path,
+                module_name=self.module_name,
+                profile=str(fallback),
+            )
+        self._logger.warning(
+            "LLM circuit open for profile %s, failing over to %s", self.profile_name, fallback
+        )
+        return self._fallback_client._chat_completion(
+            prompt, content, visited, options, response_schema
+        )
+
+    def _structured_options(self, response_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """按 structured_output 配置生成结构化输出请求参数。"""
+
+        if not response_schema or self.structured_output == "none":
+            return {}
+        name = response_schema.get("name", "output")
+        if self.structured_output == "json_schema":
+            return {
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": name,
+                        "description": response_schema.get("description", ""),
+                        "schema": response_schema["schema"],
+                        "strict": False,
+                    },
+                }
+            }
+        if self.structured_output == "json_object":
+            return {"response_format": {"type": "json_object"}}
+        if self.structured_output == "tools":
+            return {
+                "tools": [
+                    {
+                        "type": "function",
+                        "function": {
+                            "name": name,
+                            "description": response_schema.get("description", ""),
+                            "parameters": response_schema["schema"],
+                        },
+                    }
+                ],
+                "tool_choice": {"type": "function", "function": {"name": name}},
+            }
+        self._logger.warning("Unknown structured_output mode: %s", self.structured_output)
+        return {}
+
+    @staticmethod
+    def _message_text(message: Any) -> str:
+        """读取输出文本；函数调用模式下正文为空时返回首个调用的参数 JSON。"""
+        content = getattr(message, "content", None)
+        if content:
+            return content
+        tool_calls = getattr(message, "tool_calls", None) or []
+        for call in tool_calls:
+            function = getattr(call, "function", None)
+            arguments = getattr(function, "arguments", None)
+            if arguments:
+                return arguments
+        return ""
+
+    def _backoff_seconds(self, attempt: int, exc: Exception, throttled: bool) -> float:
+        """指数退避 + 抖动；限流响应优先遵循 Retry-After。"""
+
+        if throttled:
+            retry_after = self._retry_after_seconds(exc)
+            if retry_after is not None:
+                return retry_after
+        base = float(self.retry_backoff_seconds) * (2 ** (attempt - 1))
+        return base * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _is_structured_unsupported(exc: Exception) -> bool:
+        """
+        判断 400 错误是否因服务端不支持结构化输出参数。
+
+        只有错误信息同时提到结构化参数与“不支持”类描述时才关闭结构化输出，
+        上下文超长等其他 400 错误按普通失败处理。
+        """
+        if getattr(exc, "status_code", None) != 400:
+            return False
+        message = str(exc).lower()
+        body = getattr(exc, "body", None)
+        if body:
+            message = f"{message} {json.dumps(body, ensure_ascii=False, default=str).lower()}"
+        return any(name in message for name in _STRUCTURED_PARAMS) and any(
+            hint in message for hint in _UNSUPPORTED_HINTS
+        )
+
+    @staticmethod
+    def _profile_config(base: dict, override: dict) -> dict:
+        """基础 llm 配置叠加档位配置；限流、熔断与降级配置只取档位自身的设置。"""
+        resolved = {key: value for key, value in base.items() if key not in _PROFILE_ONLY_KEYS}
+        resolved.update(override)
+        return resolved
+
+    @staticmethod
+    def _is_throttled(exc: Exception) -> bool:
+        """判断异常是否为 429 限流。"""
+        return getattr(exc, "status_code", None) == 429
+
+    @staticmethod
+    def _retry_after_seconds(exc: Exception) -> Optional[float]:
+        """从异常附带的响应头中读取 Retry-After。"""
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _completion_tokens(response: Any) -> int:
+        """读取响应中的输出 token 数，无 usage 时返回 0。"""
+        usage = getattr(response, "usage", None)
+        return int(getattr(usage, "completion_tokens", 0) or 0)
+
+    def _resolve_profile_name(
+        self,
+        module_map: dict,
+        module_name: Optional[str],
+    ) -> str:
+        """解析模块实际使用的档位名，作为限流/熔断的共享键。"""
+
+        selected = None
+        if module_name and module_name in module_map:
+            selected = module_map.get(module_name)
+        elif "default" in module_map:
+            selected = module_map.get("default")
+
+        if isinstance(selected, str) and selected:
+            return selected
+        if isinstance(selected, dict):
+            return f"module:{module_name or 'default'}"
+        return "default"
+
     def _resolve_module_settings(
         self,
         base: dict,
@@ -118,14 +423,13 @@ class LLMClient:
             selected = module_map.get("default")
 
         if isinstance(selected, dict):
-            resolved.update(selected)
-            return resolved
+            return self._profile_config(base, selected)
 
         if isinstance(selected, str):
             profile = profiles.get(selected)
             if isinstance(profile, dict):
-                resolved.update(profile)
-                return resolved
-            resolved["model"] = selected
+                return self._profile_config(base, profile)
+            if selected != "default":
+                return self._profile_config(base, {"model": selected})
 
         return resolved
@@ -0,0 +1,203 @@
+"""按模型档位的自适应限流与熔断。
+
+组件：
+- TokenBucket：令牌桶，按每分钟速率连续补充
+- AdaptiveRateLimiter：请求数/分钟 + token 数/分钟双桶，按 AIMD 调整速率
+- CircuitBreaker：连续失败达到阈值后熔断，冷却后半开试探
+- get_profile_guard：进程内按档位共享限流器与熔断器
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """线程安全的令牌桶。"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None) -> None:
+        self._lock = threading.Lock()
+        self.rate_per_minute = float(rate_per_minute)
+        # 默认允许一分钟额度的突发
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        """调整补充速率（容量保持不变）。"""
+        with self._lock:
+            self._refill()
+            self.rate_per_minute = max(float(rate_per_minute), 1e-6)
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """阻塞直到获取到 amount 个令牌，返回等待秒数。"""
+        # 单次请求超过容量时按容量计，避免永久等待
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                deficit = amount - self._tokens
+                delay = deficit * 60.0 / self.rate_per_minute
+            time.sleep(delay)
+            waited += delay
+
+    def debit(self, amount: float) -> None:
+        """事后扣减令牌（允许为负，后续请求将相应等待）。"""
+        with self._lock:
+            self._refill()
+            self._tokens -= float(amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+
+
+class AdaptiveRateLimiter:
+    """
+    请求数与 token 数双维度限流，按 AIMD 自适应调整。
+
+    - 成功且延迟正常：速率因子加性增长（increase_step）
+    - 收到 429：速率因子乘性下降（decrease_factor）
+    - 延迟超过 latency_target_seconds：轻度乘性下降（latency_decrease_factor）
+    """
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self._lock = threading.Lock()
+        self.base_rpm = float(cfg.get("requests_per_minute", 0) or 0)
+        self.base_tpm = float(cfg.get("tokens_per_minute", 0) or 0)
+        self.min_fraction = float(cfg.get("min_fraction", 0.1))
+        self.increase_step = float(cfg.get("increase_step", 0.05))
+        self.decrease_factor = float(cfg.get("decrease_factor", 0.5))
+        self.latency_decrease_factor = float(cfg.get("latency_decrease_factor", 0.8))
+        self.latency_target_seconds = float(cfg.get("latency_target_seconds", 0) or 0)
+        self.factor = 1.0
+        self._requests = TokenBucket(self.base_rpm) if self.base_rpm > 0 else None
+        self._tokens = TokenBucket(self.base_tpm) if self.base_tpm > 0 else None
+
+    def acquire(self, tokens: int) -> float:
+        """为一次请求获取配额，返回总等待秒数。"""
+        waited = 0.0
+        if self._requests is not None:
+            waited += self._requests.acquire(1)
+        if self._tokens is not None:
+            waited += self._tokens.acquire(tokens)
+        return waited
+
+    def record_usage(self, extra_tokens: int) -> None:
+        """按实际用量补扣 token（例如输出 token）。"""
+        if self._tokens is not None and extra_tokens > 0:
+            self._tokens.debit(extra_tokens)
+
+    def on_success(self, latency_seconds: float) -> None:
+        """成功回调：延迟超标则降速，否则加性恢复。"""
+        if self.latency_target_seconds and latency_seconds > self.latency_target_seconds:
+            self._scale(self.latency_decrease_factor)
+        else:
+            self._adjust(self.increase_step)
+
+    def on_throttled(self) -> None:
+        """429 回调：乘性降速。"""
+        self._scale(self.decrease_factor)
+
+    def _adjust(self, step: float) -> None:
+        with self._lock:
+            if self.factor >= 1.0:
+                return
+            self.factor = min(1.0, self.factor + step)
+            self._apply()
+
+    def _scale(self, ratio: float) -> None:
+        with self._lock:
+            self.factor = max(self.min_fraction, self.factor * ratio)
+            self._apply()
+
+    def _apply(self) -> None:
+        if self._requests is not None:
+            self._requests.set_rate(self.base_rpm * self.factor)
+        if self._tokens is not None:
+            self._tokens.set_rate(self.base_tpm * self.factor)
+
+
+class CircuitBreaker:
+    """
+    三态熔断器：closed -> open -> half_open -> closed/open。
+
+    - 连续失败 failure_threshold 次后打开
+    - 打开 reset_seconds 后进入半开，只放行一个试探请求
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self._lock = threading.Lock()
+        self.failure_threshold = int(cfg.get("failure_threshold", 5))
+        self.reset_seconds = float(cfg.get("reset_seconds", 30))
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """判断当前是否允许发起请求。"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # 半开状态只允许一个试探请求
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class ProfileGuard:
+    """单个模型档位的限流器与熔断器组合（均为可选）。"""
+
+    def __init__(self, profile_cfg: Dict[str, Any]) -> None:
+        rate_cfg = profile_cfg.get("rate_limit") or {}
+        breaker_cfg = profile_cfg.get("circuit_breaker") or {}
+        self.limiter = AdaptiveRateLimiter(rate_cfg) if rate_cfg else None
+        self.breaker = CircuitBreaker(breaker_cfg) if breaker_cfg else None
+
+
+_guards: Dict[str, ProfileGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_profile_guard(profile_name: str, profile_cfg: Dict[str, Any]) -> ProfileGuard:
+    """获取进程内共享的档位守卫，同一档位的所有客户端共用一份配额。"""
+
+    with _guards_lock:
+        guard = _guards.get(profile_name)
+        if guard is None:
+            guard = ProfileGuard(profile_cfg)
+            _guards[profile_name] = guard
+        return guard
@@ -2,17 +2,23 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 from src.utils.logger import get_logger
+from src.utils.tracer import traced
 
-try:  # 可选依赖
-    from langchain.text_splitter import MarkdownHeaderTextSplitter # type: ignore
 
-    _HAS_LANGCHAIN = True
-except Exception:
-    MarkdownHeaderTextSplitter = None
-    _HAS_LANGCHAIN = False
+@lru_cache(maxsize=1)
+def _load_splitter() -> Any:
+    """按需导入可选依赖 LangChain，未安装时返回 None。"""
+
+    try:
+        from langchain.text_splitter import MarkdownHeaderTextSplitter # type: ignore
+
+        return MarkdownHeaderTextSplitter
+    except Exception:
+        return None
 
 
 class DocSlicer:
@@ -22,10 +28,11 @@ class DocSlicer:
         self._logger = get_logger(__name__)
         self.header_levels = header_levels or [1, 2]
 
+    @traced("DocSlicer.slice_text")
     def slice_text(self, text: str) -> List[Dict[str, Any]]:
         """按标题切分文本为多个切片。"""
 
-        if not _HAS_LANGCHAIN:
+        if _load_splitter() is None:
             raise RuntimeError("LangChain is required for slicing but is not available.")
         return self._slice_with_langchain(text)
 
@@ -33,7 +40,7 @@ class DocSlicer:
         """可用时使用 LangChain 的 MarkdownHeaderTextSplitter。"""
 
         headers = [("#" * level, f"H{level}") for level in self.header_levels]
-        splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers) # type: ignore
+        splitter = _load_splitter()(headers_to_split_on=headers)
         docs = splitter.split_text(text)
         chunks: List[Dict[str, Any]] = []
         for idx, doc in enumerate(docs):
@@ -0,0 +1,599 @@
+"""接口索引：从 Markdown 文档中确定性解析接口定义并持久化。
+
+解析内容：
+- 方法与路径：`**URL:** /x` + `**Method:** POST` 形式、`POST /x` 行，以及含 URL/Method 列的汇总表
+- 参数表：标题含 Query/Body/Path/Header 的参数表（字段名/类型/必填/默认值/描述）
+- 示例：标题含“请求/响应”的代码块，响应示例记录状态码与说明
+- 业务错误码表：含 code/msg 列的表格
+
+用途：
+- 生成阶段为切片提供目标接口提示，让模型只补充异常与边界用例
+- 按接口统计用例覆盖
+- 无需 LLM 生成每个接口的基础正向（骨架）用例
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.file_handler import read_json, read_text, write_json
+from src.utils.hashing import file_hash
+from src.utils.logger import get_logger
+
+INDEX_VERSION = 1
+
+_HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*```\s*([\w+-]*)\s*$")
+# 键值定义行，例如 * **URL:** `/login`、- 请求方式：POST
+_URL_LINE_RE = re.compile(
+    r"^\s*(?:[*-]\s*)?(?:\*\*)?(?:URL|Path|路径|接口地址|请求地址)(?:\*\*)?\s*[:：]\s*(?:\*\*)?\s*`?([^`\s]+)`?",
+    re.IGNORECASE,
+)
+_METHOD_LINE_RE = re.compile(
+    r"^\s*(?:[*-]\s*)?(?:\*\*)?(?:Method|请求方式|请求方法)(?:\*\*)?\s*[:：]\s*(?:\*\*)?\s*`?([A-Za-z]+)`?",
+    re.IGNORECASE,
+)
+_AUTH_LINE_RE = re.compile(r"^\s*(?:[*-]\s*)?(?:\*\*)?(?:认证|鉴权|Auth)(?:\*\*)?\s*[:：]\s*(?:\*\*)?\s*(\S+)")
+_INLINE_PARAMS_RE = re.compile(
+    r"^\s*(?:[*-]\s*)?(?:\*\*)?(Query|Body|Path|Header)\s*Params(?:\*\*)?\s*[:：]\s*(?:\*\*)?(.*)$",
+    re.IGNORECASE,
+)
+# 行内 “POST /api/login” 形式
+_METHOD_PATH_RE = re.compile(rf"^\s*(?:[*-]\s*)?`?({'|'.join(_HTTP_METHODS)})\s+(/[^\s`]*)`?\s*$")
+_STATUS_RE = re.compile(r"\b([1-5]\d\d)\b")
+_PATH_PARAM_RE = re.compile(r"\{([^/}]+)\}|:([A-Za-z_]\w*)")
+
+# 参数表列名别名
+_COLUMN_ALIASES = {
+    "name": ("字段名", "参数名", "字段", "参数", "name", "field", "param", "parameter"),
+    "type": ("类型", "type"),
+    "required": ("必填", "是否必填", "必选", "required"),
+    "default": ("默认值", "default"),
+    "description": ("描述", "说明", "备注", "description", "desc"),
+}
+_LOCATION_ALIASES = {
+    "query": ("query", "查询"),
+    "body": ("body", "json", "请求体", "form", "表单"),
+    "path": ("path", "路径"),
+    "header": ("header", "请求头"),
+}
+_TRUE_WORDS = {"是", "y", "yes", "true", "必填", "required", "√"}
+
+
+def parse_markdown(text: str, source: str = "") -> List[Dict[str, Any]]:
+    """
+    解析单个 Markdown 文档，返回接口定义列表。
+
+    作用域规则：定义接口的标题下更深层级的小节（参数/示例）归属该接口，
+    遇到同级或更高级标题时结束。
+    """
+
+    endpoints: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    current_level = 0
+    breadcrumb: List[Tuple[int, str]] = []
+
+    for level, title, lines in _iter_sections(text):
+        while breadcrumb and breadcrumb[-1][0] >= level:
+            breadcrumb.pop()
+        breadcrumb.append((level, title))
+        if current is not None and level <= current_level:
+            current = None
+
+        definitions = _find_definitions(lines)
+        if definitions:
+            section = " / ".join(item for _, item in breadcrumb)
+            for method, path in definitions:
+                endpoint = _new_endpoint(method, path, title, section, source)
+                endpoint["description"] = _first_paragraph(lines)
+                endpoints.append(endpoint)
+            # 单接口小节内的参数表与示例归属该接口；多接口小节不做归属
+            current = endpoints[-1] if len(definitions) == 1 else None
+            current_level = level
+            if current is not None:
+                current["auth"] = _find_auth(lines)
+                _attach_section(current, title, lines, defining=True)
+        else:
+            endpoints.extend(
+                _new_endpoint(method, path, name or title, " / ".join(t for _, t in breadcrumb), source, description)
+                for method, path, name, description in _find_route_tables(lines)
+            )
+            if current is not None:
+                _attach_section(current, title, lines, defining=False)
+    return endpoints
+
+
+class EndpointIndex:
+    """
+    持久化的接口索引。
+
+    文件结构：{"version", "sources": {文档路径: 文件哈希}, "endpoints": [...]}；
+    重建时文档哈希未变化的部分直接复用。
+    """
+
+    def __init__(self, path: str) -> None:
+        self._logger = get_logger(__name__)
+        self.path = Path(path)
+        self.sources: Dict[str, str] = {}
+        self.endpoints: List[Dict[str, Any]] = []
+        if self.path.exists():
+            try:
+                data = read_json(str(self.path)) or {}
+                if data.get("version") == INDEX_VERSION:
+                    self.sources = dict(data.get("sources", {}))
+                    self.endpoints = list(data.get("endpoints", []))
+            except (OSError, ValueError) as exc:
+                self._logger.warning("Ignoring unreadable endpoint index %s: %s", self.path, exc)
+
+    def build(self, doc_paths: Iterable[Path]) -> List[Dict[str, Any]]:
+        """解析文档并更新索引（仅重新解析内容变化的文档），返回这些文档的接口。"""
+
+        result: List[Dict[str, Any]] = []
+        for doc in doc_paths:
+            source = str(doc)
+            digest = file_hash(source)
+            if self.sources.get(source) == digest:
+                result.extend(self.for_source(source))
+                continue
+            parsed = parse_markdown(read_text(source), source)
+            self.endpoints = [item for item in self.endpoints if item.get("source") != source]
+            self.endpoints.extend(parsed)
+            self.sources[source] = digest
+            result.extend(parsed)
+            self._logger.info("Indexed %s endpoint(s) from %s", len(parsed), source)
+        return result
+
+    def save(self) -> None:
+        """写回索引文件。"""
+        write_json(
+            str(self.path),
+            {"version": INDEX_VERSION, "sources": self.sources, "endpoints": self.endpoints},
+        )
+
+    def for_source(self, source: str) -> List[Dict[str, Any]]:
+        """返回某个文档定义的接口。"""
+        return [item for item in self.endpoints if item.get("source") == source]
+
+    def for_text(self, text: str) -> List[Dict[str, Any]]:
+        """返回路径出现在给定文本（如切片）中的接口。"""
+        found: List[Dict[str, Any]] = []
+        seen = set()
+        for item in self.endpoints:
+            path = item.get("path", "")
+            if item["id"] in seen or not path or path == "/":
+                continue
+            if f"`{path}`" in text or re.search(rf"(?<![\w/]){re.escape(path)}(?![\w/])", text):
+                seen.add(item["id"])
+                found.append(item)
+        return found
+
+    def match(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """按方法与 URL 匹配接口（路径参数匹配任意单段，按路径后缀比较）。"""
+        path = re.sub(r"^[a-z]+://[^/]+", "", str(url or ""), flags=re.IGNORECASE).split("?")[0]
+        method = str(method or "").upper()
+        best: Optional[Dict[str, Any]] = None
+        best_score: Tuple[int, int] = (-1, 0)
+        for item in self.endpoints:
+            if item.get("method") != method:
+                continue
+            template = item.get("path", "")
+            # 多个接口都能匹配时取最具体的路径模板：字面部分更长、路径参数更少，例如 /page 优先于 /{id}
+            score = (len(_PATH_PARAM_RE.sub("", template)), -len(_PATH_PARAM_RE.findall(template)))
+            if score > best_score and _path_pattern(template).search(path):
+                best, best_score = item, score
+        return best
+
+    def coverage(self, cases: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        按接口统计用例覆盖。
+
+        返回：
+        - endpoints: [{id, title, cases}]，cases 为匹配到的用例数
+        - covered / total: 至少有一条用例的接口数 / 接口总数
+        - unmatched: 无法匹配到任何接口的用例数
+        """
+        counts = {item["id"]: 0 for item in self.endpoints}
+        unmatched = 0
+        for case in cases:
+            if not isinstance(case, dict):
+                continue
+            endpoint = self.match(case.get("method", "GET"), case.get("url", ""))
+            if endpoint is None:
+                unmatched += 1
+            else:
+                counts[endpoint["id"]] += 1
+        rows = [
+            {"id": item["id"], "title": item.get("title", ""), "cases": counts[item["id"]]}
+            for item in self.endpoints
+        ]
+        return {
+            "endpoints": rows,
+            "covered": sum(1 for row in rows if row["cases"]),
+            "total": len(rows),
+            "unmatched": unmatched,
+        }
+
+
+def describe_endpoints(endpoints: List[Dict[str, Any]]) -> str:
+    """将接口列表格式化为紧凑的生成提示。"""
+
+    lines = ["目标接口（由文档解析得到）:"]
+    for item in endpoints:
+        required = [
+            param["name"]
+            for params in item.get("params", {}).values()
+            for param in params
+            if param.get("required")
+        ]
+        suffix = f"（必填: {', '.join(required)}）" if required else ""
+        lines.append(f"- {item['id']} {item.get('title', '')}{suffix}")
+    return "\n".join(lines)
+
+
+def skeleton_cases(
+    endpoints: List[Dict[str, Any]],
+    base_url: str = "",
+    known_values: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    为每个接口生成一条基础正向用例（不调用 LLM）。
+
+    只填写必填参数与带默认值的参数（路径参数总是填写）；
+    取值优先级：文档请求示例 > 同名全局变量（known_values，按末段名匹配）> 默认值 > 按类型的占位值。
+    """
+
+    known = known_values or {}
+    cases: List[Dict[str, Any]] = []
+    for item in endpoints:
+        example = item.get("request_example")
+        example = example if isinstance(example, dict) else {}
+        params = item.get("params", {})
+        values = {
+            location: {
+                param["name"]: _param_value(param, example, known)
+                for param in params.get(location, [])
+                if location == "path" or param.get("required") or param.get("default") not in (None, "")
+            }
+            for location in ("path", "query", "body", "header")
+        }
+        path = _PATH_PARAM_RE.sub(
+            lambda m: str(values["path"].get(m.group(1) or m.group(2), 1)), item["path"]
+        )
+        body = values["body"]
+        if not body and example and item["method"] in {"POST", "PUT", "PATCH"}:
+            body = dict(example)
+        cases.append(
+            {
+                "name": f"{item.get('title') or item['id']} - 基础用例",
+                "module": item.get("section", "").split(" / ")[0] or None,
+                "story": item.get("title"),
+                "url": f"{base_url.rstrip('/')}{path}" if base_url else path,
+                "method": item["method"],
+                "headers": values["header"],
+                "params": values["query"],
+                "data": body,
+                "expected": _expected_text(item),
+                "assert_type": "semantic_match",
+                "use_auth": item.get("auth") is not False,
+                "source": "skeleton",
+            }
+        )
+    return cases
+
+
+def _iter_sections(text: str) -> Iterable[Tuple[int, str, List[str]]]:
+    """按标题切分文档为（层级，标题，正文行）；代码块内的 # 不视为标题。"""
+
+    level, title = 0, ""
+    lines: List[str] = []
+    in_fence = False
+    for line in text.splitlines():
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        heading = None if in_fence else _HEADING_RE.match(line)
+        if heading:
+            if lines or title:
+                yield level, title, lines
+            level, title, lines = len(heading.group(1)), heading.group(2).strip(), []
+        else:
+            lines.append(line)
+    if lines or title:
+        yield level, title, lines
+
+
+def _find_definitions(lines: List[str]) -> List[Tuple[str, str]]:
+    """查找小节中的接口定义（URL/Method 键值行或 “METHOD /path” 行）。"""
+
+    urls: List[str] = []
+    methods: List[str] = []
+    pairs: List[Tuple[str, str]] = []
+    in_fence = False
+    for line in lines:
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        url_match = _URL_LINE_RE.match(line)
+        if url_match:
+            urls.append(url_match.group(1))
+            continue
+        method_match = _METHOD_LINE_RE.match(line)
+        if method_match and method_match.group(1).upper() in _HTTP_METHODS:
+            methods.append(method_match.group(1).upper())
+            continue
+        pair = _METHOD_PATH_RE.match(line)
+        if pair:
+            pairs.append((pair.group(1), pair.group(2)))
+    pairs.extend(zip(methods, urls))
+    return pairs
+
+
+def _first_paragraph(lines: List[str]) -> str:
+    """取小节正文中第一行普通文本作为接口描述（跳过列表、表格与代码块）。"""
+
+    for line in lines:
+        text = line.strip()
+        if text and not text.startswith(("*", "-", "|", "`", ">")):
+            return text
+    return ""
+
+
+def _find_auth(lines: List[str]) -> Optional[bool]:
+    """解析“认证: 是/否”。"""
+
+    for line in lines:
+        match = _AUTH_LINE_RE.match(line)
+        if match:
+            return match.group(1).strip("*` ").lower() in _TRUE_WORDS
+    return None
+
+
+def _find_route_tables(lines: List[str]) -> List[Tuple[str, str, str, str]]:
+    """解析含 URL 与 Method 列的汇总表，返回（方法，路径，名称，描述）。"""
+
+    routes: List[Tuple[str, str, str, str]] = []
+    for header, rows in _iter_tables(lines):
+        lowered = [cell.lower() for cell in header]
+        url_col = _column_index(lowered, ("url", "路径", "path", "接口地址"))
+        method_col = _column_index(lowered, ("method", "方法", "请求方式"))
+        if url_col is None or method_col is None:
+            continue
+        name_col = _column_index(lowered, ("功能", "名称", "name", "接口"))
+        desc_col = _column_index(lowered, ("描述", "说明", "description"))
+        for row in rows:
+            method = _cell(row, method_col).strip("`").upper()
+            path = _cell(row, url_col).strip("`")
+            if method in _HTTP_METHODS and path.startswith("/"):
+                routes.append((method, path, _cell(row, name_col), _cell(row, desc_col)))
+    return routes
+
+
+def _attach_section(endpoint: Dict[str, Any], title: str, lines: List[str], defining: bool) -> None:
+    """将小节中的参数表、错误码表与示例归属到接口。"""
+
+    lowered_title = title.lower()
+    for header, rows in _iter_tables(lines):
+        lowered = [cell.lower() for cell in header]
+        if _column_index(lowered, ("code", "错误码", "状态码")) is not None and _column_index(
+            lowered, ("msg", "message", "说明", "描述")
+        ) is not None and _column_index(lowered, _COLUMN_ALIASES["name"]) is None:
+            code_col = _column_index(lowered, ("code", "错误码", "状态码"))
+            msg_col = _column_index(lowered, ("msg", "message", "说明", "描述"))
+            endpoint.setdefault("error_codes", []).extend(
+                {"code": _cell(row, code_col), "msg": _cell(row, msg_col)} for row in rows
+            )
+            continue
+        name_col = _column_index(lowered, _COLUMN_ALIASES["name"])
+        if name_col is None:
+            continue
+        location = _location_of(lowered_title, endpoint["method"])
+        columns = {key: _column_index(lowered, aliases) for key, aliases in _COLUMN_ALIASES.items()}
+        params = endpoint["params"].setdefault(location, [])
+        for row in rows:
+            name = _cell(row, name_col).strip("`")
+            if not name:
+                continue
+            params.append(
+                {
+                    "name": name,
+                    "type": _cell(row, columns["type"]).lower() or "string",
+                    "required": _cell(row, columns["required"]).lower() in _TRUE_WORDS,
+                    "default": _parse_default(_cell(row, columns["default"])),
+                    "description": _cell(row, columns["description"]),
+                }
+            )
+
+    for line in lines:
+        inline = _INLINE_PARAMS_RE.match(line)
+        if inline:
+            location = inline.group(1).lower()
+            names = re.findall(r"`([A-Za-z_][\w]*)`", inline.group(2))
+            endpoint["params"].setdefault(location, []).extend(
+                {"name": name, "type": "string", "required": True, "default": None, "description": ""}
+                for name in names
+            )
+
+    is_response = any(word in lowered_title for word in ("响应", "返回", "response"))
+    is_request = any(word in lowered_title for word in ("请求", "request"))
+    for block in _iter_code_blocks(lines):
+        body = _parse_example(block)
+        if is_response:
+            status = _STATUS_RE.search(title)
+            endpoint["responses"].append(
+                {"status": int(status.group(1)) if status else None, "label": title, "body": body}
+            )
+        elif (is_request or defining) and endpoint.get("request_example") is None:
+            endpoint["request_example"] = body
+
+
+def _new_endpoint(
+    method: str,
+    path: str,
+    title: str,
+    section: str,
+    source: str,
+    description: str = "",
+) -> Dict[str, Any]:
+    """创建接口定义字典。"""
+
+    return {
+        "id": f"{method} {path}",
+        "method": method,
+        "path": path,
+        "title": title,
+        "section": section,
+        "source": source,
+        "description": description,
+        "auth": None,
+        "params": {},
+        "request_example": None,
+        "responses": [],
+    }
+
+
+def _iter_tables(lines: List[str]) -> Iterable[Tuple[List[str], List[List[str]]]]:
+    """解析 Markdown 表格，返回（表头，数据行）。"""
+
+    index = 0
+    while index < len(lines):
+        line = lines[index].strip()
+        if (
+            line.startswith("|")
+            and index + 1 < len(lines)
+            and re.match(r"^\s*\|?\s*:?-{2,}", lines[index + 1])
+        ):
+            header = _split_row(line)
+            rows: List[List[str]] = []
+            index += 2
+            while index < len(lines) and lines[index].strip().startswith("|"):
+                rows.append(_split_row(lines[index].strip()))
+                index += 1
+            yield header, rows
+            continue
+        index += 1
+
+
+def _iter_code_blocks(lines: List[str]) -> Iterable[str]:
+    """提取代码块正文。"""
+
+    block: Optional[List[str]] = None
+    for line in lines:
+        if _FENCE_RE.match(line):
+            if block is None:
+                block = []
+            else:
+                yield "\n".join(block)
+                block = None
+        elif block is not None:
+            block.append(line)
+
+
+def _parse_example(text: str) -> Any:
+    """解析示例：严格 JSON > JSON5（可选依赖）> 原文。"""
+
+    stripped = text.strip()
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        pass
+    try:
+        import json5
+
+        return json5.loads(stripped)
+    except Exception:
+        return stripped
+
+
+def _split_row(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _column_index(header: List[str], aliases: Iterable[str]) -> Optional[int]:
+    for idx, cell in enumerate(header):
+        if any(alias == cell or alias in cell for alias in aliases):
+            return idx
+    return None
+
+
+def _cell(row: List[str], index: Optional[int]) -> str:
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def _location_of(title: str, method: str) -> str:
+    """根据参数小节标题判断参数位置，无法判断时 GET/DELETE 视为 query，其余为 body。"""
+
+    for location, aliases in _LOCATION_ALIASES.items():
+        if any(alias in title for alias in aliases):
+            return location
+    return "query" if method in {"GET", "DELETE", "HEAD"} else "body"
+
+
+def _parse_default(text: str) -> Any:
+    if not text or text in {"-", "无"}:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _param_value(param: Dict[str, Any], example: Dict[str, Any], known: Dict[str, Any]) -> Any:
+    """为参数选取取值。"""
+
+    name = param["name"]
+    if name in example:
+        return example[name]
+    for key, value in known.items():
+        if key.rsplit(".", 1)[-1] == name and not isinstance(value, (dict, list)):
+            return value
+    if param.get("default") not in (None, ""):
+        return param["default"]
+    kind = str(param.get("type") or "string")
+    if "int" in kind or "long" in kind:
+        return 1
+    if "number" in kind or "float" in kind or "double" in kind:
+        return 1.0
+    if "bool" in kind:
+        return True
+    if "array" in kind or "list" in kind:
+        return []
+    if "email" in name.lower():
+        return "test@example.com"
+    return "test"
+
+
+def _expected_text(endpoint: Dict[str, Any]) -> str:
+    """根据成功响应示例生成预期描述。"""
+
+    for response in endpoint.get("responses", []):
+        label = str(response.get("label") or "")
+        status = response.get("status")
+        if "成功" in label or (status is not None and 200 <= status < 300):
+            body = response.get("body")
+            if isinstance(body, dict):
+                msg = body.get("msg") or body.get("message")
+                if msg and msg != "成功":
+                    return f"成功：{msg}"
+                if msg:
+                    return "成功"
+                if "code" in body:
+                    return f"成功：code 为 {body['code']}"
+            return "成功"
+    return "成功"
+
+
+def _path_pattern(path: str) -> "re.Pattern[str]":
+    """路径模板转后缀匹配正则，路径参数匹配任意单段。"""
+
+    parts = _PATH_PARAM_RE.split(path)
+    # split 会带出分组内容（奇数位置），只保留字面部分
+    literals = [part for idx, part in enumerate(parts) if idx % 3 == 0]
+    regex = "[^/]+".join(re.escape(part or "") for part in literals)
+    return re.compile(f"{regex}/?$")
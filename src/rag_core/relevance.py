@@ -0,0 +1,162 @@
+"""切片相关性预过滤：本地轻量打分，过滤概述、更新日志、错误码表等非接口切片。
+
+思路：
+- 从标题与正文提取手工特征（HTTP 方法、URL 路径、参数表、代码块、JSON 体、请求/响应关键字等）
+- 线性加权后经 sigmoid 映射为 0~1 分数，低于阈值的切片不送入生成
+- 无需任何模型或外部依赖，单个切片只做若干次正则扫描
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import Any, Dict, List, Tuple
+
+from src.utils.logger import get_logger
+
+# 特征：名称 -> (正则, 作用范围 title/content/both, 计数饱和上限)
+_FEATURES: Dict[str, Tuple["re.Pattern[str]", str, int]] = {
+    "http_method": (re.compile(r"\b(?:GET|POST|PUT|DELETE|PATCH)\b"), "both", 2),
+    "url_path": (
+        re.compile(
+            r"https?://[^\s`)]+"
+            r"|`/[\w\-{}:./]*`"
+            r"|(?<![\w.:/])/(?:api|v\d+)/[\w\-{}:./]+"
+            r"|(?<![\w.:/])/[A-Za-z_][\w\-{}:]*/[\w\-{}:./]+"
+        ),
+        "content",
+        2,
+    ),
+    "param_table": (
+        re.compile(
+            r"^\s*\|.*(?:参数|字段|类型|必填|name|type|required|param).*\|\s*$",
+            re.IGNORECASE | re.MULTILINE,
+        ),
+        "content",
+        1,
+    ),
+    "code_fence": (re.compile(r"^\s*```", re.MULTILINE), "content", 1),
+    "json_body": (re.compile(r"[{\[]\s*\"?[A-Za-z_]\w*\"?\s*:"), "content", 1),
+    "io_keyword": (
+        re.compile(
+            r"请求|响应|返回|接口地址|请求方式|request|response|endpoint|parameter",
+            re.IGNORECASE,
+        ),
+        "both",
+        2,
+    ),
+    "changelog": (
+        re.compile(
+            r"更新日志|变更记录|版本历史|修订记录|changelog|release notes|\bv?\d+\.\d+\.\d+\b",
+            re.IGNORECASE,
+        ),
+        "both",
+        1,
+    ),
+    "overview": (
+        re.compile(r"概述|简介|介绍|前言|目录|说明书|overview|introduction|getting started", re.IGNORECASE),
+        "title",
+        1,
+    ),
+    "error_codes": (
+        re.compile(r"错误码|状态码说明|返回码说明|error codes?|status codes?", re.IGNORECASE),
+        "title",
+        1,
+    ),
+}
+
+# 默认权重（可通过 rag.relevance.weights 覆盖）
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "bias": -2.0,
+    "http_method": 2.0,
+    "url_path": 2.0,
+    "param_table": 1.5,
+    "code_fence": 0.5,
+    "json_body": 1.0,
+    "io_keyword": 1.0,
+    "changelog": -2.0,
+    "overview": -1.5,
+    "error_codes": -2.5,
+}
+
+
+class RelevanceScorer:
+    """
+    切片相关性打分器。
+
+    配置（rag.relevance）：
+    - enabled: 是否启用
+    - threshold: 分数阈值（0~1），低于阈值的切片跳过
+    - weights: 特征权重覆盖
+    """
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self._logger = get_logger(__name__)
+        self.enabled = bool(cfg.get("enabled", False))
+        self.threshold = float(cfg.get("threshold", 0.5))
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update({str(k): float(v) for k, v in (cfg.get("weights") or {}).items()})
+        self.kept = 0
+        self.skipped: List[Tuple[str, float]] = []
+
+    def features(self, title: str, content: str) -> Dict[str, float]:
+        """提取特征：各项为 0~1 的饱和计数。"""
+
+        values: Dict[str, float] = {}
+        for name, (pattern, scope, cap) in _FEATURES.items():
+            count = 0
+            if scope in ("title", "both"):
+                count += len(pattern.findall(title))
+            if scope in ("content", "both") and count < cap:
+                count += sum(1 for _ in _take(pattern.finditer(content), cap - count))
+            values[name] = min(count, cap) / cap
+        return values
+
+    def score(self, title: str, content: str) -> float:
+        """计算切片相关性分数（0~1）。"""
+
+        values = self.features(title, content)
+        total = self.weights.get("bias", 0.0)
+        for name, value in values.items():
+            total += self.weights.get(name, 0.0) * value
+        return 1.0 / (1.0 + math.exp(-total))
+
+    def is_relevant(self, chunk: Dict[str, Any]) -> bool:
+        """判断切片是否达到阈值，并记录保留/跳过统计。"""
+
+        title = str(chunk.get("title") or "")
+        score = self.score(title, str(chunk.get("content") or ""))
+        if score >= self.threshold:
+            self.kept += 1
+            return True
+        self.skipped.append((title, score))
+        self._logger.info("Skipping low-relevance chunk: %s (score=%.2f)", title, score)
+        return False
+
+    def report(self) -> Dict[str, Any]:
+        """输出并返回保留/跳过统计。"""
+
+        summary = {
+            "threshold": self.threshold,
+            "kept": self.kept,
+            "skipped": len(self.skipped),
+            "skipped_chunks": [
+                {"title": title, "score": round(score, 3)} for title, score in self.skipped
+            ],
+        }
+        self._logger.info(
+            "Chunk relevance filter: kept=%s skipped=%s threshold=%.2f",
+            summary["kept"],
+            summary["skipped"],
+            self.threshold,
+        )
+        return summary
+
+
+def _take(iterator: Any, limit: int) -> Any:
+    """最多取 limit 个元素，达到饱和上限后停止扫描。"""
+
+    for index, item in enumerate(iterator):
+        if index >= limit:
+            return
+        yield item
@@ -0,0 +1,217 @@
+"""切片检索索引：为每个生成切片检索文档中相关的其他切片（鉴权说明、公共错误码、数据模型等）。
+
+思路：
+- 对全部切片（含未参与生成的概述、错误码表等）建立 BM25 倒排索引
+- 词项：英文单词/数字（含路径分段、错误码）+ 中日韩相邻双字
+- 索引按来源文档分区持久化：文档未变化时直接复用，无需重新分词；
+  更新某个文档（如监听模式）只替换该文档的分区，其他文档的索引保持不变
+- 检索覆盖全部分区：单独生成某个文档时，其他文档中的公共鉴权说明、错误码表同样可被检索到
+- 无需任何模型或外部依赖
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.file_handler import read_json, write_json
+from src.utils.logger import get_logger
+
+INDEX_VERSION = 3
+
+_WORD_RE = re.compile(r"[a-z0-9_]{2,}")
+_CJK_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """检索词项：英文单词/数字，以及中日韩字符的相邻双字（单字成词时保留单字）。"""
+
+    lowered = text.lower()
+    terms = _WORD_RE.findall(lowered)
+    for run in _CJK_RUN_RE.findall(lowered):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def _chunk_text(chunk: Dict[str, Any]) -> str:
+    return f"{chunk.get('title') or ''}\n{chunk.get('content') or ''}"
+
+
+class ChunkIndex:
+    """
+    持久化的切片 BM25 索引。
+
+    文件结构：{"version", "k1", "b", "sources": {来源: {"digest": 切片内容哈希,
+    "chunks": [{"title", "content"}, ...], "lengths": [...], "postings": {词项: [[序号, 词频], ...]}}}}；
+    来源为文档路径（多个文档合并生成时以换行拼接）。
+    build 后各分区合并为全局视图：切片序号跨分区连续编号，BM25 统计量按全部分区计算。
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75) -> None:
+        self._logger = get_logger(__name__)
+        self.path = Path(path)
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.chunks: List[Dict[str, Any]] = []
+        self._positions: Dict[int, int] = {}
+        if self.path.exists():
+            try:
+                data = read_json(str(self.path)) or {}
+                if (
+                    data.get("version") == INDEX_VERSION
+                    and data.get("k1") == self.k1
+                    and data.get("b") == self.b
+                ):
+                    self.sources = dict(data.get("sources", {}))
+            except (OSError, ValueError) as exc:
+                self._logger.warning("Ignoring unreadable retrieval index %s: %s", self.path, exc)
+
+    def build(self, chunks: Sequence[Dict[str, Any]], source: str = "") -> None:
+        """为某个来源的切片建立索引；切片内容与已持久化的分区一致时直接复用，否则只替换该分区。"""
+
+        active = list(chunks)
+        hasher = hashlib.sha1()
+        for chunk in active:
+            hasher.update(_chunk_text(chunk).encode("utf-8"))
+            hasher.update(b"\0")
+        digest = hasher.hexdigest()
+        pruned = self._prune()
+        cached = self.sources.get(source) or {}
+        if cached.get("digest") == digest and len(cached.get("chunks", [])) == len(active):
+            self._logger.info("Reusing retrieval index for %s chunk(s)", len(active))
+            if pruned:
+                self.save()
+        else:
+            postings: Dict[str, List[List[int]]] = {}
+            lengths: List[int] = []
+            for pos, chunk in enumerate(active):
+                terms = tokenize(_chunk_text(chunk))
+                lengths.append(len(terms))
+                for term, count in Counter(terms).items():
+                    postings.setdefault(term, []).append([pos, count])
+            self.sources[source] = {
+                "digest": digest,
+                "chunks": [
+                    {"title": chunk.get("title") or "", "content": chunk.get("content") or ""}
+                    for chunk in active
+                ],
+                "lengths": lengths,
+                "postings": postings,
+            }
+            self.save()
+            self._logger.info(
+                "Built retrieval index for %s chunk(s), %s term(s)", len(lengths), len(postings)
+            )
+        self._merge(source, active)
+
+    def _merge(self, source: str, active: List[Dict[str, Any]]) -> None:
+        """合并全部分区为全局视图；本次来源的分区使用传入的切片对象，以便 related 识别查询切片自身。"""
+
+        self.chunks = []
+        self.lengths = []
+        self.postings = {}
+        self._positions = {}
+        for name in sorted(self.sources):
+            section = self.sources[name]
+            offset = len(self.chunks)
+            if name == source:
+                self._positions = {id(chunk): offset + pos for pos, chunk in enumerate(active)}
+                self.chunks.extend(active)
+            else:
+                self.chunks.extend(section.get("chunks", []))
+            self.lengths.extend(section.get("lengths", []))
+            for term, entries in section.get("postings", {}).items():
+                self.postings.setdefault(term, []).extend(
+                    [offset + pos, count] for pos, count in entries
+                )
+
+    def _prune(self) -> bool:
+        """清理来源文档已删除的分区，返回是否有分区被清理。"""
+
+        kept = {
+            source: section
+            for source, section in self.sources.items()
+            if not source or all(Path(part).exists() for part in source.split("\n"))
+        }
+        pruned = len(kept) != len(self.sources)
+        self.sources = kept
+        return pruned
+
+    def save(self) -> None:
+        """写回索引文件；来源文档已删除的分区一并清理。"""
+        self._prune()
+        write_json(
+            str(self.path),
+            {"version": INDEX_VERSION, "k1": self.k1, "b": self.b, "sources": self.sources},
+            compact=True,
+        )
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        min_score: float = 0.0,
+        exclude: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """BM25 检索，返回（切片序号，得分）列表，按得分降序。"""
+
+        total = len(self.lengths)
+        if not total or top_k <= 0:
+            return []
+        avg_len = (sum(self.lengths) / total) or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pos, count in postings:
+                if pos == exclude:
+                    continue
+                norm = self.k1 * (1.0 - self.b + self.b * self.lengths[pos] / avg_len)
+                scores[pos] = scores.get(pos, 0.0) + idf * count * (self.k1 + 1.0) / (count + norm)
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= min_score),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:top_k]
+
+    def related(
+        self,
+        chunk: Dict[str, Any],
+        top_k: int = 3,
+        min_ratio: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        在全部来源分区中检索与给定切片相关的其他切片（不含自身及内容相同的切片）。
+
+        BM25 得分随查询长度增长，因此以切片与自身的得分归一化：
+        只保留得分不低于自身得分 min_ratio 倍的切片。
+        """
+
+        own = self._positions.get(id(chunk))
+        text = _chunk_text(chunk)
+        # 同一文档可能同时出现在单文档与多文档合并的分区中：多取一些候选，按内容去重
+        hits = self.search(text, 2 * top_k + 2)
+        if not hits:
+            return []
+        reference = next((score for pos, score in hits if pos == own), hits[0][1])
+        seen = {text}
+        related: List[Dict[str, Any]] = []
+        for pos, score in hits:
+            candidate = _chunk_text(self.chunks[pos])
+            if pos == own or score < reference * min_ratio or candidate in seen:
+                continue
+            seen.add(candidate)
+            related.append(self.chunks[pos])
+        return related[:top_k]
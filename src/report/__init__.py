@@ -0,0 +1 @@
+"""测试结果汇总与报告。"""
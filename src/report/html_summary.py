@@ -0,0 +1,113 @@
+"""静态 HTML 结果汇总：从结果文件流式聚合并渲染单页报告。
+
+不依赖外部报告工具命令行，数万条结果可在秒级完成渲染。
+"""
+
+from __future__ import annotations
+
+import html
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from src.report.result_sink import iter_results
+
+_OUTCOMES = ("passed", "failed", "skipped", "error")
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>AutoLLM Test Summary</title>
+<style>
+body{{font-family:-apple-system,Segoe UI,Helvetica,Arial,sans-serif;margin:24px;color:#222}}
+table{{border-collapse:collapse;width:100%;margin:12px 0;font-size:13px}}
+th,td{{border:1px solid #ddd;padding:4px 8px;text-align:left;vertical-align:top}}
+th{{background:#f5f5f5}}
+.passed{{color:#2e7d32}}.failed,.error{{color:#c62828}}.skipped{{color:#9e9e9e}}
+.cards span{{display:inline-block;margin-right:16px;font-size:16px}}
+#filter{{margin:8px 0}}
+</style>
+</head>
+<body>
+<h1>AutoLLM Test Summary</h1>
+<p>Generated at {generated_at} · Total {total} · Duration {duration:.2f}s</p>
+<div class="cards">{cards}</div>
+<h2>By module</h2>
+<table><tr><th>Module</th><th>Total</th>{outcome_headers}</tr>{module_rows}</table>
+<h2>Results</h2>
+<div id="filter">Filter:
+<select onchange="filterRows(this.value)"><option value="">all</option>{filter_options}</select>
+</div>
+<table id="results"><tr><th>Outcome</th><th>Module</th><th>Name</th><th>Request</th><th>Duration(s)</th><th>Message</th></tr>
+{result_rows}
+</table>
+<script>
+function filterRows(v){{var rows=document.getElementById('results').rows;
+for(var i=1;i<rows.length;i++){{rows[i].style.display=(!v||rows[i].className===v)?'':'none';}}}}
+</script>
+</body>
+</html>
+"""
+
+
+def render_html_summary(results_path: str, output_path: str) -> Dict[str, int]:
+    """
+    读取结果文件并生成静态 HTML 汇总。
+
+    返回：
+    - 各结果状态的计数（含 total）
+    """
+
+    counts: Counter = Counter()
+    by_module: Dict[str, Counter] = defaultdict(Counter)
+    rows: List[str] = []
+    total_duration = 0.0
+    escape = html.escape
+
+    for record in iter_results(results_path):
+        outcome = str(record.get("outcome") or "error")
+        module = str(record.get("module") or "-")
+        duration = float(record.get("duration") or 0.0)
+        counts[outcome] += 1
+        by_module[module][outcome] += 1
+        total_duration += duration
+        request = f"{record.get('method') or ''} {record.get('url') or ''}".strip()
+        rows.append(
+            f'<tr class="{escape(outcome)}"><td>{escape(outcome)}</td><td>{escape(module)}</td>'
+            f"<td>{escape(str(record.get('name') or record.get('nodeid') or ''))}</td>"
+            f"<td>{escape(request)}</td><td>{duration:.3f}</td>"
+            f"<td>{escape(str(record.get('message') or ''))}</td></tr>"
+        )
+
+    total = sum(counts.values())
+    cards = "".join(
+        f'<span class="{name}">{name}: {counts.get(name, 0)}</span>' for name in _OUTCOMES
+    )
+    outcome_headers = "".join(f"<th>{name}</th>" for name in _OUTCOMES)
+    module_rows = "".join(
+        f"<tr><td>{escape(module)}</td><td>{sum(stat.values())}</td>"
+        + "".join(f"<td>{stat.get(name, 0)}</td>" for name in _OUTCOMES)
+        + "</tr>"
+        for module, stat in sorted(by_module.items())
+    )
+    filter_options = "".join(f'<option value="{name}">{name}</option>' for name in _OUTCOMES)
+
+    page = _PAGE_TEMPLATE.format(
+        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        total=total,
+        duration=total_duration,
+        cards=cards,
+        outcome_headers=outcome_headers,
+        module_rows=module_rows,
+        filter_options=filter_options,
+        result_rows="\n".join(rows),
+    )
+    target = Path(output_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(page, encoding="utf-8")
+
+    summary = {name: counts.get(name, 0) for name in _OUTCOMES}
+    summary["total"] = total
+    return summary
@@ -0,0 +1,121 @@
+"""流式测试结果写入：每条用例结束即追加一条紧凑记录。
+
+支持格式（按扩展名选择）：
+- .jsonl 等：单个 JSON Lines 文件，一行一条记录
+- .db / .sqlite / .sqlite3：单个 SQLite 文件，results 表
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 记录字段（SQLite 列顺序）
+RESULT_FIELDS = (
+    "nodeid",
+    "name",
+    "module",
+    "story",
+    "method",
+    "url",
+    "outcome",
+    "duration",
+    "message",
+    "ts",
+)
+
+
+class ResultSink:
+    """
+    结果写入器。
+
+    - 默认每条记录写入后立即落盘（JSON Lines 刷新到文件，SQLite 提交），
+      工作进程被终止或崩溃时已结束用例的结果不会丢失
+    - batch_size > 1 时按批缓冲（合并分片等非实时场景），close() 时写入剩余记录
+    - 同一路径每次打开都会覆盖上一轮结果
+    """
+
+    def __init__(self, path: str, batch_size: int = 1) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fmt = _detect_format(path)
+        self.batch_size = max(int(batch_size), 1)
+        self._pending: List[Dict[str, Any]] = []
+        self._file: Any = None
+        self._conn: Optional[sqlite3.Connection] = None
+        if self.fmt == "sqlite":
+            if self.path.exists():
+                self.path.unlink()
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS results ({', '.join(RESULT_FIELDS)})"
+            )
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """追加一条结果记录。"""
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """将缓冲的记录写入磁盘。"""
+        if not self._pending:
+            return
+        if self._conn is not None:
+            rows = [tuple(item.get(field) for field in RESULT_FIELDS) for item in self._pending]
+            placeholders = ", ".join("?" for _ in RESULT_FIELDS)
+            self._conn.executemany(f"INSERT INTO results VALUES ({placeholders})", rows)
+            self._conn.commit()
+        elif self._file is not None:
+            self._file.write(
+                "".join(
+                    json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n"
+                    for item in self._pending
+                )
+            )
+            self._file.flush()
+        self._pending.clear()
+
+    def close(self) -> None:
+        """刷新缓冲并关闭文件。"""
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def iter_results(path: str) -> Iterator[Dict[str, Any]]:
+    """按写入顺序逐条读取结果记录（流式，不一次性载入内存）。"""
+
+    target = Path(path)
+    if not target.exists():
+        return
+    if _detect_format(path) == "sqlite":
+        conn = sqlite3.connect(str(target))
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(RESULT_FIELDS)} FROM results")
+            for row in cursor:
+                yield dict(zip(RESULT_FIELDS, row))
+        finally:
+            conn.close()
+        return
+    with open(target, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _detect_format(path: str) -> str:
+    """按扩展名推断格式：.db/.sqlite/.sqlite3 为 sqlite，其余为 jsonl。"""
+
+    suffix = Path(path).suffix.lower()
+    return "sqlite" if suffix in {".db", ".sqlite", ".sqlite3"} else "jsonl"
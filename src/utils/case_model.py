@@ -0,0 +1,141 @@
+"""紧凑的进程内用例表示：大批量用例（10 万级）收集与执行时降低内存占用。
+
+思路：
+- Case 使用 __slots__ 保存常用字段，不为每条用例创建字典
+- 重复出现的 method / url / module / story / assert_type 字符串按值驻留，全部用例共享同一对象
+- 内容相同的 headers 在同一批用例间共享一个只读映射；需要修改（如注入 Token）时先复制（写时复制），
+  单条用例的修改不会影响其他用例
+- Case 实现只读 Mapping 接口（get / [] / in / 迭代），现有按字典读取用例的代码无需改动
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# 以槽位保存的字段（其余字段放入 extra）
+CASE_FIELDS = (
+    "name",
+    "title",
+    "module",
+    "story",
+    "method",
+    "url",
+    "headers",
+    "params",
+    "data",
+    "expected",
+    "assert_type",
+    "use_auth",
+    "use_ai_assertion",
+    "extract",
+)
+
+# 按值驻留的字符串字段（在大批量用例中高度重复）
+_INTERNED_FIELDS = frozenset({"method", "url", "module", "story", "assert_type"})
+
+# 缺失字段的占位（区分“未设置”与“值为 None”）
+_MISSING: Any = object()
+
+_EMPTY: Mapping = MappingProxyType({})
+
+_FIELD_SET = frozenset(CASE_FIELDS)
+
+
+class Case(Mapping):
+    """
+    单条用例的只读紧凑表示。
+
+    - 字段缺失时 get 返回默认值，与原字典行为一致
+    - headers 为只读映射，修改前需复制：headers = dict(case["headers"])
+    """
+
+    __slots__ = CASE_FIELDS + ("extra",)
+
+    def __init__(self, fields: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> None:
+        for field in CASE_FIELDS:
+            object.__setattr__(self, field, fields.get(field, _MISSING))
+        object.__setattr__(self, "extra", extra or None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Case is read-only; render or copy it before modifying")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for field in CASE_FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        count = sum(1 for field in CASE_FIELDS if getattr(self, field) is not _MISSING)
+        return count + (len(self.extra) if self.extra is not None else 0)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return getattr(self, key) is not _MISSING  # type: ignore[arg-type]
+        return self.extra is not None and key in self.extra
+
+    def __repr__(self) -> str:
+        return f"Case({dict(self)!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """还原为普通字典（headers 为新复制的字典）。"""
+
+        data = dict(self)
+        if isinstance(data.get("headers"), Mapping):
+            data["headers"] = dict(data["headers"])
+        return data
+
+
+class CasePool:
+    """
+    一次收集过程共享的驻留表：相同的字符串与 headers 只保留一份。
+
+    用法：pool = CasePool(); case = pool.compact(raw_case)
+    """
+
+    def __init__(self) -> None:
+        self._headers: Dict[Tuple[Tuple[str, Any], ...], Mapping] = {}
+
+    def compact(self, case: Dict[str, Any]) -> Case:
+        """将 json.load 得到的用例字典转换为紧凑表示。"""
+
+        fields: Dict[str, Any] = {}
+        extra: Dict[str, Any] = {}
+        for key, value in case.items():
+            if key not in _FIELD_SET:
+                extra[key] = value
+            elif key in _INTERNED_FIELDS and isinstance(value, str):
+                fields[key] = sys.intern(value)
+            elif key == "headers" and isinstance(value, dict):
+                fields[key] = self._shared_headers(value)
+            else:
+                fields[key] = value
+        return Case(fields, extra)
+
+    def _shared_headers(self, headers: Dict[str, Any]) -> Mapping:
+        """返回内容相同的共享只读 headers；值不可哈希（嵌套结构）时单独包装。"""
+
+        if not headers:
+            return _EMPTY
+        try:
+            key = tuple(sorted(headers.items()))
+            shared = self._headers.get(key)
+        except TypeError:
+            return MappingProxyType(dict(headers))
+        if shared is None:
+            shared = MappingProxyType({sys.intern(str(name)): value for name, value in headers.items()})
+            self._headers[key] = shared
+        return shared
@@ -0,0 +1,50 @@
+"""用例结构归一化：兼容模型输出的常见包裹结构与字段别名。"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+
+def normalize_cases(cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """将模型输出归一化为执行器期望的结构。"""
+
+    # 过滤非 dict 元素并逐条归一化
+    normalized: List[Dict[str, Any]] = []
+    for case in cases:
+        if not isinstance(case, dict):
+            continue
+        normalized.append(normalize_case(case))
+    return normalized
+
+
+def normalize_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """展开请求包裹结构，并映射常见字段别名（原地修改并返回）。"""
+
+    # 兼容 request 包裹结构
+    request = case.get("request")
+    if isinstance(request, dict):
+        if "url" not in case and "url" in request:
+            case["url"] = request.get("url")
+        if "method" not in case and "method" in request:
+            case["method"] = request.get("method")
+        if "headers" not in case and "headers" in request:
+            case["headers"] = request.get("headers")
+        params = request.get("params")
+        if params is None:
+            params = request.get("query")
+        if params is None:
+            params = request.get("query_params")
+        if "params" not in case and params is not None:
+            case["params"] = params
+        body = request.get("data")
+        if body is None:
+            body = request.get("body")
+        if body is None:
+            body = request.get("json")
+        if "data" not in case and body is not None:
+            case["data"] = body
+        case.pop("request", None)
+    # 兼容 body 字段别名
+    if "data" not in case and "body" in case:
+        case["data"] = case.pop("body")
+    return case
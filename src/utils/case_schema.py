@@ -0,0 +1,176 @@
+"""用例结构定义与快速校验。
+
+用途：
+- 作为结构化输出（JSON Schema / 函数调用）传给模型，从源头减少解析失败
+- 对模型返回的用例做逐字段校验（手写检查，无需 jsonschema 依赖）
+- 供本地预评审复用同一套字段规则
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+# 合法的 HTTP 方法与断言类型
+HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS")
+ASSERT_TYPES = ("exact_match", "semantic_match")
+
+# 必填字段
+REQUIRED_FIELDS = ("url", "method", "expected")
+
+# 单条用例的 JSON Schema
+CASE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "name": {"type": "string"},
+        "module": {"type": "string"},
+        "story": {"type": "string"},
+        "url": {"type": "string", "minLength": 1},
+        "method": {"type": "string", "enum": list(HTTP_METHODS)},
+        "headers": {"type": "object"},
+        "params": {"type": "object"},
+        "data": {"type": ["object", "array"]},
+        # 预期结果可为自然语言或结构化内容（如 {"code": 200}），必填校验保证非空
+        "expected": {"type": ["string", "object", "array"], "minLength": 1},
+        "assert_type": {"type": "string", "enum": list(ASSERT_TYPES)},
+        "use_auth": {"type": "boolean"},
+        "use_ai_assertion": {"type": "boolean"},
+        "extract": {"type": "object", "additionalProperties": {"type": "string"}},
+    },
+    "required": list(REQUIRED_FIELDS),
+}
+
+# 结构化输出要求顶层为对象：用例数组放在 cases 字段
+CASES_RESPONSE_SCHEMA: Dict[str, Any] = {
+    "name": "test_cases",
+    "description": "接口测试用例列表",
+    "schema": {
+        "type": "object",
+        "properties": {"cases": {"type": "array", "items": CASE_SCHEMA}},
+        "required": ["cases"],
+    },
+}
+
+# 生成 + 自检：用例数组与自检清单放在同一个响应中
+SELF_CHECK_ITEMS = ("fields_complete", "positive_covered", "negative_covered", "assertions_specific")
+
+SELF_CHECK_RESPONSE_SCHEMA: Dict[str, Any] = {
+    "name": "test_cases_with_self_check",
+    "description": "接口测试用例列表与生成自检结论",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "cases": {"type": "array", "items": CASE_SCHEMA},
+            "self_check": {
+                "type": "object",
+                "properties": {
+                    **{item: {"type": "boolean"} for item in SELF_CHECK_ITEMS},
+                    "gaps": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": [*SELF_CHECK_ITEMS, "gaps"],
+            },
+        },
+        "required": ["cases", "self_check"],
+    },
+}
+
+# JSON Schema 类型 -> Python 类型（bool 不视为数值，见 _matches_type）
+_TYPE_MAP: Dict[str, Tuple[type, ...]] = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "boolean": (bool,),
+    "number": (int, float),
+    "integer": (int,),
+}
+
+# 预编译的字段规则：字段 -> (允许类型, 枚举集合或 None, 是否要求非空)
+_FIELD_RULES: Dict[str, Tuple[Tuple[str, ...], Any, bool]] = {
+    field: (
+        tuple(spec["type"]) if isinstance(spec["type"], list) else (spec["type"],),
+        frozenset(spec["enum"]) if "enum" in spec else None,
+        bool(spec.get("minLength")),
+    )
+    for field, spec in CASE_SCHEMA["properties"].items()
+}
+
+
+def check_case(case: Dict[str, Any]) -> List[Tuple[bool, str]]:
+    """
+    按用例结构逐项检查，返回（是否通过，说明）列表。
+
+    检查项：必填字段非空、方法/断言类型在枚举内（方法大小写不敏感）、
+    各字段类型正确（缺省或 null 的可选字段视为通过）。
+    """
+
+    results: List[Tuple[bool, str]] = []
+    for field in REQUIRED_FIELDS:
+        value = case.get(field)
+        results.append((value not in (None, "", {}, []), f"missing required field '{field}'"))
+
+    for field, (types, enum, _) in _FIELD_RULES.items():
+        value = case.get(field)
+        if value is None:
+            continue
+        results.append((_matches_type(value, types), f"'{field}' must be {' or '.join(types)}"))
+        if enum is not None:
+            normalized = value.upper() if field == "method" and isinstance(value, str) else value
+            results.append((normalized in enum, f"invalid {field} '{value}'"))
+    return results
+
+
+def validate_case(case: Any) -> List[str]:
+    """校验单条用例，返回问题列表（为空表示通过）。"""
+
+    if not isinstance(case, dict):
+        return ["case must be an object"]
+    return [message for ok, message in check_case(case) if not ok]
+
+
+def validate_cases(cases: List[Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    批量校验，返回（通过校验的用例，问题列表）。
+
+    问题以 “[用例名] 说明” 的形式给出，便于直接作为生成反馈。
+    """
+
+    valid: List[Dict[str, Any]] = []
+    issues: List[str] = []
+    for idx, case in enumerate(cases):
+        errors = validate_case(case)
+        if not errors:
+            valid.append(case)
+            continue
+        label = f"case_{idx}"
+        if isinstance(case, dict):
+            label = str(case.get("name") or case.get("title") or label)
+        issues.extend(f"[{label}] {error}" for error in errors)
+    return valid, issues
+
+
+def unwrap_cases(data: Any) -> Any:
+    """
+    展开结构化输出的包裹对象。
+
+    - {"cases": [...]} 返回内部数组
+    - 只有一个数组字段且元素为对象时返回该数组（兼容模型自拟的键名）
+    - 其余原样返回
+    """
+
+    if not isinstance(data, dict):
+        return data
+    if isinstance(data.get("cases"), list):
+        return data["cases"]
+    lists = [value for value in data.values() if isinstance(value, list)]
+    if len(data) == 1 and len(lists) == 1 and all(isinstance(item, dict) for item in lists[0]):
+        return lists[0]
+    return data
+
+
+def _matches_type(value: Any, types: Tuple[str, ...]) -> bool:
+    for name in types:
+        if isinstance(value, bool) and name in ("number", "integer"):
+            continue
+        if isinstance(value, _TYPE_MAP[name]):
+            return True
+    return False
@@ -0,0 +1,163 @@
+"""用例模板：`{{var}}` 占位符在收集阶段编译，执行阶段快速替换。
+
+规则：
+- 字符串整体为单个占位符（如 "{{headers}}"）时替换为原始值，保留类型
+- 字符串中嵌入占位符时按文本拼接
+- 变量名支持点路径（如 account.username），取值来自全局变量与执行期提取变量
+- 未解析的占位符原样保留并记录告警
+"""
+
+from __future__ import annotations
+
+import re
+from collections import abc
+from typing import Any, Dict, List, Mapping, Set, Tuple, Union
+
+from src.utils.logger import get_logger
+
+# 占位符：{{ name }}，名称允许字母、数字、下划线、点与连字符
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][\w.\-]*)\s*\}\}")
+
+# 编译后的字符串：文本片段与变量引用交替
+_Segments = Tuple[Union[str, "_Var"], ...]
+# 编译计划：字符串叶子为片段元组；容器为 {键/下标: 子计划}
+_Plan = Union[_Segments, Dict[Any, Any]]
+
+
+class _Var:
+    """片段中的变量引用。"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class CaseTemplate:
+    """
+    单条用例的编译模板。
+
+    只有包含占位符的路径会被记录，渲染时仅复制这些路径上的容器，
+    其余子结构直接复用原对象。
+    """
+
+    __slots__ = ("source", "_plan", "variables")
+
+    def __init__(self, source: Mapping[str, Any]) -> None:
+        self.source = source
+        self.variables: Set[str] = set()
+        self._plan = self._compile(source)
+
+    @property
+    def is_static(self) -> bool:
+        """用例中不含任何占位符。"""
+        return not self._plan
+
+    def render(self, variables: Mapping[str, Any]) -> Mapping[str, Any]:
+        """按变量表渲染用例，返回新字典（不修改原用例）。"""
+        if not self._plan:
+            return self.source
+        missing: List[str] = []
+        rendered = _render(self.source, self._plan, variables, missing)
+        if missing:
+            get_logger(__name__).warning(
+                "Unresolved template variables in case %s: %s",
+                self.source.get("name"),
+                ", ".join(sorted(set(missing))),
+            )
+        return rendered
+
+    def _compile(self, node: Any) -> Any:
+        """递归编译，返回子计划；无占位符时返回 None/空。"""
+        if isinstance(node, str):
+            if "{{" not in node:
+                return None
+            segments = self._compile_string(node)
+            return segments or None
+        if isinstance(node, abc.Mapping):
+            plan = {}
+            for key, value in node.items():
+                sub = self._compile(value)
+                if sub:
+                    plan[key] = sub
+            return plan
+        if isinstance(node, list):
+            plan = {}
+            for idx, value in enumerate(node):
+                sub = self._compile(value)
+                if sub:
+                    plan[idx] = sub
+            return plan
+        return None
+
+    def _compile_string(self, text: str) -> _Segments:
+        segments: List[Union[str, _Var]] = []
+        cursor = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            if match.start() > cursor:
+                segments.append(text[cursor : match.start()])
+            name = match.group(1)
+            self.variables.add(name)
+            segments.append(_Var(name))
+            cursor = match.end()
+        if not any(isinstance(item, _Var) for item in segments):
+            return ()
+        if cursor < len(text):
+            segments.append(text[cursor:])
+        return tuple(segments)
+
+
+def compile_case(case: Mapping[str, Any]) -> CaseTemplate:
+    """编译单条用例模板。"""
+
+    return CaseTemplate(case)
+
+
+def _render(node: Any, plan: _Plan, variables: Mapping[str, Any], missing: List[str]) -> Any:
+    """按计划渲染：片段元组替换字符串，其余仅复制计划覆盖的容器。"""
+
+    if isinstance(plan, tuple):
+        return _fill(plan, variables, missing)
+    # 映射（含紧凑用例 Case 与共享的只读 headers）复制为新字典，原对象不变
+    copied: Any = dict(node) if isinstance(node, abc.Mapping) else list(node)
+    for key, sub in plan.items():
+        copied[key] = _render(node[key], sub, variables, missing)
+    return copied
+
+
+def _fill(segments: _Segments, variables: Mapping[str, Any], missing: List[str]) -> Any:
+    """填充单个字符串的片段。"""
+
+    if len(segments) == 1 and isinstance(segments[0], _Var):
+        name = segments[0].name
+        if name in variables:
+            return variables[name]
+        missing.append(name)
+        return f"{{{{{name}}}}}"
+    parts: List[str] = []
+    for item in segments:
+        if isinstance(item, _Var):
+            if item.name in variables:
+                parts.append(str(variables[item.name]))
+            else:
+                missing.append(item.name)
+                parts.append(f"{{{{{item.name}}}}}")
+        else:
+            parts.append(item)
+    return "".join(parts)
+
+
+def extract_path(data: Any, path: str) -> Any:
+    """按点路径从 JSON 对象中取值，例如 data.token 或 data.records.0.id；缺失时返回 None。"""
+
+    current = data
+    for key in path.split("."):
+        if isinstance(current, dict):
+            if key not in current:
+                return None
+            current = current[key]
+        elif isinstance(current, list) and key.isdigit() and int(key) < len(current):
+            current = current[int(key)]
+        else:
+            return None
+    return current
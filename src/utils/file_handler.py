@@ -2,16 +2,36 @@
 
 外部库：
 - 配置解析库：解析与写入配置内容。
+- orjson（可选）：安装后用于加速 JSON / JSON Lines 解析。
+
+写入策略：
+- 先写同目录临时文件，fsync 后再原子替换并刷盘目录，断电或并发写入不会留下空文件或半截文件
+- 在 batched_fsync() 范围内的写入在退出时统一 fsync 临时文件、再依次替换目标文件，避免逐文件刷盘
 """
 
 from __future__ import annotations
 
 import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import yaml
 
+from src.utils.tracer import traced
+
+try:  # 可选依赖：更快的 JSON 解析
+    import orjson as _orjson
+except Exception:
+    _orjson = None
+
+# 当前批量 fsync 范围内待刷盘并替换的（临时文件，目标文件）（None 表示不在批量范围内）
+_FSYNC_BATCH: Optional[List[Tuple[str, Path]]] = None
+_FSYNC_LOCK = threading.Lock()
+
 
 def read_yaml(path: str) -> Dict[str, Any]:
     """读取 YAML 配置并返回字典。"""
@@ -20,20 +40,143 @@ def read_yaml(path: str) -> Dict[str, Any]:
         return yaml.safe_load(file) or {}
 
 
+def loads_json(data: Any) -> Any:
+    """解析 JSON 文本或字节（已安装 orjson 时使用 orjson）。"""
+
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
 def read_json(path: str) -> Any:
     """读取 JSON 文件并返回原始对象。"""
 
-    with open(path, "r", encoding="utf-8") as file:
-        return json.load(file)
+    with open(path, "rb") as file:
+        return loads_json(file.read())
 
 
-def write_json(path: str, data: Any) -> None:
-    """将对象写入 JSON 文件，自动创建目录。"""
+def iter_jsonl(path: str) -> Iterator[Any]:
+    """逐行读取 JSON Lines 文件（空行跳过）。"""
+
+    with open(path, "rb") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield loads_json(line)
+
+
+@traced("write_json")
+def write_json(path: str, data: Any, compact: bool = False) -> None:
+    """将对象原子写入 JSON 文件，自动创建目录；compact 为真时不缩进。"""
+
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    _atomic_write(Path(path), text)
+
+
+@traced("write_jsonl")
+def write_jsonl(path: str, records: Iterable[Any]) -> None:
+    """将记录原子写入 JSON Lines 文件（一行一条紧凑 JSON）。"""
+
+    text = "".join(
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records
+    )
+    _atomic_write(Path(path), text)
+
+
+@contextmanager
+def batched_fsync() -> Iterator[None]:
+    """
+    批量刷盘范围：范围内的原子写入先写临时文件，退出时统一 fsync 临时文件、
+    替换目标文件并对每个目录刷盘一次。
+
+    范围内写入的目标文件在退出范围时才更新（同一目标多次写入以最后一次为准）；
+    范围外的写入逐个 fsync 后替换。
+    """
+
+    global _FSYNC_BATCH
+    with _FSYNC_LOCK:
+        outer = _FSYNC_BATCH
+        if outer is None:
+            _FSYNC_BATCH = []
+    if outer is not None:
+        # 嵌套范围并入外层，由最外层统一刷盘
+        yield
+        return
+    try:
+        yield
+    finally:
+        with _FSYNC_LOCK:
+            pending, _FSYNC_BATCH = _FSYNC_BATCH or [], None
+        _commit_pending(pending)
+
+
+def _atomic_write(target: Path, text: str) -> None:
+    """写入同目录临时文件，刷盘后原子替换目标文件（批量范围内延后到范围结束）。"""
 
-    target = Path(path)
     target.parent.mkdir(parents=True, exist_ok=True)
-    with open(target, "w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=2)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text)
+            with _FSYNC_LOCK:
+                deferred = _FSYNC_BATCH is not None
+            if not deferred:
+                file.flush()
+                os.fsync(file.fileno())
+        # mkstemp 创建的文件权限为 0600，沿用原文件权限或常规的 0644
+        mode = target.stat().st_mode & 0o777 if target.exists() else 0o644
+        os.chmod(tmp_path, mode)
+        with _FSYNC_LOCK:
+            if _FSYNC_BATCH is not None:
+                _FSYNC_BATCH.append((tmp_path, target))
+                return
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directories([target.parent])
+
+
+def _commit_pending(pending: List[Tuple[str, Path]]) -> None:
+    """批量范围结束：fsync 全部临时文件后依次替换目标文件，再对每个目录刷盘一次。"""
+
+    latest: Dict[Path, str] = {}
+    for tmp_path, target in pending:
+        # 同一目标多次写入时只保留最后一次
+        stale = latest.get(target)
+        if stale is not None and os.path.exists(stale):
+            os.remove(stale)
+        latest[target] = tmp_path
+    for tmp_path in latest.values():
+        try:
+            with open(tmp_path, "rb") as file:
+                os.fsync(file.fileno())
+        except OSError:
+            continue
+    for target, tmp_path in latest.items():
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, target)
+    _fsync_directories([target.parent for target in latest])
+
+
+def _fsync_directories(directories: Iterable[Path]) -> None:
+    """对每个目录刷盘一次以持久化重命名。"""
+
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    for directory in set(directories):
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
 
 def read_text(path: str) -> str:
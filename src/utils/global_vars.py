@@ -27,12 +27,45 @@ def load_global_vars(settings: Dict[str, Any]) -> Dict[str, Any]:
     return read_yaml(path) or {}
 
 
-def format_global_context(global_vars: Dict[str, Any]) -> str:
-    """将全局变量格式化为 Prompt 可用的上下文块。"""
+def flatten_vars(global_vars: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    将嵌套变量展开为点路径映射，供模板占位符查找。
+
+    例如 {"account": {"username": "u"}} 展开为
+    {"account": {...}, "account.username": "u"}，父级键同样保留。
+    """
+
+    flat: Dict[str, Any] = {}
+    for key, value in global_vars.items():
+        name = f"{prefix}{key}"
+        flat[name] = value
+        if isinstance(value, dict):
+            flat.update(flatten_vars(value, f"{name}."))
+    return flat
+
+
+def format_global_context(global_vars: Dict[str, Any], template_mode: bool = False) -> str:
+    """
+    将全局变量格式化为 Prompt 可用的上下文块。
+
+    template_mode 为真时只向模型暴露占位符，要求用例中使用 {{变量名}}，
+    执行阶段再替换为实际值，切换环境无需重新生成用例。
+    """
 
     if not global_vars:
         return ""
 
+    if template_mode:
+        lines = [
+            "Global Vars (用例中必须使用 {{变量名}} 占位符引用以下变量，不要写入实际值):",
+        ]
+        for name, value in flatten_vars(global_vars).items():
+            if isinstance(value, (dict, list)):
+                continue
+            lines.append(f"- {{{{{name}}}}} 示例值: {value}")
+        lines.append("- {{auth_token}} 执行时注入的鉴权 Token（需要鉴权时写入请求头）")
+        return "\n".join(lines)
+
     dumped = yaml.safe_dump(
         global_vars,
         allow_unicode=True,
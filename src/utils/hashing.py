@@ -0,0 +1,30 @@
+"""内容哈希工具：用例文件、单条用例与接口文档的变化检测共用。"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+
+def content_hash(data: bytes) -> str:
+    """计算字节内容的 SHA1（与 file_hash 结果一致，用于已读入内存的文件）。"""
+
+    return hashlib.sha1(data).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """计算文件内容的 SHA1。"""
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def case_hash(case: Any) -> str:
+    """计算单条用例的稳定哈希（键排序后的紧凑 JSON）。"""
+
+    payload = json.dumps(case, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
@@ -2,55 +2,186 @@
 
 外部库：
 - 日志库：提供标准日志能力。
+
+设计说明：
+- 日志在根日志器上一次性配置，settings.yaml 只读取一次
+- 默认通过 QueueHandler 入队，由 QueueListener 在后台线程写文件与控制台
+- 可选 JSON Lines 格式与按日志器采样，降低逐用例日志的开销
 """
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 from src.utils.file_handler import read_yaml
 
+_TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 
-def get_logger(name: str) -> logging.Logger:
-    """
-    获取统一格式的日志器。
+_configured = False
+_configure_lock = threading.Lock()
+_level = logging.INFO
+_listener: Optional[QueueListener] = None
 
-    特性：
-    - 同时输出到文件与控制台
-    - 采用旋转日志避免文件无限增长
-    - 配置统一来自 config/settings.yaml
-    """
 
-    settings = read_yaml("config/settings.yaml")
-    logging_cfg = settings.get("logging", {})
-    level_name = logging_cfg.get("level", "INFO")
-    log_file = logging_cfg.get("file", "logs/app.log")
+class JsonLinesFormatter(logging.Formatter):
+    """将日志记录格式化为单行 JSON，便于机器检索。"""
 
-    logger = logging.getLogger(name)
-    if logger.handlers:
-        # 避免重复添加处理器（多次调用时常见问题）
-        return logger
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按日志器名前缀对低级别日志做确定性采样。
 
-    logger.setLevel(getattr(logging, level_name.upper(), logging.INFO))
+    - rates 形如 {"test_runner.test_executor": 0.1}，表示保留约 10%
+    - WARNING 及以上级别始终保留
+    """
 
-    # 确保日志目录存在
-    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        # 更长的前缀优先匹配
+        self._rates = sorted(
+            ((str(name), float(rate)) for name, rate in rates.items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._rates:
+            return True
+        # 同一条记录可能经过多个处理器，复用首次采样结果
+        decided = getattr(record, "_sampled", None)
+        if decided is not None:
+            return decided
+        keep = True
+        for prefix, rate in self._rates:
+            if record.name == prefix or record.name.startswith(f"{prefix}."):
+                keep = self._keep(prefix, rate)
+                break
+        record._sampled = keep
+        return keep
+
+    def _keep(self, prefix: str, rate: float) -> bool:
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        with self._lock:
+            count = self._counters.get(prefix, 0) + 1
+            self._counters[prefix] = count
+        # 计数跨过整数边界时保留，保证比例稳定且首条必留
+        return int(count * rate) != int((count - 1) * rate) or count == 1
+
+
+def configure_logging(settings_path: str = "config/settings.yaml") -> None:
+    """
+    在根日志器上一次性配置日志处理器（重复调用无副作用）。
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-    )
+    logging 配置项：
+    - level / file: 日志级别与文件路径
+    - format: text 或 json（JSON Lines）
+    - async: 是否通过后台线程写日志（默认 true）
+    - sample_rates: 日志器名前缀 -> 保留比例
+    """
 
-    # 文件日志：最大 1 兆，保留 3 个备份
-    file_handler = RotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=3)
-    file_handler.setFormatter(formatter)
+    global _configured, _level, _listener
+
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+
+        settings = read_yaml(settings_path) if Path(settings_path).exists() else {}
+        logging_cfg = settings.get("logging", {}) or {}
+        level_name = str(logging_cfg.get("level", "INFO"))
+        log_file = logging_cfg.get("file", "logs/app.log")
+        _level = getattr(logging, level_name.upper(), logging.INFO)
+
+        # 确保日志目录存在
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+
+        if str(logging_cfg.get("format", "text")).lower() == "json":
+            formatter: logging.Formatter = JsonLinesFormatter()
+        else:
+            formatter = logging.Formatter(_TEXT_FORMAT)
+
+        # 文件日志：最大 1 兆，保留 3 个备份
+        file_handler = RotatingFileHandler(
+            log_file, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8"
+        )
+        file_handler.setFormatter(formatter)
+
+        # 控制台日志：便于本地调试
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+
+        root = logging.getLogger()
+        sample_rates = logging_cfg.get("sample_rates") or {}
+        sampling = SamplingFilter(sample_rates) if sample_rates else None
+
+        if bool(logging_cfg.get("async", True)):
+            # 调用线程只负责入队，I/O 由监听线程完成
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            if sampling is not None:
+                queue_handler.addFilter(sampling)
+            root.addHandler(queue_handler)
+            _listener = QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            _listener.start()
+            atexit.register(shutdown_logging)
+        else:
+            for handler in (file_handler, console_handler):
+                if sampling is not None:
+                    handler.addFilter(sampling)
+                root.addHandler(handler)
+
+        _configured = True
+
+
+def shutdown_logging() -> None:
+    """停止后台监听线程并刷新剩余日志。"""
+
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
-    # 控制台日志：便于本地调试
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取统一格式的日志器。
 
+    特性：
+    - 处理器统一挂在根日志器上，命名日志器只设置级别
+    - 采用旋转日志避免文件无限增长
+    - 配置统一来自 config/settings.yaml，且只读取一次
+    """
+
+    configure_logging()
+    logger = logging.getLogger(name)
+    logger.setLevel(_level)
     return logger
@@ -0,0 +1,181 @@
+"""提示词模板注册表：一次加载、预编译，组装时校验上下文窗口。
+
+约定：
+- 模板来自 config/prompt_templates.yaml，缺省的用户消息模板使用内置默认值
+- 槽位写作 ${name}，编译为静态片段 + 槽位序列
+- 静态部分的 token 数按模型缓存，组装时只需估算槽位内容
+- 档位配置 context_window 时检查是否超出窗口：按配置截断指定槽位或在本地拒绝
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from src.utils.file_handler import read_yaml
+from src.utils.logger import get_logger
+from src.utils.token_counter import estimate_tokens, truncate_to_tokens
+
+DEFAULT_PROMPTS_PATH = "config/prompt_templates.yaml"
+
+# 槽位：${name}
+SLOT_RE = re.compile(r"\$\{(\w+)\}")
+
+# 内置的用户消息模板（配置文件中同名键优先）
+DEFAULT_TEMPLATES: Dict[str, str] = {
+    "generation_input": "${content}",
+    "agent_generation_input": "${chunk}",
+    "agent_generation_feedback_input": "${chunk}\n\n[Judge Feedback]\n${feedback}",
+    "agent_judge_input": "[Document Chunk]\n${chunk}\n\n[Generated Cases]\n${cases}",
+    "ai_judge_input": "A(预期): ${expected}\nB(实际): ${actual}",
+}
+
+
+class PromptTooLargeError(ValueError):
+    """组装后的提示词超出模型上下文窗口且无法截断。"""
+
+
+class PromptTemplate:
+    """预编译的提示词模板。"""
+
+    __slots__ = ("name", "text", "slots", "_segments", "_static_text", "_token_cache")
+
+    def __init__(self, name: str, text: str) -> None:
+        self.name = name
+        self.text = text
+        # 偶数位为静态片段，奇数位为槽位名
+        self._segments: List[str] = SLOT_RE.split(text)
+        self.slots: Tuple[str, ...] = tuple(self._segments[1::2])
+        self._static_text = "".join(self._segments[0::2])
+        self._token_cache: Dict[str, int] = {}
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """按槽位取值渲染；缺少槽位时抛出 KeyError。"""
+
+        if not self.slots:
+            return self.text
+        parts: List[str] = []
+        for idx, segment in enumerate(self._segments):
+            if idx % 2 == 0:
+                parts.append(segment)
+            elif segment in values:
+                parts.append(str(values[segment]))
+            else:
+                raise KeyError(f"Prompt template '{self.name}' missing slot '{segment}'")
+        return "".join(parts)
+
+    def static_tokens(self, model: Optional[str]) -> int:
+        """静态部分的 token 数（按模型缓存）。"""
+
+        key = model or ""
+        cached = self._token_cache.get(key)
+        if cached is None:
+            cached = estimate_tokens(self._static_text, model)
+            self._token_cache[key] = cached
+        return cached
+
+
+class PromptRegistry:
+    """提示词模板集合。"""
+
+    def __init__(self, templates: Dict[str, str]) -> None:
+        self._logger = get_logger(__name__)
+        merged = dict(DEFAULT_TEMPLATES)
+        merged.update({name: str(text) for name, text in templates.items() if isinstance(text, str)})
+        self._templates = {name: PromptTemplate(name, text) for name, text in merged.items()}
+
+    def get(self, name: Union[str, Sequence[str]]) -> PromptTemplate:
+        """按名称获取模板；传入多个名称时返回第一个非空模板，均不存在时返回空模板。"""
+
+        names = [name] if isinstance(name, str) else list(name)
+        for candidate in names:
+            template = self._templates.get(candidate)
+            if template is not None and template.text:
+                return template
+        return PromptTemplate(names[0] if names else "", "")
+
+    def text(self, name: Union[str, Sequence[str]]) -> str:
+        """获取模板原文（用于无槽位的系统提示词）。"""
+
+        return self.get(name).text
+
+    def assemble(
+        self,
+        system: Union[str, Sequence[str]],
+        user: str,
+        values: Dict[str, Any],
+        client: Any = None,
+        truncate: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """
+        组装（系统提示词，用户消息）。
+
+        参数：
+        - system / user: 模板名（system 可传入候选名列表）
+        - values: 用户消息模板的槽位取值
+        - client: LLMClient，提供 model / context_window / max_output_tokens / context_overflow
+        - truncate: 超出窗口时允许截断的槽位名
+
+        未配置 context_window 时不做任何 token 估算。
+        """
+
+        system_template = self.get(system)
+        user_template = self.get(user)
+        window = int(getattr(client, "context_window", 0) or 0)
+        if window <= 0:
+            return system_template.text, user_template.render(values)
+
+        model = getattr(client, "model", None)
+        budget = window - int(getattr(client, "max_output_tokens", 0) or 0)
+        slot_tokens = {
+            name: estimate_tokens(str(values.get(name, "")), model) for name in set(user_template.slots)
+        }
+        used = (
+            system_template.static_tokens(model)
+            + user_template.static_tokens(model)
+            + sum(slot_tokens[name] * user_template.slots.count(name) for name in slot_tokens)
+        )
+        if used <= budget:
+            return system_template.text, user_template.render(values)
+
+        overflow = used - budget
+        policy = str(getattr(client, "context_overflow", "truncate") or "truncate")
+        allowed = slot_tokens.get(truncate, 0) - overflow if truncate else 0
+        if policy != "truncate" or not truncate or allowed <= 0:
+            raise PromptTooLargeError(
+                f"Prompt '{user_template.name}' needs ~{used} tokens, "
+                f"exceeding the {budget}-token budget of model {model}"
+            )
+        self._logger.warning(
+            "Prompt '%s' exceeds context budget by ~%s tokens, truncating slot '%s'",
+            user_template.name,
+            overflow,
+            truncate,
+        )
+        fitted = dict(values)
+        fitted[truncate] = truncate_to_tokens(str(values.get(truncate, "")), allowed, model)
+        return system_template.text, user_template.render(fitted)
+
+
+# 进程内按路径缓存，文件修改时间变化时重新加载
+_REGISTRIES: Dict[str, Tuple[float, PromptRegistry]] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_prompt_registry(path: str = DEFAULT_PROMPTS_PATH) -> PromptRegistry:
+    """返回（缓存的）提示词模板注册表。"""
+
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = -1.0
+    with _REGISTRY_LOCK:
+        cached = _REGISTRIES.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        templates = read_yaml(path) if mtime >= 0 else {}
+        registry = PromptRegistry(templates)
+        _REGISTRIES[path] = (mtime, registry)
+        return registry
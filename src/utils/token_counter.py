@@ -0,0 +1,69 @@
+"""Token 数量估算工具。
+
+外部库：
+- tiktoken（可选）：安装后使用真实分词器计数，否则按字符启发式估算。
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Optional
+
+try:  # 可选依赖
+    import tiktoken  # type: ignore
+
+    _HAS_TIKTOKEN = True
+except Exception:
+    tiktoken = None
+    _HAS_TIKTOKEN = False
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Any:
+    """按模型名获取分词器，未知模型回退到通用编码。"""
+
+    try:
+        return tiktoken.encoding_for_model(model)  # type: ignore[union-attr]
+    except Exception:
+        return tiktoken.get_encoding("cl100k_base")  # type: ignore[union-attr]
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    估算文本的 token 数。
+
+    启发式规则：
+    - 中日韩字符约 1 个字符 1 个 token
+    - 其余字符约 4 个字符 1 个 token
+    """
+
+    if not text:
+        return 0
+    if _HAS_TIKTOKEN:
+        return len(_get_encoding(model or "gpt-4o-mini").encode(text))
+    cjk = 0
+    for ch in text:
+        if "\u4e00" <= ch <= "\u9fff" or "\u3040" <= ch <= "\u30ff" or "\uac00" <= ch <= "\ud7af":
+            cjk += 1
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """将文本截断到不超过 max_tokens（保留开头部分）。"""
+
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text, model) <= max_tokens:
+        return text
+    if _HAS_TIKTOKEN:
+        encoding = _get_encoding(model or "gpt-4o-mini")
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    # 二分查找满足预算的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid], model) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
@@ -0,0 +1,269 @@
+"""轻量链路追踪：记录生成流水线各阶段的耗时 span。
+
+导出格式：
+- chrome：Chrome Trace Event 格式，可直接用 chrome://tracing 或 Perfetto 打开
+- otlp：OTLP/JSON 兼容结构（resourceSpans -> scopeSpans -> spans）
+
+未启用时 span() 返回共享的空对象，被装饰函数只多一次布尔判断。
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 以该前缀开头的属性会自动传递给子 span（如 chunk.index / chunk.title）
+_INHERITED_PREFIX = "chunk."
+
+_enabled = False
+_format = "chrome"
+_output_file = "logs/trace.json"
+_trace_id = ""
+_spans: List["_Span"] = []
+_lock = threading.Lock()
+_local = threading.local()
+_atexit_registered = False
+
+
+class _NoopSpan:
+    """追踪关闭时使用的空 span。"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """单个已计时的 span。"""
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "span_id",
+        "parent_id",
+        "thread_id",
+        "start_ns",
+        "end_ns",
+        "error",
+    )
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]]) -> None:
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = ""
+        self.thread_id = threading.get_ident()
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = ""
+
+    def __enter__(self) -> "_Span":
+        stack = _span_stack()
+        if stack:
+            parent = stack[-1]
+            self.parent_id = parent.span_id
+            # 子 span 继承父级的切片属性，便于按切片聚合耗时
+            for key, value in parent.attributes.items():
+                if key.startswith(_INHERITED_PREFIX):
+                    self.attributes.setdefault(key, value)
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        self.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        stack = _span_stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        with _lock:
+            _spans.append(self)
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """在 span 生命周期内补充属性。"""
+        self.attributes[key] = value
+
+
+def _span_stack() -> List[_Span]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = []
+        _local.stack = stack
+    return stack
+
+
+def init_tracing(settings: Dict[str, Any]) -> bool:
+    """
+    按 settings.yaml 的 tracing 段初始化追踪。
+
+    返回：
+    - 是否启用追踪
+    """
+
+    global _enabled, _format, _output_file, _trace_id, _atexit_registered
+
+    cfg = settings.get("tracing", {}) or {}
+    _enabled = bool(cfg.get("enabled", False))
+    _format = str(cfg.get("format", "chrome")).lower()
+    _output_file = str(cfg.get("file", "logs/trace.json"))
+    if not _enabled:
+        return False
+
+    _trace_id = os.urandom(16).hex()
+    if not _atexit_registered:
+        # 进程退出时兜底导出，避免异常退出丢失追踪数据
+        atexit.register(export_trace)
+        _atexit_registered = True
+    return True
+
+
+def is_enabled() -> bool:
+    """返回追踪是否启用。"""
+    return _enabled
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    创建一个 span 上下文管理器。
+
+    用法：
+        with span("agentic.round", {"round": 1}) as current:
+            current.set_attribute("cases", 3)
+    """
+
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """函数装饰器：为整个调用记录一个 span，未启用时直接调用原函数。"""
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, None):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def export_trace(path: Optional[str] = None, fmt: Optional[str] = None) -> Optional[str]:
+    """
+    导出已记录的 span 并清空缓冲区。
+
+    返回：
+    - 写出的文件路径；未启用或无数据时返回 None
+    """
+
+    if not _enabled:
+        return None
+    with _lock:
+        spans = list(_spans)
+        _spans.clear()
+    if not spans:
+        return None
+
+    target = Path(path or _output_file)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    output_format = (fmt or _format).lower()
+    if output_format == "otlp":
+        document = _to_otlp(spans)
+    else:
+        document = _to_chrome(spans)
+    with open(target, "w", encoding="utf-8") as file:
+        json.dump(document, file, ensure_ascii=False)
+    return str(target)
+
+
+def _to_chrome(spans: List[_Span]) -> Dict[str, Any]:
+    """转换为 Chrome Trace Event 格式（完整事件 ph=X，时间单位微秒）。"""
+
+    pid = os.getpid()
+    events = []
+    for item in spans:
+        args = dict(item.attributes)
+        if item.error:
+            args["error"] = item.error
+        events.append(
+            {
+                "name": item.name,
+                "cat": "autollm",
+                "ph": "X",
+                "ts": item.start_ns // 1000,
+                "dur": max((item.end_ns - item.start_ns) // 1000, 0),
+                "pid": pid,
+                "tid": item.thread_id,
+                "args": args,
+            }
+        )
+    events.sort(key=lambda event: event["ts"])
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _to_otlp(spans: List[_Span]) -> Dict[str, Any]:
+    """转换为 OTLP/JSON 兼容结构。"""
+
+    otlp_spans = []
+    for item in spans:
+        record: Dict[str, Any] = {
+            "traceId": _trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 1,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in item.attributes.items()],
+            "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+        }
+        if item.parent_id:
+            record["parentSpanId"] = item.parent_id
+        otlp_spans.append(record)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [_otlp_attribute("service.name", "autollm-testframework")]
+                },
+                "scopeSpans": [{"scope": {"name": "src.utils.tracer"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """按 OTLP AnyValue 规则封装属性值。"""
+
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
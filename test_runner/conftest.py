@@ -6,41 +6,324 @@
 
 from __future__ import annotations
 
+import time
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pytest
+import requests
 
+from src.core.ai_judge import AIJudge
 from src.core.auth_setup import AuthSetup
-from src.utils.file_handler import read_json, read_yaml
+from src.core.environments import Environment, env_path, load_environment, rebase_url
+from src.core.response_store import RECORD, REPLAY, ResponseStore
+from src.core.run_state import RunState
+from src.core.sharding import assign_shards, group_units, parse_shard, shard_path
+from src.report.result_sink import ResultSink
+from src.utils.case_model import CasePool
+from src.utils.case_template import CaseTemplate, compile_case
+from src.utils.file_handler import loads_json, read_yaml
+from src.utils.global_vars import flatten_vars, load_global_vars
+from src.utils.hashing import case_hash, content_hash
 from src.utils.logger import get_logger
 
 
-def _collect_cases(cases_dir: Path) -> List[dict[str, Any]]:
+class _CaseRegistry:
+    """本次会话收集到的用例元数据，用于回写执行状态。"""
+
+    def __init__(self) -> None:
+        # id(case_data) -> (用例 ID, 来源文件, 用例哈希)
+        self.meta: Dict[int, Tuple[str, str, str]] = {}
+        # 来源文件 -> (文件哈希, 文件内全部用例 ID)
+        self.files: Dict[str, Tuple[str, List[str]]] = {}
+        # 本次实际执行过的用例 ID
+        self.executed: set = set()
+        # id(case_data) -> 编译后的模板（仅含占位符的用例）
+        self.templates: Dict[int, CaseTemplate] = {}
+        # 是否完整扫描了全部用例文件（仅此时清理过期记录）
+        self.full_scan = False
+
+
+# 流式结果写入器、执行状态与用例元数据在 config 上的存放键
+_RESULT_SINK_KEY = pytest.StashKey[ResultSink]()
+_RUN_STATE_KEY = pytest.StashKey[RunState]()
+_REGISTRY_KEY = pytest.StashKey[_CaseRegistry]()
+# 多进程执行时本进程的分片（序号，总数）
+_SHARD_KEY = pytest.StashKey[Tuple[int, int]]()
+# 多环境执行时本进程的环境档位，以及默认 base_url（用于替换写死地址的用例）
+_ENV_KEY = pytest.StashKey[Tuple[Environment, str]]()
+# 响应录制/回放存储（--record-responses / --replay）
+_RESPONSE_STORE_KEY = pytest.StashKey[ResponseStore]()
+
+
+def _collect_cases(cases_dir: Path) -> List[Mapping[str, Any]]:
     """
-    扫描 data/test_cases 目录，收集所有 JSON 用例。
+    扫描 data/test_cases 目录，收集所有 JSON / JSON Lines 用例。
 
     返回：
-    - List[dict]: 单条用例字典列表（支持文件内为 dict 或 list）
+    - List[dict]: 单条用例字典列表（JSON 文件内为 dict 或 list，JSON Lines 每行一条）
+    """
+
+    return [case for _, _, _, case in _collect_case_entries(cases_dir)]
+
+
+def _collect_case_entries(
+    cases_dir: Path,
+    state: Optional[RunState] = None,
+    changed_only: bool = False,
+    registry: Optional[_CaseRegistry] = None,
+) -> List[Tuple[str, str, str, Mapping[str, Any]]]:
+    """
+    扫描用例目录并返回（用例 ID，来源文件，用例哈希，用例）列表。
+
+    - 支持 .json（dict 或 list）与 .jsonl（每行一条用例）
+    - 每个文件只读取一次：文件哈希与解析共用同一份字节内容
+    - changed_only 为真时，文件哈希未变的文件直接跳过（不解析），
+      其余文件只保留新增或内容变化的用例
+    - 用例 ID 为 “文件名::用例名”，同文件重名时追加 #序号
+    - 保留的用例转换为紧凑表示（Case），重复的字符串与 headers 在全部用例间共享
     """
 
     logger = get_logger(__name__)
-    cases: List[dict[str, Any]] = []
+    entries: List[Tuple[str, str, str, Mapping[str, Any]]] = []
+    pool = CasePool()
 
     if not cases_dir.exists():
         logger.warning("Test cases directory not found: %s", cases_dir)
-        return cases
-
-    for path in sorted(cases_dir.glob("*.json")):
-        data = read_json(str(path))
-        if isinstance(data, list):
-            cases.extend(data)
-        elif isinstance(data, dict):
-            cases.append(data)
+        return entries
+
+    case_files = sorted(
+        path for path in cases_dir.iterdir() if path.suffix in {".json", ".jsonl"}
+    )
+    for path in case_files:
+        source = str(path)
+        raw = path.read_bytes()
+        digest = content_hash(raw) if state is not None else ""
+        if changed_only and state is not None and state.is_file_unchanged(source, digest):
+            continue
+        if path.suffix == ".jsonl":
+            data = [loads_json(line) for line in raw.splitlines() if line.strip()]
         else:
+            data = loads_json(raw)
+        if isinstance(data, dict):
+            data = [data]
+        elif not isinstance(data, list):
             logger.warning("Unsupported case format in %s", path)
+            continue
+
+        seen: Dict[str, int] = {}
+        file_ids: List[str] = []
+        for idx, case in enumerate(data):
+            name = str(case.get("name") or f"case_{idx}") if isinstance(case, dict) else f"case_{idx}"
+            count = seen.get(name, 0)
+            seen[name] = count + 1
+            case_id = f"{path.name}::{name}" if count == 0 else f"{path.name}::{name}#{count}"
+            file_ids.append(case_id)
+            # 仅在需要回写执行状态时计算用例哈希
+            digest_case = case_hash(case) if state is not None else ""
+            if changed_only and state is not None and not state.is_case_changed(case_id, digest_case):
+                continue
+            entries.append(
+                (case_id, source, digest_case, pool.compact(case) if isinstance(case, dict) else case)
+            )
+        if registry is not None:
+            registry.files[source] = (digest, file_ids)
+
+    return entries
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """注册增量执行相关的命令行选项。"""
+
+    group = parser.getgroup("autollm", "AutoLLM incremental execution")
+    group.addoption(
+        "--only-failed",
+        action="store_true",
+        default=False,
+        help="Only rerun cases that failed in the previous run (all cases if none failed).",
+    )
+    group.addoption(
+        # 不能使用 --failed-first：与 pytest 内置 cacheprovider 的选项同名
+        "--failed-cases-first",
+        action="store_true",
+        default=False,
+        help="Run previously failed cases first, then the rest.",
+    )
+    group.addoption(
+        "--changed",
+        action="store_true",
+        default=False,
+        help="Only run cases whose JSON changed since the last run.",
+    )
+    group.addoption(
+        "--shard",
+        default=None,
+        help="Run only shard INDEX/COUNT of the cases (set by run.py --workers).",
+    )
+    group.addoption(
+        "--env",
+        default=None,
+        help="Run the cases against the named environment profile (settings.environments).",
+    )
+    group.addoption(
+        "--record-responses",
+        action="store_true",
+        default=False,
+        help="Record each case's response (status, headers, body) to paths.response_store_file.",
+    )
+    group.addoption(
+        "--replay",
+        action="store_true",
+        default=False,
+        help="Re-evaluate assertions from recorded responses without sending HTTP requests.",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """
+    按配置打开流式结果写入器，并加载上一次的执行状态。
+
+    指定环境时结果、状态与录制的响应写入该环境的分区；分片执行时结果与状态再写入分片文件。
+    """
+
+    settings = read_yaml("config/settings.yaml")
+    shard = parse_shard(config.getoption("--shard", None))
+    if shard is not None:
+        config.stash[_SHARD_KEY] = shard
+    env = load_environment(settings, config.getoption("--env", None))
+    env_name = env.name if env is not None else None
+    if env is not None:
+        default_base = str(flatten_vars(load_global_vars(settings)).get("base_url") or "")
+        config.stash[_ENV_KEY] = (env, default_base)
+    results_file = settings.get("reporting", {}).get("results_file")
+    if results_file:
+        results_file = env_path(str(results_file), env_name)
+        if shard is not None:
+            results_file = shard_path(str(results_file), shard[0])
+        config.stash[_RESULT_SINK_KEY] = ResultSink(str(results_file))
+    state_file = settings.get("paths", {}).get("run_state_file", ".autollm/run_state.json")
+    config.stash[_RUN_STATE_KEY] = RunState(env_path(str(state_file), env_name))
+    config.stash[_REGISTRY_KEY] = _CaseRegistry()
+    if config.getoption("--replay", False):
+        mode = REPLAY
+    elif config.getoption("--record-responses", False):
+        mode = RECORD
+    else:
+        return
+    store_file = settings.get("paths", {}).get("response_store_file", ".autollm/responses.sqlite3")
+    config.stash[_RESPONSE_STORE_KEY] = ResponseStore(env_path(str(store_file), env_name), mode)
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    """测试结束时刷新并关闭结果写入器与响应存储。"""
+
+    sink = config.stash.get(_RESULT_SINK_KEY, None)
+    if sink is not None:
+        sink.close()
+    store = config.stash.get(_RESPONSE_STORE_KEY, None)
+    if store is not None:
+        store.close()
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    """
+    回写执行状态：用例结果，以及全部用例均已执行的文件哈希。
+
+    分片执行时只写出分片状态，由主进程合并，避免多个进程同时改写共享状态文件。
+    """
+
+    state = session.config.stash.get(_RUN_STATE_KEY, None)
+    registry = session.config.stash.get(_REGISTRY_KEY, None)
+    if state is None or registry is None:
+        return
+    shard = session.config.stash.get(_SHARD_KEY, None)
+    if shard is not None:
+        state.save_shard(
+            shard_path(str(state.path), shard[0]),
+            registry.files,
+            registry.executed,
+            registry.full_scan,
+        )
+        return
+    if not registry.executed:
+        return
+    state.complete_session(registry.files, registry.executed, registry.full_scan)
+    state.save()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: pytest.Item, call: pytest.CallInfo) -> Any:
+    """每条用例结束即写入一条紧凑结果记录，并更新执行状态。"""
+
+    outcome = yield
+    report = outcome.get_result()
+    # 只记录 call 阶段，以及 setup 阶段的失败/跳过（例如缺少 URL）
+    if not (report.when == "call" or (report.when == "setup" and not report.passed)):
+        return
+    record = _build_result_record(item, report)
+    sink = item.config.stash.get(_RESULT_SINK_KEY, None)
+    if sink is not None:
+        sink.write(record)
+    _record_run_state(item, record)
+
+
+def _record_run_state(item: pytest.Item, record: Dict[str, Any]) -> None:
+    """将单条用例结果写入执行状态。"""
+
+    state = item.config.stash.get(_RUN_STATE_KEY, None)
+    registry = item.config.stash.get(_REGISTRY_KEY, None)
+    callspec = getattr(item, "callspec", None)
+    if state is None or registry is None or callspec is None:
+        return
+    meta = registry.meta.get(id(callspec.params.get("case_data")))
+    if meta is None:
+        return
+    case_id, source, digest = meta
+    properties = dict(item.user_properties)
+    state.record_case(
+        case_id,
+        record["outcome"],
+        record["duration"],
+        digest,
+        source,
+        response_hash=properties.get("response_hash"),
+    )
+    registry.executed.add(case_id)
 
-    return cases
+
+def _build_result_record(item: pytest.Item, report: pytest.TestReport) -> Dict[str, Any]:
+    """从 pytest 报告与用例数据组装结果记录；优先使用渲染与环境改写后的用例，记录实际请求的地址。"""
+
+    case = getattr(item, "funcargs", {}).get("resolved_case")
+    if case is None:
+        # setup 阶段失败（渲染前）时回退到原始用例
+        callspec = getattr(item, "callspec", None)
+        case = callspec.params.get("case_data", {}) if callspec is not None else {}
+    if not isinstance(case, Mapping):
+        case = {}
+    result = report.outcome
+    if report.when == "setup" and report.failed:
+        result = "error"
+    message = ""
+    if not report.passed:
+        crash = getattr(report.longrepr, "reprcrash", None)
+        message = str(getattr(crash, "message", "") or report.longreprtext or "")
+        if isinstance(report.longrepr, tuple):
+            # 跳过时 longrepr 为 (文件, 行号, 原因)
+            message = str(report.longrepr[-1])
+    return {
+        "nodeid": report.nodeid,
+        "name": case.get("title") or case.get("name") or item.name,
+        "module": case.get("module"),
+        "story": case.get("story"),
+        "method": case.get("method"),
+        "url": case.get("url"),
+        "outcome": result,
+        "duration": round(report.duration, 4),
+        "message": message[:500],
+        "ts": round(time.time(), 3),
+    }
 
 
 def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
@@ -48,39 +331,127 @@ def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
     Pytest 钩子：动态参数化测试数据。
 
     当测试函数包含 case_data 参数时，
-    自动将所有 JSON 用例注入生成测试。
+    自动将所有 JSON 用例注入生成测试；
+    支持 --only-failed / --failed-cases-first / --changed 增量选择。
     """
 
     if "case_data" not in metafunc.fixturenames:
         return
 
+    logger = get_logger(__name__)
+    config = metafunc.config
     settings = read_yaml("config/settings.yaml")
     cases_dir = Path(settings.get("paths", {}).get("test_cases_dir", "data/test_cases"))
-    cases = _collect_cases(cases_dir)
+    state = config.stash.get(_RUN_STATE_KEY, None)
+    registry = config.stash.get(_REGISTRY_KEY, None)
+    changed_only = bool(config.getoption("--changed", False))
+    entries = _collect_case_entries(cases_dir, state, changed_only, registry)
+    if registry is not None:
+        registry.full_scan = not changed_only
 
-    if not cases:
+    if state is not None and state.has_history:
+        failed = state.failed_ids()
+        if config.getoption("--only-failed", False):
+            if failed:
+                entries = [entry for entry in entries if entry[0] in failed]
+            else:
+                logger.info("No previously failed cases recorded, running all cases")
+        elif config.getoption("--failed-cases-first", False) and failed:
+            # 稳定排序：失败用例在前，其余保持原顺序
+            entries.sort(key=lambda entry: entry[0] not in failed)
+    if changed_only:
+        logger.info("Changed-only mode selected %s case(s)", len(entries))
+
+    shard = config.stash.get(_SHARD_KEY, None)
+    if shard is not None:
+        entries = _select_shard(entries, state, shard)
+        logger.info("Shard %s/%s selected %s case(s)", shard[0], shard[1], len(entries))
+
+    if not entries:
         # 没有用例时，显式生成空参数化
         metafunc.parametrize("case_data", [])
         return
 
+    cases = [case for _, _, _, case in entries]
+    if registry is not None:
+        for case_id, source, digest, case in entries:
+            registry.meta[id(case)] = (case_id, source, digest)
+            # 收集阶段一次性编译 {{var}} 模板，执行阶段只做替换
+            if isinstance(case, Mapping):
+                template = compile_case(case)
+                if not template.is_static:
+                    registry.templates[id(case)] = template
+
     # 生成更易读的用例编号
     ids = [case.get("name", f"case_{idx}") for idx, case in enumerate(cases)]
     metafunc.parametrize("case_data", cases, ids=ids)
 
 
+def pytest_collection_modifyitems(config: pytest.Config, items: List[pytest.Item]) -> None:
+    """
+    取消选择空参数化生成的占位项（没有用例、分片为空或 --changed 未命中时）。
+
+    占位项没有真实用例，不应作为跳过项写入结果文件与执行汇总。
+    """
+
+    kept: List[pytest.Item] = []
+    placeholders: List[pytest.Item] = []
+    for item in items:
+        callspec = getattr(item, "callspec", None)
+        if "case_data" in getattr(item, "fixturenames", ()) and (
+            callspec is None or not isinstance(callspec.params.get("case_data"), Mapping)
+        ):
+            placeholders.append(item)
+        else:
+            kept.append(item)
+    if placeholders:
+        config.hook.pytest_deselected(items=placeholders)
+        items[:] = kept
+
+
+def _select_shard(
+    entries: List[Tuple[str, str, str, Mapping[str, Any]]],
+    state: Optional[RunState],
+    shard: Tuple[int, int],
+) -> List[Tuple[str, str, str, Mapping[str, Any]]]:
+    """按历史耗时均衡划分用例，仅保留本分片的用例（保持原顺序）。"""
+
+    chained = {
+        source
+        for _, source, _, case in entries
+        if isinstance(case, Mapping) and case.get("extract")
+    }
+    units = group_units((case_id, source, source in chained) for case_id, source, _, _ in entries)
+    durations = state.duration_of if state is not None else (lambda _: None)
+    assignment = assign_shards(
+        [(key, [durations(case_id) for case_id in ids]) for key, ids in units],
+        shard[1],
+    )
+    selected = {case_id for key, ids in units if assignment[key] == shard[0] for case_id in ids}
+    return [entry for entry in entries if entry[0] in selected]
+
+
 @pytest.fixture(scope="session")
-def auth_token() -> str:
-    """在配置存在时返回用于测试执行的 token。"""
+def auth_token(pytestconfig: pytest.Config) -> str:
+    """
+    在配置存在时返回用于测试执行的 token（多环境执行时使用该环境的鉴权配置，且不回写配置文件）。
+
+    回放模式不发送请求，也不登录。
+    """
 
+    store = pytestconfig.stash.get(_RESPONSE_STORE_KEY, None)
+    if store is not None and store.mode == REPLAY:
+        return ""
     settings = read_yaml("config/settings.yaml")
-    auth_cfg = settings.get("auth", {})
+    env = pytestconfig.stash.get(_ENV_KEY, None)
+    auth_cfg = env[0].auth_config(settings) if env is not None else settings.get("auth", {})
     if not auth_cfg:
         return ""
 
     auto_refresh = bool(auth_cfg.get("auto_refresh_token", False))
     token = ""
     if auto_refresh:
-        token = AuthSetup().run()
+        token = AuthSetup().fetch_token(auth_cfg) if env is not None else AuthSetup().run()
     else:
         token = str(auth_cfg.get("token", "")).strip()
 
@@ -92,3 +463,75 @@ def auth_token() -> str:
         token = f"{token_prefix}{token}"
 
     return token
+
+
+@pytest.fixture(scope="session")
+def template_vars(pytestconfig: pytest.Config, auth_token: str) -> Dict[str, Any]:
+    """
+    用例模板变量池：全局变量（点路径展开，多环境执行时叠加环境覆盖）+ 鉴权 Token。
+
+    执行期通过用例 extract 字段提取的变量也会写入该字典，供后续用例引用。
+    """
+
+    settings = read_yaml("config/settings.yaml")
+    env = pytestconfig.stash.get(_ENV_KEY, None)
+    global_vars = env[0].global_vars(settings) if env is not None else load_global_vars(settings)
+    variables = flatten_vars(global_vars)
+    variables["auth_token"] = auth_token
+    return variables
+
+
+@pytest.fixture(scope="session")
+def http_session() -> Iterator[Any]:
+    """会话级 HTTP 连接池：同一进程内的用例复用连接。"""
+
+    settings = read_yaml("config/settings.yaml")
+    pool_size = int(settings.get("execution", {}).get("http_pool_size", 10))
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def ai_judge() -> AIJudge:
+    """会话级语义判定器：全部用例共享同一 LLM 客户端与前置过滤（句向量模型只加载一次，向量缓存跨用例复用）。"""
+
+    return AIJudge()
+
+
+@pytest.fixture(scope="session")
+def response_store(pytestconfig: pytest.Config) -> Optional[ResponseStore]:
+    """响应录制/回放存储；未开启 --record-responses / --replay 时为 None。"""
+
+    return pytestconfig.stash.get(_RESPONSE_STORE_KEY, None)
+
+
+@pytest.fixture
+def case_id(request: pytest.FixtureRequest, case_data: Mapping[str, Any]) -> str:
+    """当前用例 ID（“文件名::用例名”），用作响应录制的键。"""
+
+    registry = request.config.stash.get(_REGISTRY_KEY, None)
+    meta = registry.meta.get(id(case_data)) if registry is not None else None
+    return meta[0] if meta is not None else request.node.nodeid
+
+
+@pytest.fixture
+def resolved_case(
+    request: pytest.FixtureRequest,
+    case_data: Mapping[str, Any],
+    template_vars: Dict[str, Any],
+) -> Mapping[str, Any]:
+    """按当前变量池渲染用例模板；多环境执行时写死的默认地址替换为环境地址。无需处理的用例原样返回。"""
+
+    registry = request.config.stash.get(_REGISTRY_KEY, None)
+    template = registry.templates.get(id(case_data)) if registry is not None else None
+    case = case_data if template is None else template.render(template_vars)
+    env = request.config.stash.get(_ENV_KEY, None)
+    if env is not None and isinstance(case.get("url"), str):
+        url = rebase_url(case["url"], env[1], env[0].base_url)
+        if url != case["url"]:
+            case = dict(case, url=url)
+    return case
@@ -3,33 +3,53 @@
 外部库：
 - 测试框架：测试运行与参数化。
 - 请求库：执行测试用例的接口请求。
-- 报告库：生成测试报告与元数据。
+- 报告库（可选）：生成测试报告与元数据。
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict
+import hashlib
+import json
+from typing import Any, Callable, Dict, Mapping, Optional
 
-import allure
 import pytest
 import requests
 
+try:  # 可选依赖：未安装 allure-pytest 时跳过报告标注
+    import allure
+except Exception:
+    allure = None
+
 from src.core.ai_judge import AIJudge
+from src.core.response_digest import decode_body, read_limited_body
+from src.core.response_store import REPLAY, ResponseStore, StoredResponse
+from src.utils.case_template import extract_path
 from src.utils.file_handler import read_yaml
 from src.utils.logger import get_logger
 
 
-def test_api_case(case_data: Dict[str, Any], auth_token: str) -> None:
+def test_api_case(
+    resolved_case: Mapping[str, Any],
+    auth_token: str,
+    template_vars: Dict[str, Any],
+    http_session: requests.Session,
+    response_store: Optional[ResponseStore],
+    case_id: str,
+    ai_judge: AIJudge,
+    record_property: Callable[[str, Any], None],
+) -> None:
     """
     用例执行入口（Pytest 会为每条 JSON 用例生成一次调用）。
 
     流程：
-    1) 从 case_data 解析请求信息
+    1) 从 case_data 解析请求信息（{{var}} 占位符已按变量池替换）
     2) 动态化 Allure 标注
-    3) 发起 HTTP 请求
+    3) 发起 HTTP 请求（--replay 时改为读取录制的响应；--record-responses 时录制响应）
     4) 调用 AIJudge 进行断言
     """
 
+    # 用例模板已在 resolved_case 中完成 {{var}} 替换
+    case_data = resolved_case
     logger = get_logger(__name__)
     settings = read_yaml("config/settings.yaml")
     exec_cfg = settings.get("execution", {})
@@ -38,16 +58,18 @@ def test_api_case(case_data: Dict[str, Any], auth_token: str) -> None:
     module_name = case_data.get("module")
     story_name = case_data.get("story")
     case_title = case_data.get("title") or case_data.get("name")
-    if module_name:
-        allure.dynamic.feature(module_name)
-    if story_name:
-        allure.dynamic.story(story_name)
-    if case_title:
-        allure.dynamic.title(case_title)
+    if allure is not None:
+        if module_name:
+            allure.dynamic.feature(module_name)
+        if story_name:
+            allure.dynamic.story(story_name)
+        if case_title:
+            allure.dynamic.title(case_title)
 
     # 3) 解析用例字段
     url = case_data.get("url")
     method = case_data.get("method", "GET")
+    # 用例的 headers 可能是多条用例共享的只读映射：需要修改时先复制（写时复制）
     headers = case_data.get("headers") or {}
     params = case_data.get("params") or {}
     payload = case_data.get("data") or {}
@@ -56,30 +78,67 @@ def test_api_case(case_data: Dict[str, Any], auth_token: str) -> None:
     if use_auth and auth_token:
         header_name = exec_cfg.get("auth_header_name", "Authorization")
         if header_name not in headers:
+            headers = dict(headers)
             headers[header_name] = auth_token
 
     if not url:
         pytest.skip("Case missing URL")
 
-    # 4) 发起请求
-    logger.info("Executing case: %s %s", method, url)
-    response = requests.request(
-        method=method,
-        url=url,
-        headers=headers,
-        params=params,
-        json=payload,
-        timeout=exec_cfg.get("request_timeout_seconds", 30),
-        verify=exec_cfg.get("verify_ssl", True),
-    )
+    if response_store is not None and response_store.mode == REPLAY:
+        # 4) 回放：只使用录制的响应，不访问被测服务
+        stored = response_store.get(case_id)
+        if stored is None:
+            pytest.skip("No recorded response for case")
+        body, encoding = stored.body, stored.encoding
+    else:
+        # 4) 发起请求（会话级连接池复用连接）
+        logger.info("Executing case: %s %s", method, url)
+        response = http_session.request(
+            method=method,
+            url=url,
+            headers=headers,
+            params=params,
+            json=payload,
+            timeout=exec_cfg.get("request_timeout_seconds", 30),
+            verify=exec_cfg.get("verify_ssl", True),
+            stream=True,
+        )
+        # 流式读取响应体，超过上限即停止，避免大列表接口占满内存
+        max_body_bytes = int(exec_cfg.get("max_body_bytes", 1024 * 1024))
+        body, truncated = read_limited_body(response, max_body_bytes)
+        if truncated:
+            logger.warning("Response body truncated at %s bytes: %s %s", max_body_bytes, method, url)
+        encoding = response.encoding
+        if response_store is not None:
+            response_store.put(
+                case_id,
+                StoredResponse(response.status_code, dict(response.headers), encoding, body, truncated),
+            )
+
+    actual = decode_body(body, encoding)
+
+    # 响应哈希随执行状态持久化，便于对比前后两次运行的响应是否变化
+    record_property("response_hash", hashlib.sha1(body).hexdigest())
+
+    # 按用例 extract 声明从 JSON 响应中提取变量，供后续用例的 {{var}} 引用
+    extract_rules = case_data.get("extract") or {}
+    if extract_rules:
+        try:
+            parsed = json.loads(actual)
+        except ValueError:
+            parsed = None
+        for var_name, json_path in extract_rules.items():
+            value = extract_path(parsed, str(json_path))
+            if value is None:
+                logger.warning("Extract rule %s=%s found no value", var_name, json_path)
+                continue
+            template_vars[str(var_name)] = value
 
     # 5) 断言配置（用例优先于全局配置）
     assert_type = case_data.get("assert_type", exec_cfg.get("default_assert_type", "semantic_match"))
     use_ai = case_data.get("use_ai_assertion", exec_cfg.get("use_ai_assertion", True))
 
-    judge = AIJudge()
     expected = case_data.get("expected", "")
-    actual = response.text
 
-    # 6) 执行断言
-    assert judge.verify(expected, actual, assert_type=assert_type, use_ai_assertion=use_ai)
+    # 6) 执行断言（判定器为会话级共享实例）
+    assert ai_judge.verify(expected, actual, assert_type=assert_type, use_ai_assertion=use_ai)
@@ -0,0 +1,31 @@
+"""用例结构校验：expected 可为文本或结构化内容。"""
+
+from __future__ import annotations
+
+from src.utils.case_schema import validate_cases
+
+
+def test_structured_expected_is_valid() -> None:
+    cases = [
+        {"url": "http://x/api/login", "method": "post", "expected": {"code": 200}},
+        {"url": "http://x/api/items", "method": "GET", "expected": [{"id": 1}]},
+        {"url": "http://x/api/login", "method": "POST", "expected": "登录成功"},
+    ]
+    valid, issues = validate_cases(cases)
+    assert valid == cases
+    assert issues == []
+
+
+def test_empty_or_scalar_expected_is_rejected() -> None:
+    cases = [
+        {"name": "empty_object", "url": "http://x", "method": "GET", "expected": {}},
+        {"name": "empty_text", "url": "http://x", "method": "GET", "expected": ""},
+        {"name": "number", "url": "http://x", "method": "GET", "expected": 200},
+    ]
+    valid, issues = validate_cases(cases)
+    assert valid == []
+    assert issues == [
+        "[empty_object] missing required field 'expected'",
+        "[empty_text] missing required field 'expected'",
+        "[number] 'expected' must be string or object or array",
+    ]
@@ -0,0 +1,69 @@
+"""原子写入：临时文件先刷盘再替换目标文件，批量范围内延后到范围结束。"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from src.utils import file_handler
+from src.utils.file_handler import batched_fsync, read_json, write_json
+
+
+@pytest.fixture
+def fs_calls(monkeypatch: pytest.MonkeyPatch) -> List[Tuple[str, str]]:
+    """记录 fsync（按文件名）与 replace 的调用顺序。"""
+
+    calls: List[Tuple[str, str]] = []
+    real_fsync, real_replace = os.fsync, os.replace
+
+    def fsync(fd: int) -> None:
+        calls.append(("fsync", os.path.basename(os.readlink(f"/proc/self/fd/{fd}"))))
+        real_fsync(fd)
+
+    def replace(src: str, dst: object) -> None:
+        calls.append(("replace", os.path.basename(str(src))))
+        real_replace(src, dst)
+
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("needs /proc/self/fd to resolve file names")
+    monkeypatch.setattr(file_handler.os, "fsync", fsync)
+    monkeypatch.setattr(file_handler.os, "replace", replace)
+    return calls
+
+
+def test_write_fsyncs_temp_file_before_replace(tmp_path: Path, fs_calls: List[Tuple[str, str]]) -> None:
+    target = tmp_path / "cases.json"
+    write_json(str(target), [{"name": "a"}])
+
+    assert read_json(str(target)) == [{"name": "a"}]
+    replaced = [name for op, name in fs_calls if op == "replace"]
+    assert len(replaced) == 1
+    assert fs_calls.index(("fsync", replaced[0])) < fs_calls.index(("replace", replaced[0]))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["cases.json"]
+
+
+def test_batch_defers_replace_until_exit(tmp_path: Path, fs_calls: List[Tuple[str, str]]) -> None:
+    first, second = tmp_path / "a.json", tmp_path / "b.json"
+    write_json(str(first), {"v": 0})
+    fs_calls.clear()
+
+    with batched_fsync():
+        write_json(str(first), {"v": 1})
+        write_json(str(first), {"v": 2})
+        write_json(str(second), {"v": 3})
+        # 范围内目标文件保持旧内容，也不逐个刷盘
+        assert read_json(str(first)) == {"v": 0}
+        assert not second.exists()
+        assert fs_calls == []
+
+    assert read_json(str(first)) == {"v": 2}
+    assert read_json(str(second)) == {"v": 3}
+    replaced = [name for op, name in fs_calls if op == "replace"]
+    assert len(replaced) == 2
+    last_fsync = max(idx for idx, call in enumerate(fs_calls) if call[0] == "fsync" and call[1] in replaced)
+    first_replace = min(idx for idx, call in enumerate(fs_calls) if call[0] == "replace")
+    assert last_fsync < first_replace
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.json", "b.json"]
@@ -0,0 +1,129 @@
+"""共享判定服务：批内去重、缓存、进行中请求合并与前置过滤。"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, List, Optional, Tuple
+
+import pytest
+
+from src.core.judge_service import JudgeService, _Request
+
+
+class _FakeConn:
+    """记录回复的连接。"""
+
+    def __init__(self) -> None:
+        self.sent: List[Tuple[int, Optional[bool], Optional[str]]] = []
+        self._changed = threading.Condition()
+
+    def send(self, message: Tuple[int, Optional[bool], Optional[str]]) -> None:
+        with self._changed:
+            self.sent.append(message)
+            self._changed.notify_all()
+
+    def wait_for(self, count: int) -> None:
+        """等待收到 count 条回复（判定在线程池中异步完成）。"""
+        with self._changed:
+            assert self._changed.wait_for(lambda: len(self.sent) >= count, timeout=5)
+
+
+class _Verdicts:
+    """假判定函数：实际摘要中包含 ok 时通过，可阻塞以模拟进行中的判定。"""
+
+    def __init__(self, block: bool = False) -> None:
+        self.calls: List[Tuple[Any, str]] = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, expected: Any, digest: str) -> bool:
+        self.calls.append((expected, digest))
+        self.release.wait(5)
+        if "boom" in digest:
+            raise RuntimeError("judge down")
+        return "ok" in digest
+
+
+@pytest.fixture
+def conn() -> _FakeConn:
+    return _FakeConn()
+
+
+def _requests(conn: _FakeConn, pairs: List[Tuple[Any, str]], start: int = 0) -> List[_Request]:
+    lock = threading.Lock()
+    return [
+        _Request(start + idx, expected, digest, conn, lock)  # type: ignore[arg-type]
+        for idx, (expected, digest) in enumerate(pairs)
+    ]
+
+
+def _service(verdicts: _Verdicts, **kwargs: Any) -> JudgeService:
+    return JudgeService(verdicts, {"max_concurrency": 2}, **kwargs)
+
+
+def test_batch_deduplicates_identical_requests(conn: _FakeConn) -> None:
+    verdicts = _Verdicts()
+    service = _service(verdicts)
+    service._dispatch(_requests(conn, [("登录成功", "ok"), ("登录成功", "ok"), ("登录失败", "bad")]))
+    service.stop()
+    assert len(verdicts.calls) == 2
+    assert sorted(conn.sent) == [(0, True, None), (1, True, None), (2, False, None)]
+    assert service.stats["deduplicated"] == 1
+    assert service.stats["llm_calls"] == 2
+
+
+def test_cached_verdict_skips_llm(conn: _FakeConn) -> None:
+    verdicts = _Verdicts()
+    service = _service(verdicts)
+    service._dispatch(_requests(conn, [({"code": 0}, "ok")]))
+    conn.wait_for(1)
+    service._dispatch(_requests(conn, [({"code": 0}, "ok")], start=1))
+    service.stop()
+    assert len(verdicts.calls) == 1
+    assert conn.sent == [(0, True, None), (1, True, None)]
+    assert service.stats["cache_hits"] == 1
+
+
+def test_inflight_request_is_joined_across_batches(conn: _FakeConn) -> None:
+    verdicts = _Verdicts(block=True)
+    service = _service(verdicts)
+    service._dispatch(_requests(conn, [("登录成功", "ok")]))
+    # 第一批仍在判定中：相同请求只等待已有结果
+    service._dispatch(_requests(conn, [("登录成功", "ok")], start=1))
+    verdicts.release.set()
+    service.stop()
+    assert len(verdicts.calls) == 1
+    assert sorted(conn.sent) == [(0, True, None), (1, True, None)]
+    assert service.stats["deduplicated"] == 1
+
+
+def test_prefilter_decides_without_llm(conn: _FakeConn) -> None:
+    verdicts = _Verdicts()
+    batches: List[List[Tuple[Any, str]]] = []
+
+    def prefilter(pairs: List[Tuple[Any, str]]) -> List[Optional[bool]]:
+        batches.append(pairs)
+        return [True, None, False]
+
+    service = _service(verdicts, prefilter=prefilter)
+    service._dispatch(_requests(conn, [("a", "x"), ("b", "ok"), ("c", "y")]))
+    service.stop()
+    # 前置过滤按整批调用一次，只有未决策的请求调用 LLM
+    assert batches == [[("a", "x"), ("b", "ok"), ("c", "y")]]
+    assert verdicts.calls == [("b", "ok")]
+    assert sorted(conn.sent) == [(0, True, None), (1, True, None), (2, False, None)]
+    assert service.stats["prefiltered"] == 2
+    assert service.stats["llm_calls"] == 1
+
+
+def test_failed_verdict_is_reported_and_not_cached(conn: _FakeConn) -> None:
+    verdicts = _Verdicts()
+    service = _service(verdicts)
+    service._dispatch(_requests(conn, [("a", "boom")]))
+    conn.wait_for(1)
+    assert conn.sent == [(0, None, "judge down")]
+    assert service._cache == {}
+    service._dispatch(_requests(conn, [("a", "boom")], start=1))
+    service.stop()
+    assert len(verdicts.calls) == 2
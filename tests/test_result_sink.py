@@ -0,0 +1,38 @@
+"""流式结果写入：默认每条记录立即落盘。"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.report.result_sink import ResultSink, iter_results
+
+
+@pytest.mark.parametrize("name", ["results.jsonl", "results.sqlite3"])
+def test_records_visible_before_close(tmp_path: Path, name: str) -> None:
+    path = str(tmp_path / name)
+    sink = ResultSink(path)
+    try:
+        sink.write({"nodeid": "t::a", "outcome": "passed", "duration": 0.1})
+        sink.write({"nodeid": "t::b", "outcome": "failed", "duration": 0.2})
+        # 未 close 时（如进程被终止）其他读取方已能读到全部记录
+        records = list(iter_results(path))
+    finally:
+        sink.close()
+    assert [record["nodeid"] for record in records] == ["t::a", "t::b"]
+
+
+def test_batched_sink_writes_remaining_on_close(tmp_path: Path) -> None:
+    path = str(tmp_path / "merged.sqlite3")
+    sink = ResultSink(path, batch_size=10)
+    for idx in range(3):
+        sink.write({"nodeid": f"t::{idx}", "outcome": "passed"})
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+    finally:
+        conn.close()
+    sink.close()
+    assert len(list(iter_results(path))) == 3
@@ -0,0 +1,54 @@
+"""切片检索索引：按文档分区持久化，检索覆盖全部分区。"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.rag_core.retrieval import ChunkIndex
+
+AUTH = {"title": "鉴权说明", "content": "所有接口需在请求头携带 Authorization: Bearer token，token 过期返回 401。"}
+ORDERS = [
+    {"title": "创建订单", "content": "POST /api/orders 创建订单，请求头携带 Authorization token。"},
+    {"title": "查询订单", "content": "GET /api/orders/{id} 查询订单详情。"},
+]
+
+
+def _docs(tmp_path: Path) -> tuple:
+    common, orders = tmp_path / "common.md", tmp_path / "orders.md"
+    common.write_text("# 鉴权", encoding="utf-8")
+    orders.write_text("# 订单", encoding="utf-8")
+    return str(common), str(orders)
+
+
+def test_related_searches_other_partitions(tmp_path: Path) -> None:
+    common, orders = _docs(tmp_path)
+    index_path = str(tmp_path / "index.json")
+    ChunkIndex(index_path).build([dict(AUTH)], common)
+
+    # 新进程只为订单文档建立分区，仍能检索到鉴权文档中的切片
+    index = ChunkIndex(index_path)
+    chunks = [dict(chunk) for chunk in ORDERS]
+    index.build(chunks, orders)
+    related = index.related(chunks[0], top_k=2)
+    assert related and related[0]["title"] == "鉴权说明"
+    assert all(chunk is not chunks[0] for chunk in related)
+
+
+def test_unchanged_partition_is_reused_and_deleted_source_pruned(tmp_path: Path) -> None:
+    common, orders = _docs(tmp_path)
+    index_path = str(tmp_path / "index.json")
+    index = ChunkIndex(index_path)
+    index.build([dict(AUTH)], common)
+    index.build([dict(chunk) for chunk in ORDERS], orders)
+    assert len(index.chunks) == 3
+
+    reloaded = ChunkIndex(index_path)
+    section = reloaded.sources[orders]
+    reloaded.build([dict(chunk) for chunk in ORDERS], orders)
+    assert reloaded.sources[orders] is section
+
+    Path(common).unlink()
+    reloaded.build([dict(chunk) for chunk in ORDERS], orders)
+    assert set(reloaded.sources) == {orders}
+    assert set(ChunkIndex(index_path).sources) == {orders}
+    assert len(reloaded.chunks) == 2
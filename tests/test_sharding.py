@@ -0,0 +1,66 @@
+"""多进程执行的用例分片：参数解析、按历史耗时均衡分配、extract 文件整体分配。"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pytest
+
+from src.core.sharding import assign_shards, group_units, parse_shard, shard_path
+
+
+def _loads(units: Sequence[Tuple[str, Sequence[Optional[float]]]], assignment: Dict[str, int]) -> List[float]:
+    loads = [0.0] * (max(assignment.values()) + 1)
+    for key, durations in units:
+        loads[assignment[key]] += sum(value or 0.0 for value in durations)
+    return loads
+
+
+def test_parse_shard() -> None:
+    assert parse_shard(None) is None
+    assert parse_shard("") is None
+    assert parse_shard("0/1") == (0, 1)
+    assert parse_shard("2/3") == (2, 3)
+    for invalid in ("3/3", "-1/2", "0/0", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(invalid)
+
+
+def test_shard_path() -> None:
+    assert shard_path("reports/results.jsonl", 1) == "reports/results.shard-1.jsonl"
+
+
+def test_assign_shards_balances_by_duration() -> None:
+    units = [("a", [5.0]), ("b", [4.0]), ("c", [3.0]), ("d", [3.0]), ("e", [2.0]), ("f", [1.0])]
+    assignment = assign_shards(units, 2)
+    assert set(assignment) == {key for key, _ in units}
+    assert _loads(units, assignment) == [9.0, 9.0]
+
+
+def test_assign_shards_is_stable() -> None:
+    units = [(f"case{idx}", [1.0]) for idx in range(7)]
+    first = assign_shards(units, 3)
+    # 各工作进程独立计算必须得到相同划分；同权重按原顺序轮流分配
+    assert assign_shards(list(units), 3) == first
+    assert [first[f"case{idx}"] for idx in range(7)] == [0, 1, 2, 0, 1, 2, 0]
+
+
+def test_assign_shards_estimates_unknown_with_median() -> None:
+    units = [("a", [10.0]), ("b", [2.0]), ("c", [4.0]), ("x", [None, None])]
+    assignment = assign_shards(units, 2)
+    # x 按中位数 4 秒估算为 8 秒：a(10)+b(2) 与 x(8)+c(4) 各 12 秒
+    assert assignment == {"a": 0, "x": 1, "c": 1, "b": 0}
+
+
+def test_group_units_keeps_extract_files_whole() -> None:
+    entries = [
+        ("t1", "plain.json", False),
+        ("t2", "login.json", True),
+        ("t3", "plain.json", False),
+        ("t4", "login.json", True),
+    ]
+    assert group_units(entries) == [
+        ("t1", ["t1"]),
+        ("file:login.json", ["t2", "t4"]),
+        ("t3", ["t3"]),
+    ]
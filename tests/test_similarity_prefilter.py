@@ -0,0 +1,63 @@
+"""语义判定前置过滤：哈希向量只做明确通过，明确失败需要句向量模型。"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.core.similarity_prefilter import SimilarityPrefilter
+
+# 语义一致但没有字面重合的（预期，实际）判定对：跨语言与换说法
+PARAPHRASE_PAIRS = [
+    ("成功：登录成功", json.dumps({"code": 0, "msg": "login success"})),
+    ("失败：用户名或密码错误", json.dumps({"code": 1001, "msg": "invalid username or password"})),
+    ("登录成功", json.dumps({"msg": "欢迎回来"})),
+]
+
+
+def test_fail_threshold_disabled_by_default() -> None:
+    prefilter = SimilarityPrefilter({"enabled": True})
+    assert prefilter.fail_threshold is None
+    assert prefilter.decide(PARAPHRASE_PAIRS) == [None] * len(PARAPHRASE_PAIRS)
+
+
+def test_hashing_vectors_never_clear_fail_paraphrases() -> None:
+    prefilter = SimilarityPrefilter({"enabled": True, "fail_threshold": 0.1})
+    # 哈希向量下这些判定对的相似度很低，但仍须交给 LLM，不能直接判定失败
+    assert all(score <= 0.1 for score in prefilter.similarities(PARAPHRASE_PAIRS))
+    assert prefilter.decide(PARAPHRASE_PAIRS) == [None] * len(PARAPHRASE_PAIRS)
+
+
+def test_hashing_vectors_still_clear_pass() -> None:
+    prefilter = SimilarityPrefilter({"enabled": True, "fail_threshold": 0.1})
+    pairs = [
+        ("登录成功", json.dumps({"code": 0, "msg": "登录成功"})),
+        ("login success", "Login success"),
+    ]
+    assert prefilter.decide(pairs) == [True, True]
+
+
+def test_unavailable_model_falls_back_to_pass_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(SimilarityPrefilter, "_load_model", lambda self, name: None)
+    prefilter = SimilarityPrefilter({"enabled": True, "fail_threshold": 0.1, "model": "missing-model"})
+    assert prefilter.decide(PARAPHRASE_PAIRS) == [None] * len(PARAPHRASE_PAIRS)
+
+
+def test_model_enables_clear_fail(monkeypatch: pytest.MonkeyPatch) -> None:
+    np = pytest.importorskip("numpy")
+
+    class _OrthogonalModel:
+        """预期文本与实际文本分别映射到正交向量（相似度为 0）。"""
+
+        def encode(self, texts, normalize_embeddings=True, batch_size=64):  # noqa: ANN001
+            half = len(texts) // 2
+            vectors = np.zeros((len(texts), 2), dtype=np.float32)
+            vectors[:half, 0] = 1.0
+            vectors[half:, 1] = 1.0
+            return vectors
+
+    monkeypatch.setattr(SimilarityPrefilter, "_load_model", lambda self, name: _OrthogonalModel())
+    prefilter = SimilarityPrefilter({"enabled": True, "fail_threshold": 0.1, "model": "fake-model"})
+    pairs = [("登录成功", json.dumps({"msg": "account locked"}))]
+    assert prefilter.decide(pairs) == [False]
@@ -0,0 +1,175 @@
+"""持久化工作队列：领取互斥、租约过期、退避重试、续跑与重新入队。"""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.core.work_queue import DONE, FAILED, IN_FLIGHT, PENDING, WorkQueue, job_id, run_key
+
+
+def _items(count: int) -> List[tuple]:
+    payloads = [{"index": idx, "payload": f"chunk {idx}"} for idx in range(count)]
+    return [(job_id(payload), payload) for payload in payloads]
+
+
+def _queue(tmp_path: Path, **cfg: Any) -> WorkQueue:
+    return WorkQueue(str(tmp_path / "queue.sqlite3"), cfg)
+
+
+@pytest.fixture
+def run_items() -> tuple:
+    items = _items(5)
+    return run_key([item_id for item_id, _ in items]), items
+
+
+def test_concurrent_claims_never_overlap(tmp_path: Path, run_items: tuple) -> None:
+    run, items = run_items
+    setup = _queue(tmp_path)
+    setup.enqueue(run, items)
+    setup.close()
+
+    claimed: Dict[str, List[str]] = {}
+    barrier = threading.Barrier(4)
+
+    def worker(name: str) -> None:
+        # 每个线程独立连接，相当于独立进程从同一队列文件领取
+        queue = _queue(tmp_path)
+        claimed[name] = []
+        try:
+            barrier.wait()
+            while True:
+                job = queue.claim(run, name)
+                if job is None:
+                    return
+                claimed[name].append(job.id)
+                queue.complete(job, {"index": job.payload["index"]})
+        finally:
+            queue.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{idx}",)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_claimed = [item_id for ids in claimed.values() for item_id in ids]
+    assert sorted(all_claimed) == sorted(item_id for item_id, _ in items)
+    queue = _queue(tmp_path)
+    try:
+        assert queue.counts(run)[DONE] == len(items)
+        assert [result["index"] for result in queue.results(run)] == list(range(len(items)))
+    finally:
+        queue.close()
+
+
+def test_expired_lease_is_reclaimed(tmp_path: Path, run_items: tuple) -> None:
+    run, items = run_items
+    crashed = _queue(tmp_path, lease_seconds=0.05)
+    other = _queue(tmp_path, lease_seconds=0.05)
+    try:
+        crashed.enqueue(run, items[:1])
+        job = crashed.claim(run, "crashed")
+        assert job is not None and job.attempts == 1
+        # 租约有效期内不会被其他进程领取
+        assert other.claim(run, "other") is None
+        time.sleep(0.1)
+        again = other.claim(run, "other")
+        assert again is not None
+        assert again.id == job.id
+        assert again.attempts == 2
+    finally:
+        crashed.close()
+        other.close()
+
+
+def test_failure_backs_off_then_marks_failed(tmp_path: Path, run_items: tuple) -> None:
+    run, items = run_items
+    queue = _queue(tmp_path, max_attempts=2, retry_backoff_seconds=60)
+    try:
+        queue.enqueue(run, items[:1])
+        job = queue.claim(run, "w")
+        assert queue.fail(job, "boom") is True
+        assert queue.counts(run)[PENDING] == 1
+        # 退避期内不可领取
+        assert queue.claim(run, "w") is None
+        wait: Optional[float] = queue.next_ready_in(run)
+        assert wait is not None and wait > 30
+
+        queue._conn.execute("UPDATE jobs SET next_at = 0")
+        job = queue.claim(run, "w")
+        assert job is not None and job.attempts == 2
+        assert queue.fail(job, "boom again") is False
+        assert queue.counts(run)[FAILED] == 1
+        assert queue.failures(run) == [(items[0][1], "boom again")]
+        assert queue.next_ready_in(run) is None
+    finally:
+        queue.close()
+
+
+def test_resume_reuses_done_results(tmp_path: Path, run_items: tuple) -> None:
+    run, items = run_items
+    first = _queue(tmp_path)
+    try:
+        first.enqueue(run, items)
+        for _ in range(2):
+            job = first.claim(run, "w")
+            first.complete(job, {"index": job.payload["index"]})
+    finally:
+        first.close()
+
+    resumed = _queue(tmp_path)
+    try:
+        counts = resumed.enqueue(run, items)
+        assert counts[DONE] == 2
+        assert counts[PENDING] == 3
+        remaining = []
+        while True:
+            job = resumed.claim(run, "w")
+            if job is None:
+                break
+            remaining.append(job.payload["index"])
+            resumed.complete(job, {"index": job.payload["index"]})
+        assert remaining == [2, 3, 4]
+        assert [result["index"] for result in resumed.results(run)] == [0, 1, 2, 3, 4]
+    finally:
+        resumed.close()
+
+
+def test_enqueue_resets_in_flight_and_failed(tmp_path: Path, run_items: tuple) -> None:
+    run, items = run_items
+    queue = _queue(tmp_path, max_attempts=1)
+    try:
+        queue.enqueue(run, items[:2])
+        interrupted = queue.claim(run, "w")
+        exhausted = queue.claim(run, "w")
+        assert queue.fail(exhausted, "boom") is False
+        assert queue.counts(run)[IN_FLIGHT] == 1
+        assert queue.counts(run)[FAILED] == 1
+
+        counts = queue.enqueue(run, items[:2])
+        assert counts[PENDING] == 2
+        assert counts[IN_FLIGHT] == counts[FAILED] == 0
+        # 租约仍未过期的任务也可立即重新领取，尝试次数从头计算
+        jobs = [queue.claim(run, "w"), queue.claim(run, "w")]
+        assert sorted(job.id for job in jobs) == sorted([interrupted.id, exhausted.id])
+        assert all(job.attempts == 1 for job in jobs)
+    finally:
+        queue.close()
+
+
+def test_discard_drops_done_results(tmp_path: Path, run_items: tuple) -> None:
+    run, items = run_items
+    queue = _queue(tmp_path)
+    try:
+        queue.enqueue(run, items[:1])
+        queue.complete(queue.claim(run, "w"), {"index": 0})
+        assert queue.discard([items[0][0]]) == 1
+        assert queue.enqueue(run, items[:1])[PENDING] == 1
+        assert queue.results(run) == []
+    finally:
+        queue.close()